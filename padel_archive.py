@@ -0,0 +1,367 @@
+"""Archive of completed padel matches in a local SQLite database.
+
+Every match that is won is saved with its teams, set history, totals,
+duration and its full point log (the packed PointLog records, as one BLOB).
+Writes go through a single background writer thread so scoring never waits
+on disk; readers use their own connections, and with SQLite's WAL journal
+they never block the writer.
+
+Point logs live in their own table so match rows stay narrow. match_teams
+holds one row per team per match (team, opponent, won, ...), clustered by
+team and indexed by (team, opponent), and team_totals keeps running sums per
+team, so head-to-head records, the leaderboard and average durations read a
+few index entries instead of scanning every archived match.
+"""
+import json
+import queue
+import sqlite3
+import threading
+
+from padel_logging import log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    court_id TEXT NOT NULL,
+    started_ns INTEGER NOT NULL,     -- PointLog anchor (wall-clock ns)
+    ended_ns INTEGER NOT NULL,       -- Time of the winning point, identifies the match on its court
+    started_at TEXT NOT NULL,
+    ended_at TEXT NOT NULL,
+    played_on TEXT NOT NULL,         -- YYYY-MM-DD of ended_at
+    duration_s INTEGER NOT NULL,
+    black_team TEXT NOT NULL,
+    yellow_team TEXT NOT NULL,
+    winner TEXT NOT NULL,            -- 'black' or 'yellow'
+    sets_black INTEGER NOT NULL,
+    sets_yellow INTEGER NOT NULL,
+    games_black INTEGER NOT NULL,
+    games_yellow INTEGER NOT NULL,
+    points_black INTEGER NOT NULL,
+    points_yellow INTEGER NOT NULL,
+    set_history TEXT NOT NULL,       -- JSON list of "6-4" strings
+    rules TEXT NOT NULL,             -- JSON object of padel_scoring.Rules
+    UNIQUE (court_id, ended_ns)
+);
+CREATE INDEX IF NOT EXISTS matches_played_on ON matches (played_on);
+CREATE INDEX IF NOT EXISTS matches_court ON matches (court_id, played_on, duration_s);
+
+CREATE TABLE IF NOT EXISTS match_points (
+    match_id INTEGER PRIMARY KEY,
+    history BLOB NOT NULL            -- padel_history.RECORD records
+);
+
+CREATE TABLE IF NOT EXISTS match_teams (
+    team TEXT NOT NULL,
+    match_id INTEGER NOT NULL,
+    opponent TEXT NOT NULL,
+    won INTEGER NOT NULL,
+    sets_won INTEGER NOT NULL,
+    sets_lost INTEGER NOT NULL,
+    games_won INTEGER NOT NULL,
+    games_lost INTEGER NOT NULL,
+    duration_s INTEGER NOT NULL,
+    played_on TEXT NOT NULL,
+    PRIMARY KEY (team, match_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS match_teams_pair ON match_teams (team, opponent, match_id);
+
+CREATE TABLE IF NOT EXISTS team_totals (
+    team TEXT PRIMARY KEY,
+    played INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    sets_won INTEGER NOT NULL,
+    sets_lost INTEGER NOT NULL,
+    games_won INTEGER NOT NULL,
+    games_lost INTEGER NOT NULL,
+    duration_s INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS team_totals_rank ON team_totals (won DESC, played);
+"""
+
+# Sums kept per team in team_totals, in match_teams column order
+TOTALS = ('won', 'sets_won', 'sets_lost', 'games_won', 'games_lost', 'duration_s')
+
+# Columns returned by match listings (everything but the point log)
+SUMMARY_COLUMNS = ('id', 'court_id', 'started_at', 'ended_at', 'played_on', 'duration_s', 'black_team',
+                   'yellow_team', 'winner', 'sets_black', 'sets_yellow', 'games_black', 'games_yellow',
+                   'points_black', 'points_yellow', 'set_history', 'rules')
+
+
+class MatchArchive:
+    """SQLite match archive with a background writer thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.local = threading.local()
+        self.written = 0
+        self.discarded = 0
+
+        with sqlite3.connect(path) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+        conn.close()
+
+        self.writer = threading.Thread(target=self._write_loop, name='padel-archive-writer', daemon=True)
+        self.writer.start()
+
+    # --- Writing --------------------------------------------------------
+
+    def save(self, match):
+        """Queue a completed match (a dict of matches columns) for archiving, replacing an earlier save"""
+        self.queue.put(('save', match))
+
+    def discard(self, court_id, ended_ns):
+        """Queue removal of an archived match whose winning point was taken back"""
+        self.queue.put(('discard', (court_id, ended_ns)))
+
+    def flush(self):
+        """Wait until every queued write is committed"""
+        self.queue.join()
+
+    def close(self):
+        """Commit the queued writes and stop the writer"""
+        self.queue.put(None)
+        self.writer.join()
+
+    def _write_loop(self):
+        """Apply queued writes, one transaction per batch of whatever is waiting"""
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for item in batch:
+                        if item is None:
+                            running = False
+                        elif item[0] == 'save':
+                            self._save(conn, item[1])
+                        else:
+                            self._discard(conn, *item[1])
+            except sqlite3.Error as e:
+                log.error("⚠️ Match archive write failed", error=str(e))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        conn.close()
+
+    def _discard(self, conn, court_id, ended_ns):
+        row = conn.execute('SELECT id FROM matches WHERE court_id = ? AND ended_ns = ?',
+                           (court_id, ended_ns)).fetchone()
+        if row is not None:
+            self._remove_teams(conn, row[0])
+            conn.execute('DELETE FROM match_points WHERE match_id = ?', row)
+            conn.execute('DELETE FROM matches WHERE id = ?', row)
+            self.discarded += 1
+
+    def _save(self, conn, match):
+        match = dict(match)
+        history = match.pop('history')
+        columns = list(match)
+        row = conn.execute('SELECT id FROM matches WHERE court_id = ? AND ended_ns = ?',
+                           (match['court_id'], match['ended_ns'])).fetchone()
+        if row is None:
+            match_id = conn.execute(
+                f"INSERT INTO matches ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [match[column] for column in columns]).lastrowid
+        else:
+            # Replaying the event log, or redoing the winning point, saves the same match again: keep its id
+            match_id = row[0]
+            self._remove_teams(conn, match_id)
+            conn.execute(f"UPDATE matches SET {', '.join(column + ' = ?' for column in columns)} WHERE id = ?",
+                         [match[column] for column in columns] + [match_id])
+        conn.execute('INSERT OR REPLACE INTO match_points VALUES (?, ?)', (match_id, history))
+
+        sides = (
+            (match['black_team'], match['yellow_team'], 'black', match['sets_black'], match['sets_yellow'],
+             match['games_black'], match['games_yellow']),
+            (match['yellow_team'], match['black_team'], 'yellow', match['sets_yellow'], match['sets_black'],
+             match['games_yellow'], match['games_black']),
+        )
+        for team, opponent, side, sets_won, sets_lost, games_won, games_lost in sides:
+            values = (int(match['winner'] == side), sets_won, sets_lost, games_won, games_lost, match['duration_s'])
+            conn.execute('INSERT INTO match_teams VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         (team, match_id, opponent) + values + (match['played_on'],))
+            conn.execute(
+                f"INSERT INTO team_totals VALUES (?, 1, {', '.join('?' * len(TOTALS))}) "
+                f"ON CONFLICT (team) DO UPDATE SET played = played + 1, "
+                f"{', '.join(f'{column} = {column} + excluded.{column}' for column in TOTALS)}",
+                (team,) + values)
+        self.written += 1
+
+    def _remove_teams(self, conn, match_id):
+        """Take an archived match out of match_teams and team_totals"""
+        rows = conn.execute(f"SELECT team, {', '.join(TOTALS)} FROM match_teams WHERE team IN "
+                            '(SELECT black_team FROM matches WHERE id = ? UNION ALL '
+                            'SELECT yellow_team FROM matches WHERE id = ?) AND match_id = ?',
+                            (match_id, match_id, match_id)).fetchall()
+        for team, *values in rows:
+            conn.execute(f"UPDATE team_totals SET played = played - 1, "
+                         f"{', '.join(f'{column} = {column} - ?' for column in TOTALS)} WHERE team = ?",
+                         values + [team])
+            conn.execute('DELETE FROM match_teams WHERE team = ? AND match_id = ?', (team, match_id))
+        conn.execute('DELETE FROM team_totals WHERE played <= 0')
+
+    # --- Queries --------------------------------------------------------
+
+    def _reader(self):
+        """This thread's read-only connection"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    @staticmethod
+    def _summary(row):
+        match = {column: row[column] for column in SUMMARY_COLUMNS}
+        match['set_history'] = json.loads(match['set_history'])
+        match['rules'] = json.loads(match['rules'])
+        return match
+
+    @staticmethod
+    def _filters(team=None, court_id=None, date_from=None, date_to=None):
+        """WHERE conditions and parameters selecting matches by team, court and date range (YYYY-MM-DD)"""
+        where, params = [], []
+        if team is not None:
+            where.append('id IN (SELECT match_id FROM match_teams WHERE team = ?)')
+            params.append(team)
+        if court_id is not None:
+            where.append('court_id = ?')
+            params.append(court_id)
+        if date_from is not None:
+            where.append('played_on >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            where.append('played_on <= ?')
+            params.append(date_to)
+        return where, params
+
+    def matches(self, team=None, court_id=None, date_from=None, date_to=None, before=None, limit=50):
+        """Archived matches, newest first, filtered by team, court and date range (YYYY-MM-DD)"""
+        where, params = self._filters(team, court_id, date_from, date_to)
+        if before is not None:
+            where.append('id < ?')
+            params.append(before)
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM matches"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        return [self._summary(row) for row in self._reader().execute(sql, params)]
+
+    def iter_matches(self, with_history=False, batch_size=500, **filters):
+        """Every matching archived match, oldest first, read batch_size rows at a time.
+
+        Keyset paging on the id, so an export of a whole season holds one batch
+        in memory and no read transaction stays open between batches.
+        """
+        where, params = self._filters(**filters)
+        columns = ', '.join(SUMMARY_COLUMNS)
+        if with_history:
+            columns += ', started_ns, history'
+        last_id = 0
+        while True:
+            sql = f"SELECT {columns} FROM matches"
+            if with_history:
+                sql += ' JOIN match_points ON match_id = id'
+            sql += ' WHERE ' + ' AND '.join(where + ['id > ?']) + ' ORDER BY id LIMIT ?'
+            rows = self._reader().execute(sql, params + [last_id, batch_size]).fetchall()
+            for row in rows:
+                match = self._summary(row)
+                if with_history:
+                    match['started_ns'] = row['started_ns']
+                    match['history'] = row['history']
+                yield match
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['id']
+
+    def match(self, match_id):
+        """One archived match with its raw point log (None when unknown)"""
+        row = self._reader().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)}, started_ns, history FROM matches "
+            'JOIN match_points ON match_id = id WHERE id = ?', (match_id,)).fetchone()
+        if row is None:
+            return None
+        match = self._summary(row)
+        match['started_ns'] = row['started_ns']
+        match['history'] = row['history']
+        return match
+
+    def head_to_head(self, team_a, team_b, recent=10):
+        """Record of team_a against team_b, with their most recent meetings"""
+        conn = self._reader()
+        totals = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(won), 0), COALESCE(SUM(sets_won), 0), COALESCE(SUM(sets_lost), 0), '
+            'COALESCE(SUM(games_won), 0), COALESCE(SUM(games_lost), 0), AVG(duration_s) '
+            'FROM match_teams WHERE team = ? AND opponent = ?', (team_a, team_b)).fetchone()
+        played, wins_a, sets_a, sets_b, games_a, games_b, average = totals
+        recent_ids = [row[0] for row in conn.execute(
+            'SELECT match_id FROM match_teams WHERE team = ? AND opponent = ? ORDER BY match_id DESC LIMIT ?',
+            (team_a, team_b, recent))]
+        return {
+            'team_a': team_a,
+            'team_b': team_b,
+            'played': played,
+            'wins': {team_a: wins_a, team_b: played - wins_a},
+            'sets': {team_a: sets_a, team_b: sets_b},
+            'games': {team_a: games_a, team_b: games_b},
+            'average_duration_s': round(average, 1) if average is not None else None,
+            'recent': [self.match_summary(match_id) for match_id in recent_ids]
+        }
+
+    def match_summary(self, match_id):
+        """One archived match without its point log"""
+        row = self._reader().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM matches WHERE id = ?", (match_id,)).fetchone()
+        return self._summary(row) if row is not None else None
+
+    def leaderboard(self, date_from=None, limit=20):
+        """Teams ranked by matches won, then fewest played; all time from the running totals"""
+        if date_from is None:
+            sql = ('SELECT team, played, won, sets_won, sets_lost, games_won, games_lost '
+                   'FROM team_totals ORDER BY won DESC, played, team LIMIT ?')
+            params = [limit]
+        else:
+            sql = ('SELECT team, COUNT(*) AS played, SUM(won) AS won, SUM(sets_won) AS sets_won, '
+                   'SUM(sets_lost) AS sets_lost, SUM(games_won) AS games_won, SUM(games_lost) AS games_lost '
+                   'FROM match_teams WHERE played_on >= ? GROUP BY team ORDER BY won DESC, played, team LIMIT ?')
+            params = [date_from, limit]
+        return [dict(row, win_rate=round(row['won'] / row['played'], 3))
+                for row in self._reader().execute(sql, params)]
+
+    def average_duration(self, team=None, court_id=None):
+        """Average match duration in seconds, overall or for one team or court"""
+        if team is not None and court_id is None:
+            sql, params = 'SELECT played, CAST(duration_s AS REAL) / played FROM team_totals WHERE team = ?', [team]
+        elif team is not None:
+            sql = ('SELECT COUNT(*), AVG(duration_s) FROM match_teams WHERE team = ? '
+                   'AND match_id IN (SELECT id FROM matches WHERE court_id = ?)')
+            params = [team, court_id]
+        elif court_id is not None:
+            sql, params = 'SELECT COUNT(*), AVG(duration_s) FROM matches WHERE court_id = ?', [court_id]
+        else:
+            sql, params = 'SELECT COUNT(*), AVG(duration_s) FROM matches', []
+        count, average = self._reader().execute(sql, params).fetchone() or (0, None)
+        return {
+            'matches': count,
+            'average_duration_s': round(average, 1) if average is not None else None
+        }
+
+    def stats(self):
+        """Writer figures for /health"""
+        return {
+            'path': self.path,
+            'written': self.written,
+            'discarded': self.discarded,
+            'queued': self.queue.qsize()
+        }
@@ -1,83 +1,807 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
+import atexit
+from bisect import bisect_left
+from collections import OrderedDict
+import copy
+from operator import itemgetter
 import json
 from datetime import datetime
+import logging
 import os
+import queue
+import threading
+import time
+import zlib
+
+from padel_archive import MatchArchive
+from padel_export import MIMETYPES, export_chunks, pyarrow
+from padel_history import TEAM_CODES, TEAMS, MatchStats, PointLog, PointTimeline
+import padel_logging
+from padel_logging import configure_logging, log
+from padel_metrics import CONTENT_TYPE, Family, Registry, deep_size
+from padel_replication import ReplicationPrimary, ReplicationStandby
+from padel_probability import SIMULATION_PATHS, point_win_rate, simulate, win_probability
+from padel_static import AssetCache
+from padel_udp import DEBOUNCE_MS, ButtonListener
+from padel_scoring import DEFAULT_RULES, NEW_MATCH, Rules, apply_point, display_score, rules_from_dict, state_from_list
+from padel_wal import EventLog
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-
-# Enhanced game state with detailed match tracking
-game_state = {
-    'score_1': 0,        # Tennis scores (0, 15, 30, 40)
-    'score_2': 0,
-    'point_1': 0,        # Total points in current game
-    'point_2': 0,
-    'game_1': 0,         # Games won in current set
-    'game_2': 0,
-    'set_1': 0,          # Sets won in match
-    'set_2': 0,
-    'match_won': False,  # Match completion status
-    'winner': None,      # Winner information
-    'set_history': [],   # History of completed sets
-    'match_history': [], # Detailed point-by-point history
-    'match_start_time': datetime.now().isoformat(),
-    'match_end_time': None,
-    'last_updated': datetime.now().isoformat()
-}
-
-# NEW: Detailed match storage for winner display
-match_storage = {
-    'match_completed': False,
-    'match_data': {
-        'winner_team': None,
-        'winner_name': None,
-        'final_sets_score': None,
-        'detailed_sets': [],  # Each set's games score
-        'match_duration': None,
-        'total_points_won': {'black': 0, 'yellow': 0},
-        'total_games_won': {'black': 0, 'yellow': 0},
-        'sets_breakdown': [],  # Detailed breakdown for display
-        'match_summary': None
-    },
-    'display_shown': False
-}
-
-def add_to_history(action, team, score_before, score_after, game_before, game_after, set_before, set_after):
-    """Add detailed action to match history"""
-    global game_state
-
-    history_entry = {
-        'timestamp': datetime.now().isoformat(),
-        'action': action,  # 'point', 'game', 'set', 'match'
-        'team': team,
-        'scores': {
-            'before': {'score_1': score_before[0], 'score_2': score_before[1]},
-            'after': {'score_1': score_after[0], 'score_2': score_after[1]}
-        },
-        'games': {
-            'before': {'game_1': game_before[0], 'game_2': game_before[1]},
-            'after': {'game_1': game_after[0], 'game_2': game_after[1]}
+CORS(app, expose_headers=['X-Padel-Term'])  # Enable CORS for all routes
+app.url_map.redirect_defaults = False  # /courts/1/... is served directly, not redirected to the legacy route
+
+DEFAULT_COURT_ID = '1'                                  # Court used by the legacy single-court routes
+MAX_COURTS = int(os.environ.get('PADEL_MAX_COURTS', 64))  # Upper bound on courts served by one process
+STREAM_QUEUE_SIZE = 32   # Events buffered per stream subscriber before it is dropped as too slow
+STREAM_KEEPALIVE = 15    # Seconds between keepalive comments on an idle stream
+MAX_STREAMS = int(os.environ.get('PADEL_MAX_STREAMS', 200))  # Open /stream connections, each holds a server thread
+STREAM_RETRY_AFTER = 30  # Seconds a refused screen polls /game_state before asking for a stream again
+HISTORY_PAGE_SIZE = 200  # Default /match_history page when paging with ?since=
+HISTORY_PAGE_MAX = 1000  # Largest page a client may ask for
+REQUEST_ID_TTL = int(os.environ.get('PADEL_REQUEST_ID_TTL', 86400))  # Seconds a request_id is remembered, >= the JS offline queue limit
+REQUEST_ID_MAX = 1024    # Request IDs remembered per court
+REQUEST_ID_LENGTH = 64   # Longest accepted request_id
+BATCH_MAX = 500          # Most points in one /add_points request
+TEAM_NAME_LENGTH = 64    # Longest accepted team name
+ARCHIVE_PAGE_MAX = 500   # Most archived matches per /matches page
+SIMULATION_PATHS_MAX = 2000   # Most simulated matches per /win_probability?method=monte_carlo
+SIMULATION_BUDGET_MS = 50     # CPU time a simulation may take before it answers with the paths played so far
+STATIC_MAX_AGE = int(os.environ.get('PADEL_STATIC_MAX_AGE', 86400))  # Browser cache lifetime of images (seconds)
+STATIC_REVALIDATED = ('.html', '.css', '.js')  # Page code follows the API: always revalidated, so a deploy shows up on reload
+COURT_IDLE_TTL = int(os.environ.get('PADEL_COURT_IDLE_TTL', 1800))  # Seconds a finished match stays in memory untouched
+COURT_EVICT_MIN_IDLE = 60  # Seconds untouched before a finished match may go early (court limit, memory budget)
+MEMORY_BUDGET = int(os.environ.get('PADEL_MEMORY_BUDGET_MB', 256)) * 2**20  # Match state held by all courts (bytes)
+RETENTION_INTERVAL = 30    # Seconds between retention sweeps
+
+configure_logging()  # Before anything logs: the asset preload below does
+
+# Files every screen loads, read into memory at startup
+STATIC_FILES = ('padel_scoreboard.html', 'padel_css.css', 'padel_js.js', 'logo.png', 'back.PNG')
+# The only files served from the app directory, which also holds the sources and padel_data/
+STATIC_ASSETS = STATIC_FILES + ('back.png', 'scoreboard.PNG', 'favicon.ico')
+static_assets = AssetCache(os.path.dirname(os.path.abspath(__file__)), STATIC_ASSETS)
+static_assets.preload()
+
+# Team names used until a match is started with {"teams": {...}}
+DEFAULT_TEAM_NAMES = {'black': 'BLACK TEAM', 'yellow': 'YELLOW TEAM'}
+
+# NEW: Metrics served on /metrics
+metrics = Registry()
+requests_total = metrics.counter('padel_http_requests_total', 'HTTP requests by route, method and status',
+                                 ('route', 'method', 'status'))
+request_seconds = metrics.histogram('padel_http_request_duration_seconds', 'Time to build each response, by route',
+                                    ('route',))
+points_total = metrics.counter('padel_points_total', 'Points scored per court', ('court',))
+POINTS_WINDOW_NS = 60 * 10**9  # Window of the points-per-minute gauge
+
+# Scoreboard fields pushed to /stream subscribers and returned by /add_point; with the raw
+# points, set scores, rules and teams a screen can score the next point itself
+SCOREBOARD_FIELDS = ('score_1', 'score_2', 'point_1', 'point_2', 'game_1', 'game_2', 'set_1', 'set_2', 'tiebreak',
+                     'set_history', 'match_won', 'winner', 'rules', 'teams')
+
+def timestamp(at_ns=None):
+    """ISO timestamp for a wall-clock time in ns (now by default)"""
+    if at_ns is None:
+        return datetime.now().isoformat()
+    return datetime.fromtimestamp(at_ns / 1e9).isoformat()
+
+def iso_to_ns(text):
+    """Wall-clock ns of an ISO timestamp, None for None (times stored as text by older versions)"""
+    return None if text is None else int(datetime.fromisoformat(text).timestamp() * 1e9)
+
+def match_times(court):
+    """Start, end and last update of the court's match as ISO text; times are kept as ns and formatted only for output"""
+    return {
+        'match_start_time': timestamp(court.history.started_wall_ns),
+        'match_end_time': timestamp(court.ended_ns) if court.ended_ns is not None else None,
+        'last_updated': timestamp(court.updated_ns)
+    }
+
+def new_game_state(rules=DEFAULT_RULES, teams=None):
+    """Create the game state for a fresh match"""
+    return {
+        'score_1': 0,        # Tennis scores (0, 15, 30, 40, AD) or tie-break points
+        'score_2': 0,
+        'point_1': 0,        # Points won in current game
+        'point_2': 0,
+        'game_1': 0,         # Games won in current set
+        'game_2': 0,
+        'set_1': 0,          # Sets won in match
+        'set_2': 0,
+        'match_won': False,  # Match completion status
+        'winner': None,      # Winner information
+        'set_history': [],   # History of completed sets
+        'tiebreak': False,   # Current game is a tie-break
+        'rules': rules._asdict(),
+        'teams': dict(teams or DEFAULT_TEAM_NAMES)  # Team names, for the winner display and the archive
+    }
+
+def new_match_storage():
+    """Create empty match storage for winner display"""
+    return {
+        'match_completed': False,
+        'match_data': {
+            'winner_team': None,
+            'winner_name': None,
+            'final_sets_score': None,
+            'detailed_sets': [],  # Each set's games score
+            'match_duration': None,
+            'total_points_won': {'black': 0, 'yellow': 0},
+            'total_games_won': {'black': 0, 'yellow': 0},
+            'sets_breakdown': [],  # Detailed breakdown for display
+            'match_summary': None
         },
-        'sets': {
-            'before': {'set_1': set_before[0], 'set_2': set_before[1]},
-            'after': {'set_1': set_after[0], 'set_2': set_after[1]}
-        }
+        'display_shown': False
     }
 
-    game_state['match_history'].append(history_entry)
+class Court:
+    """One court of the venue: its match state, winner storage and lock"""
+
+    __slots__ = ('court_id', 'rules', 'state', 'game_state', 'history', 'stats', 'timeline', 'match_storage', 'lock',
+                 'subscribers', 'published', 'applied_seq', 'version', 'body_cache', 'view', 'recent_requests',
+                 'ended_ns', 'updated_ns', 'last_used')
+
+    def __init__(self, court_id):
+        self.court_id = court_id
+        self.rules = DEFAULT_RULES               # Scoring rules for matches on this court
+        self.state = NEW_MATCH                   # Scoring engine state (padel_scoring.MatchState)
+        self.game_state = new_game_state()       # Enhanced game state with detailed match tracking
+        self.history = PointLog()                # Detailed point-by-point history, its anchor is the match start
+        self.ended_ns = None                     # Time of the winning point (ns, like every time kept)
+        self.updated_ns = self.history.started_wall_ns  # Time of the last scoring change
+        self.stats = MatchStats()                # Running statistics over that history
+        self.timeline = PointTimeline(self.state, self.stats)  # Point sequence for undo/redo
+        self.match_storage = new_match_storage() # Detailed match storage for winner display
+        self.lock = threading.Lock()             # Serializes state changes on this court
+        self.subscribers = set()                 # Live /stream subscribers
+        self.published = scoreboard(self)        # Last scoreboard pushed to subscribers
+        self.applied_seq = 0                     # Last event log sequence number applied
+        # Bumped on every state change; starts from the clock (us) so a court id never
+        # reuses a version, and a screen's cached ETag, after an eviction or a restart
+        self.version = time.time_ns() // 1000
+        self.body_cache = {}                     # Serialized GET bodies: key -> (etag, body)
+        self.view = CourtView(self)              # Immutable snapshot served to readers
+        self.recent_requests = RecentRequests()  # Client request IDs already applied
+        self.last_used = time.monotonic()        # Last request for this court, for LRU eviction
+
+class CourtView:
+    """Immutable snapshot of a court at one version, read by GET endpoints without the court lock.
+
+    Has the same attributes as the Court for everything readers use, so the
+    view helpers (scoreboard, full_game_state, ...) accept either. Only the
+    serialized /game_state body is filled in later, by the first read.
+    """
+
+    __slots__ = ('court_id', 'version', 'rules', 'state', 'game_state', 'history', 'stats', 'match_storage',
+                 'ended_ns', 'updated_ns', 'game_state_json')
+
+    def __init__(self, court):
+        game_state = court.game_state
+        self.court_id = court.court_id
+        self.version = court.version
+        self.rules = court.rules
+        self.state = court.state
+        # Nested values are replaced rather than mutated, except set_history
+        self.game_state = dict(game_state, set_history=list(game_state['set_history']))
+        self.history = court.history.copy()
+        self.stats = court.stats.copy()
+        self.match_storage = dict(court.match_storage)
+        self.ended_ns = court.ended_ns
+        self.updated_ns = court.updated_ns
+        self.game_state_json = None  # /game_state bytes, serialized by the first read of this version
+
+    def lean_json(self):
+        """The /game_state body of this version, serialized once and off the write path.
+
+        Two readers racing on a fresh view may both build it; they build the same bytes.
+        """
+        body = self.game_state_json
+        if body is None:
+            body = self.game_state_json = app.json.dumps(lean_game_state(self))
+        return body
+
+class RecentRequests:
+    """Client request IDs already applied on a court, so retried points count once.
+
+    Bounded to REQUEST_ID_MAX entries and REQUEST_ID_TTL seconds; the oldest
+    IDs go first (insertion order is also expiry order).
+    """
+
+    __slots__ = ('entries',)
+
+    def __init__(self):
+        self.entries = OrderedDict()  # request_id -> monotonic expiry time
+
+    def __contains__(self, request_id):
+        expires = self.entries.get(request_id)
+        return expires is not None and expires > time.monotonic()
+
+    def add(self, request_id):
+        """Remember an applied request ID, forgetting expired and excess ones"""
+        now = time.monotonic()
+        entries = self.entries
+        entries.pop(request_id, None)
+        entries[request_id] = now + REQUEST_ID_TTL
+        while entries and (len(entries) > REQUEST_ID_MAX or next(iter(entries.values())) <= now):
+            entries.popitem(last=False)
+
+    def dump(self):
+        """Request IDs still remembered, oldest first, for snapshots"""
+        return [request_id for request_id in self.entries if request_id in self]
+
+    def load(self, request_ids):
+        """Remember request IDs from dump() for a fresh TTL"""
+        for request_id in request_ids:
+            self.add(request_id)
+
+class Subscriber:
+    """A /stream client: bounded event queue, dropped when it falls behind"""
+
+    __slots__ = ('queue', 'dropped')
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.dropped = False
+
+# Court registry: every court of the club served by one process, O(1) lookup per request
+courts = {}
+courts_lock = threading.Lock()
+
+def get_court(court_id, create=False):
+    """Look up a court, None when unknown; with create, make it (None once MAX_COURTS courts are in play).
+
+    Only writes create courts: a read for a court id nobody scores on (a typo,
+    a URL scan) must not take one of the MAX_COURTS slots.
+    """
+    court = courts.get(court_id)
+    if court is not None:
+        court.last_used = time.monotonic()
+        if courts.get(court_id) is court:  # Not evicted meanwhile, see evict_court()
+            return court
+    if not create:
+        return None
+    with courts_lock:
+        court = courts.get(court_id)
+        if court is None and len(courts) >= MAX_COURTS:
+            evict_idle_courts(COURT_EVICT_MIN_IDLE, limit=1)  # Make room: least recently used finished match
+        if court is None and len(courts) < MAX_COURTS:
+            court = courts[court_id] = Court(court_id)
+        if court is not None:
+            court.last_used = time.monotonic()
+    return court
+
+# NEW: Retention: idle finished matches leave memory, see enable_retention()
+retention_stats = {'evicted': 0, 'over_budget': False, 'memory': None}  # memory: last sweep's memory_report()
+
+def evictable(court, now, min_idle):
+    """A finished match that nobody watches and no request touched for min_idle seconds"""
+    return court.game_state['match_won'] and not court.subscribers and now - court.last_used >= min_idle
+
+def evict_idle_courts(min_idle, limit=None):
+    """Drop evictable courts, least recently used first, returns how many (call with courts_lock held).
+
+    Their matches are already archived; a request for the court id later
+    starts a fresh match. A standby only drops the courts its primary evicts.
+    """
+    if standby_read_only():
+        return 0
+    now = time.monotonic()
+    evicted = 0
+    for court in sorted((court for court in courts.values() if evictable(court, now, min_idle)),
+                        key=lambda court: court.last_used):
+        if limit is not None and evicted >= limit:
+            break
+        evicted += evict_court(court, min_idle)
+    retention_stats['evicted'] += evicted
+    return evicted
+
+def evict_court(court, min_idle):
+    """Log the eviction of an idle court and drop it, returns whether it went (call with courts_lock held).
+
+    get_court() touches a court before checking it is still registered, so a
+    request that looked it up just before the removal is seen by the check
+    after it and the court stays.
+    """
+    if not court.lock.acquire(blocking=False):
+        return False  # In use, so not idle
+    try:
+        if not evictable(court, time.monotonic(), min_idle):
+            return False
+        del courts[court.court_id]
+        if not evictable(court, time.monotonic(), min_idle):
+            courts[court.court_id] = court  # A request picked it up meanwhile
+            return False
+        log_event(court, 'evict', time.time_ns())
+    finally:
+        court.lock.release()
+    log.info("🧹 Idle finished match evicted", court=court.court_id, idle_s=round(time.monotonic() - court.last_used))
+    return True
+
+def drop_court(court):
+    """Remove a court evicted on the primary or in the event log, closing its streams (call with court.lock held)"""
+    with courts_lock:
+        if courts.get(court.court_id) is court:
+            del courts[court.court_id]
+    for subscriber in list(court.subscribers):
+        # Wake the stream so it ends, the browser reconnects to the court's next match
+        subscriber.dropped = True
+        try:
+            subscriber.queue.put_nowait(': evicted\n\n')
+        except queue.Full:
+            pass
+    court.subscribers.clear()
+
+def scoreboard(court):
+    """Compact scoreboard view of the court, without history"""
+    game_state = court.game_state
+    board = {field: game_state[field] for field in SCOREBOARD_FIELDS}
+    board['set_history'] = list(board['set_history'])  # Appended to in place, keep the published copy apart
+    board['match_storage_available'] = court.match_storage['match_completed'] and not court.match_storage['display_shown']
+    return board
+
+def format_event(event, payload):
+    """Serialize one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+def snapshot_event(court):
+    """The whole scoreboard as a 'snapshot' event, which screens take as is whatever its version"""
+    event = dict(scoreboard(court), court_id=court.court_id, version=court.version)
+    term = replication_term()
+    if term is not None:
+        event['term'] = term  # Screens that saw a newer term ignore it: this primary was fenced off
+    return format_event('snapshot', event)
+
+def push_snapshot(court):
+    """Send every subscriber a snapshot of the court as it is now (call with court.lock held)"""
+    event = snapshot_event(court)
+    for subscriber in list(court.subscribers):
+        try:
+            subscriber.queue.put_nowait(event)
+        except queue.Full:
+            subscriber.dropped = True
+            court.subscribers.discard(subscriber)
+
+def publish(court, request_ids=None):
+    """Record a state change: bump the version, refresh the reader view and push the changed fields to subscribers (call with court.lock held).
+
+    The version is the court's sequence number: every delta carries it, plus
+    the client request IDs it applied, so a screen scoring optimistically
+    knows which of its points a delta confirms. Returns the changed fields.
+
+    Every version gets its event, even one with no scoreboard field changed
+    (e.g. only the stats or history did): a skipped version reads as a missed
+    change and sends screens back to /game_state.
+    """
+    court.version += 1
+    court.view = CourtView(court)
+    board = scoreboard(court)
+    delta = {key: value for key, value in board.items() if court.published.get(key) != value}
+    court.published = board
+    if not court.subscribers:
+        return delta
+
+    # Serialize once per change, however many screens are watching
+    event = dict(delta, court_id=court.court_id, version=court.version)
+    if request_ids:
+        event['request_ids'] = request_ids
+    term = replication_term()
+    if term is not None:
+        event['term'] = term
+    event = format_event('delta', event)
+    for subscriber in list(court.subscribers):
+        try:
+            subscriber.queue.put_nowait(event)
+        except queue.Full:
+            # Slow client: drop it, the browser reconnects and gets a fresh snapshot
+            subscriber.dropped = True
+            court.subscribers.discard(subscriber)
+    return delta
+
+# NEW: Write-ahead event log, enabled by enable_event_log()
+event_log = None
+
+def log_event(court, event_type, at_ns, **fields):
+    """Append a state change to the event log before applying it, and ship it to a standby (call with court.lock held)"""
+    if event_log is not None:
+        # version: the one publish() gives this change, so replay and standbys number it the same
+        event = dict(fields, type=event_type, court=court.court_id, ts=at_ns, version=court.version + 1)
+        court.applied_seq = event_log.append(event)
+        if replication_primary is not None:
+            replication_primary.ship(event)
+
+def apply_logged_event(court, event):
+    """Apply one logged state change (call with court.lock held)"""
+    if event['type'] == 'add_point':
+        apply_add_point(court, event['team'], event['ts'])
+        if 'request_id' in event:
+            court.recent_requests.add(event['request_id'])
+    elif event['type'] == 'reset_match':
+        rules = Rules(**event['rules']) if 'rules' in event else None
+        apply_reset_match(court, event['ts'], rules, event.get('teams'), event.get('first_server'))
+    elif event['type'] == 'undo':
+        apply_undo(court, event['ts'])
+    elif event['type'] == 'redo':
+        apply_redo(court)
+    elif event['type'] == 'mark_match_displayed':
+        apply_mark_match_displayed(court, event['wipe_immediately'])
+    elif event['type'] == 'evict':
+        drop_court(court)
+
+def replay_event(event):
+    """Re-apply one logged state change during recovery"""
+    court = get_court(event['court'], create=True)
+    if court is None or event['seq'] <= court.applied_seq:
+        return  # Already contained in the snapshot
+
+    with court.lock:
+        apply_logged_event(court, event)
+        court.applied_seq = event['seq']
+        court.version = event.get('version', court.version + 1)  # Logged by older versions without it
+        court.view = CourtView(court)
+        court.published = scoreboard(court)
+
+def snapshot_courts():
+    """Capture every court for an event log snapshot"""
+    snapshot = {'courts': {}}
+    for court in list(courts.values()):
+        with court.lock:
+            snapshot['courts'][court.court_id] = {
+                'rules': court.rules._asdict(),
+                'state': court.state,
+                'game_state': copy.deepcopy(court.game_state),
+                'match_storage': copy.deepcopy(court.match_storage),
+                'history': court.history.dump(),
+                'stats': court.stats.dump(),
+                'timeline': court.timeline.dump(),
+                'ended_ns': court.ended_ns,
+                'updated_ns': court.updated_ns,
+                'applied_seq': court.applied_seq,
+                'version': court.version,
+                'request_ids': court.recent_requests.dump()
+            }
+    return snapshot
+
+def load_snapshot(snapshot):
+    """Restore every court from an event log snapshot"""
+    for court_id, data in snapshot['courts'].items():
+        court = get_court(court_id, create=True)
+        if court is None:
+            continue
+        with court.lock:
+            court.rules = Rules(**data['rules'])
+            court.state = state_from_list(data['state'])
+            # Snapshots from older versions lack newer keys (e.g. teams): start from the defaults
+            game_state = dict(new_game_state(rules=court.rules), **data['game_state'])
+            court.match_storage = data['match_storage']
+            court.history = PointLog.load(data['history'])
+            # ... and kept the match times as ISO text in the game state
+            end_time = game_state.pop('match_end_time', None)
+            last_updated = game_state.pop('last_updated', None)
+            game_state.pop('match_start_time', None)
+            court.game_state = game_state
+            court.ended_ns = data['ended_ns'] if 'ended_ns' in data else iso_to_ns(end_time)
+            court.updated_ns = data.get('updated_ns') or iso_to_ns(last_updated) or court.history.started_wall_ns
+            court.stats = MatchStats.load(data['stats'])
+            court.timeline = PointTimeline.load(data['timeline'])
+            court.applied_seq = data['applied_seq']
+            court.version = data.get('version', court.version)
+            court.recent_requests.load(data.get('request_ids', []))
+            court.view = CourtView(court)
+            court.published = scoreboard(court)
+
+# NEW: Archive of completed matches, enabled by enable_archive()
+match_archive = None
+
+def enable_archive(path):
+    """Archive every completed match to the SQLite database at path"""
+    global match_archive
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    archive = MatchArchive(path)
+    atexit.register(archive.close)
+    match_archive = archive
+
+    log.info("🗄️ Match archive enabled", path=path)
+    return archive
+
+def enable_retention(data_dir, interval=RETENTION_INTERVAL):
+    """Spill long point logs under data_dir and sweep idle finished matches every interval seconds"""
+    spill_dir = os.path.join(data_dir, 'spill')
+    os.makedirs(spill_dir, exist_ok=True)
+    PointLog.spill_dir = spill_dir
+
+    def sweep_loop():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep_courts()
+            except Exception:
+                log.error("⚠️ Retention sweep failed", exc_info=True)
+
+    sweep_courts()  # Measure the memory report right away
+    threading.Thread(target=sweep_loop, name='padel-retention', daemon=True).start()
+    log.info("🧹 Retention enabled", history_memory_max=PointLog.memory_max, court_idle_ttl_s=COURT_IDLE_TTL,
+             memory_budget_mb=MEMORY_BUDGET // 2**20)
+
+def enable_event_log(data_dir):
+    """Rebuild all courts from the event log in data_dir, then log every change"""
+    global event_log
+
+    events = EventLog(data_dir)
+    from_snapshot, replayed = events.recover(load_snapshot, replay_event)
+    events.start(snapshot_courts)
+    atexit.register(events.close)
+    event_log = events
+
+    log.info("💾 Event log recovered", data_dir=data_dir, from_snapshot=from_snapshot, replayed=replayed,
+             recovery_ms=events.recovery_ms)
+    return events
+
+# NEW: Hot-standby replication, enabled by enable_replication_primary() or enable_standby()
+replication_primary = None   # Ships logged events to standbys
+replication_standby = None   # Follows a primary, read-only until promoted
+
+TERM_FILE = 'term.json'  # Replication term in the data directory, and the newer one that fenced this primary off
+
+def standby_read_only():
+    """Whether this process may not change state: a standby not yet promoted, or a primary fenced off"""
+    return ((replication_standby is not None and not replication_standby.promoted.is_set())
+            or (replication_primary is not None and replication_primary.fenced_term is not None))
+
+def replication_term():
+    """Term this process serves in, None without replication"""
+    if replication_primary is not None:
+        return replication_primary.term
+    if replication_standby is not None:
+        return replication_standby.term
+    return None
+
+def load_term():
+    """(term, fenced_term) persisted in the event log's directory, (0, None) when there is none"""
+    path = os.path.join(os.path.dirname(event_log.log_path), TERM_FILE) if event_log is not None else None
+    if path is None or not os.path.exists(path):
+        return 0, None
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data['term'], data.get('fenced_term')
+
+def save_term(term, fenced_term=None):
+    """Persist the replication term (fsync'ed) before acting on it"""
+    if event_log is None:
+        return
+    path = os.path.join(os.path.dirname(event_log.log_path), TERM_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'term': term, 'fenced_term': fenced_term}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+def apply_replicated_event(event):
+    """Apply a state change shipped by the primary: log it locally, apply it and push it to the screens"""
+    court = get_court(event['court'], create=True)
+    if court is None:
+        return
+    fields = {key: value for key, value in event.items() if key not in ('type', 'court', 'ts', 'seq', 'version')}
+    with court.lock:
+        version = event.get('version', court.version + 1)
+        # The primary publishes a batch of points as one change: its events share a version
+        repeated = version == court.version
+        court.version = version - 1  # publish() brings it to the primary's version
+        log_event(court, event['type'], event['ts'], **fields)
+        apply_logged_event(court, event)
+        if repeated:
+            # A second delta with the same version would be ignored by the screens
+            court.version = version
+            court.view = CourtView(court)
+            court.published = scoreboard(court)
+            push_snapshot(court)
+        else:
+            publish(court, [event['request_id']] if 'request_id' in event else None)
+
+def load_replicated_snapshot(snapshot):
+    """Replace the courts with the primary's snapshot and persist it in the local event log"""
+    for court in list(courts.values()):
+        if court.court_id not in snapshot['courts']:
+            with court.lock:
+                # Evicted on the primary while this standby was away
+                log_event(court, 'evict', time.time_ns())
+                drop_court(court)
+    load_snapshot(snapshot)
+    for court_id in snapshot['courts']:
+        court = courts.get(court_id)
+        if court is None:
+            continue
+        with court.lock:
+            # Sequence numbers are the primary's: local events so far are superseded by the snapshot
+            court.applied_seq = event_log.seq if event_log is not None else 0
+            push_snapshot(court)  # The version is the primary's too, it may be lower than the screens saw
+    if event_log is not None:
+        event_log.request_snapshot()
+
+def enable_replication_primary(port, host='0.0.0.0', term=None):
+    """Ship every logged state change to standbys connecting on port (needs the event log)"""
+    global replication_primary
+
+    if event_log is None:
+        raise RuntimeError('Replication ships the event log, enable it first')
+    fenced_term = None
+    if term is None:
+        term, fenced_term = load_term()
+    primary = ReplicationPrimary(snapshot_courts, host, port, term,
+                                 on_fence=lambda new_term: save_term(primary.term, new_term))
+    primary.fenced_term = fenced_term
+    primary.start()
+    atexit.register(primary.close)
+    replication_primary = primary
+
+    log.info("🔁 Replication primary listening", host=host, port=primary.address[1], term=term)
+    if fenced_term is not None:
+        log.warning("⛔ Fenced off since a newer primary took over: read-only. Follow it with "
+                    f"PADEL_REPLICA_OF, or remove {TERM_FILE} to serve again", term=term, fenced_term=fenced_term)
+    return primary
+
+def enable_standby(primary, listen_port=None):
+    """Follow the primary at host:port; once promoted, ship to a new standby on listen_port if given"""
+    global replication_standby
+
+    def on_promote(term):
+        save_term(term)  # Before any write in the new term
+        if listen_port:
+            enable_replication_primary(listen_port, term=term)
+
+    term, fenced_term = load_term()
+    standby = ReplicationStandby(primary, load_replicated_snapshot, apply_replicated_event, on_promote,
+                                 term=max(term, fenced_term or 0)).start()
+    replication_standby = standby
+
+    log.info("🔁 Standby following the primary", primary=primary, term=standby.term,
+             failover_timeout=standby.failover_timeout or 'manual promotion only')
+    return standby
+
+# NEW: Datagram listener for the court buttons, enabled by enable_button_listener()
+button_listener = None
+
+def press_button(court_id, team, press_id):
+    """Score a button press like /add_point, the press id as its request_id; returns the result for the ack"""
+    if standby_read_only():
+        return 'standby'
+    court = get_court(court_id, create=True)
+    if court is None:
+        return 'unknown_court'
+    request_id = f'button-{team}-{press_id}'
+    with court.lock:
+        action_type = score_point(court, team, request_id)
+        if action_type is None:
+            return 'match_over'
+        if action_type == 'duplicate':
+            return 'duplicate'
+        publish(court, [request_id])
+        game_state = court.view.game_state
 
-def calculate_match_statistics():
-    """Calculate comprehensive match statistics"""
-    global game_state, match_storage
+    if game_state['match_won']:
+        log.info("🏆 Match won", court=court.court_id, winner=game_state['winner']['team_name'])
+    elif log.enabled(logging.DEBUG):
+        log.debug("🔘 Button press", court=court.court_id, team=team, press_id=press_id, action=action_type)
+    return 'applied'
+
+def enable_button_listener(port, host='0.0.0.0', debounce_ms=DEBOUNCE_MS):
+    """Score presses of the court buttons received as UDP packets on port"""
+    global button_listener
+
+    listener = ButtonListener(press_button, host, port, debounce_ms).start()
+    atexit.register(listener.close)
+    button_listener = listener
+
+    log.info("🔘 Button listener enabled", host=host, port=listener.address[1], debounce_ms=debounce_ms)
+    return listener
+
+def versioned_json(court, key, build, cache=True, serialized=False, slot=None):
+    """JSON response built from the court's current view and tagged with its version.
+
+    build(view) runs without the court lock, so reads never hold up scoring.
+    A client whose If-None-Match holds the current ETag gets an empty 304, and
+    with cache set the body is serialized at most once per version. With
+    serialized set, build(view) returns the JSON text itself. Variants of one
+    endpoint can share a cache slot, so only the latest of them is kept.
+    """
+    slot = slot or key
+    view = court.view
+    etag = f'{view.court_id}.{view.version}.{key}'
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        cached = court.body_cache.get(slot) if cache else None
+        if cached is not None and cached[0] == etag:
+            body = cached[1]
+        else:
+            body = build(view) if serialized else app.json.dumps(build(view))
+            if cache:
+                court.body_cache[slot] = (etag, body)
+        response = app.response_class(body, mimetype='application/json')
 
-    # Calculate total points won by each team
-    black_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'black'])
-    yellow_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'yellow'])
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Always revalidate, usually a 304
+    return response
 
-    # Calculate total games won
-    black_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'black'])
-    yellow_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'yellow'])
+def wants_full():
+    """Whether the request asks for the previous response shape with the whole point log (?full=1)"""
+    return request.args.get('full') in ('1', 'true')
+
+def court_not_found(court_id):
+    """Error response for an unknown court"""
+    return jsonify({
+        'success': False,
+        'error': f'Court {court_id} not available'
+    }), 404
+
+def add_to_history(court, action, team, score_before, score_after, game_before, game_after, set_before, set_after, at_ns=None):
+    """Add detailed action to the court's match history"""
+    court.history.append(action, team, score_before, score_after, game_before, game_after, set_before, set_after, at_ns)
+    court.stats.record(action, team)
+
+# An expanded history entry as /match_history sends it, to check ?fields= against
+HISTORY_ENTRY_SHAPE = dict(PointLog(0).expand((0,) * 15), seq=0)
+
+def project_entry(entry, fields):
+    """Keep only the dotted field paths of a history entry (e.g. 'team', 'scores.after')"""
+    projected = {}
+    for path in fields:
+        keys = path.split('.')
+        value = entry
+        for key in keys:
+            value = value[key]  # KeyError: unknown field
+        target = projected
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return projected
+
+def sync_scores(court):
+    """Copy the scoring engine state into the court's game state"""
+    state = court.state
+    game_state = court.game_state
+    game_state['score_1'], game_state['score_2'] = display_score(state)
+    game_state['point_1'] = state.point_1
+    game_state['point_2'] = state.point_2
+    game_state['game_1'] = state.game_1
+    game_state['game_2'] = state.game_2
+    game_state['set_1'] = state.set_1
+    game_state['set_2'] = state.set_2
+    game_state['tiebreak'] = state.tiebreak
+
+def full_game_state(court):
+    """Game state with the point log expanded to its JSON shape"""
+    state = court.game_state.copy()
+    state.update(match_times(court))
+    state['match_history'] = court.history.to_list()
+    return state
+
+def lean_game_state(view):
+    """Fixed-size /game_state: scores, sets, winner and match info, without the point log"""
+    match_storage = view.match_storage
+    state = view.game_state.copy()
+    state.update(match_times(view))
+    state['match_storage_available'] = match_storage['match_completed'] and not match_storage['display_shown']
+    state['version'] = view.version
+    state['history_length'] = len(view.history)  # The log itself is on /match_history
+    return state
+
+def calculate_match_statistics(court):
+    """Calculate comprehensive match statistics (of a court or its view).
+
+    The one source of the match totals: the winner display, /match_history
+    and the archive all take theirs from here.
+    """
+    game_state = court.game_state
+    state = court.state
+
+    # Total points won by each team, game and set winning points included (running counters, no history scan)
+    black_points, yellow_points = court.stats.rallies
+
+    # Total games won: finished sets plus the current one
+    black_games = sum(games[0] for games in state.set_scores) + state.game_1
+    yellow_games = sum(games[1] for games in state.set_scores) + state.game_2
 
     # Create detailed sets breakdown
     sets_breakdown = []
@@ -96,20 +820,19 @@ def calculate_match_statistics():
         'sets_breakdown': sets_breakdown
     }
 
-def store_match_data():
+def store_match_data(court):
     """Store complete match data for winner display"""
-    global game_state, match_storage
+    game_state = court.game_state
+    match_storage = court.match_storage
 
     if not game_state['match_won'] or not game_state['winner']:
         return
 
     # Calculate comprehensive statistics
-    stats = calculate_match_statistics()
+    stats = calculate_match_statistics(court)
 
     # Calculate match duration
-    start_time = datetime.fromisoformat(game_state['match_start_time'])
-    end_time = datetime.fromisoformat(game_state['match_end_time'])
-    duration_seconds = int((end_time - start_time).total_seconds())
+    duration_seconds = (court.ended_ns - court.history.started_wall_ns) // 10**9
     duration_minutes = duration_seconds // 60
     duration_text = f"{duration_minutes}m {duration_seconds % 60}s" if duration_minutes > 0 else f"{duration_seconds}s"
 
@@ -130,328 +853,517 @@ def store_match_data():
         'total_games_won': stats['total_games'],
         'sets_breakdown': stats['sets_breakdown'],
         'match_summary': create_match_summary(stats, sets_display),
-        'timestamp': game_state['match_end_time']
+        'rally_statistics': court.stats.summary(),
+        'timestamp': timestamp(court.ended_ns)
     }
     match_storage['display_shown'] = False
 
-    print(f"✅ Match data stored: {match_storage['match_data']['winner_name']} wins!")
-    print(f"📊 Final Score: {match_storage['match_data']['final_sets_score']}")
-    print(f"⏱️ Duration: {match_storage['match_data']['match_duration']}")
+    match_data = match_storage['match_data']
+    log.info("✅ Match data stored", court=court.court_id, winner=match_data['winner_name'],
+             final_score=match_data['final_sets_score'], duration=match_data['match_duration'])
 
 def create_match_summary(stats, sets_display):
     """Create a readable match summary"""
     sets_text = ", ".join(sets_display)
     return f"Sets: {sets_text} | Points: {stats['total_points']['black']}-{stats['total_points']['yellow']} | Games: {stats['total_games']['black']}-{stats['total_games']['yellow']}"
 
-def wipe_match_storage():
+def wipe_match_storage(court):
     """Clear match storage after display"""
-    global match_storage
-    match_storage = {
-        'match_completed': False,
-        'match_data': {
-            'winner_team': None,
-            'winner_name': None,
-            'final_sets_score': None,
-            'detailed_sets': [],
-            'match_duration': None,
-            'total_points_won': {'black': 0, 'yellow': 0},
-            'total_games_won': {'black': 0, 'yellow': 0},
-            'sets_breakdown': [],
-            'match_summary': None
-        },
-        'display_shown': False
+    court.match_storage = new_match_storage()
+    log.debug("🧹 Match storage wiped clean", court=court.court_id)
+
+def record_set_won(court, team, at_ns=None):
+    """Record a completed set in the game state and history"""
+    game_state = court.game_state
+    state = court.state
+    set_games = state.set_scores[-1]
+    game_state['set_history'].append(f"{set_games[0]}-{set_games[1]}")
+
+    # Add set win to history
+    set_after = (state.set_1, state.set_2)
+    set_before = (set_after[0] - (team == 'black'), set_after[1] - (team == 'yellow'))
+    add_to_history(court, 'set', team,
+                  (0, 0),  # Scores reset after set
+                  (0, 0),
+                  set_games,
+                  (0, 0),  # Games reset after set
+                  set_before,
+                  set_after,
+                  at_ns)
+
+    if state.winner is not None:
+        record_match_won(court, team, at_ns)
+
+def record_match_won(court, team, at_ns=None):
+    """Record the match winner and store match data for the winner display"""
+    game_state = court.game_state
+    state = court.state
+    code = TEAM_CODES[team]
+
+    game_state['match_won'] = True
+    court.ended_ns = at_ns
+    game_state['winner'] = {
+        'team': team,
+        'team_name': team_names(game_state)[team],
+        'final_sets': f"{state.set_1}-{state.set_2}",
+        'match_summary': ', '.join(game_state['set_history']),
+        'total_games_won': sum(games[code] for games in state.set_scores) + (state.game_1, state.game_2)[code],
+        'match_duration': calculate_match_duration(court)
     }
-    print("🧹 Match storage wiped clean")
-
-def check_set_winner():
-    """Check if a set is complete and update sets count"""
-    global game_state
 
-    # Check if either team won the set (6 games with at least 2-game lead)
-    if game_state['game_1'] >= 6 and game_state['game_1'] - game_state['game_2'] >= 2:
-        # Black team wins the set
-        set_before = (game_state['set_1'], game_state['set_2'])
-        game_state['set_1'] += 1
-        game_state['set_history'].append(f"{game_state['game_1']}-{game_state['game_2']}")
-
-        # Add set win to history
-        add_to_history('set', 'black', 
-                      (game_state['score_1'], game_state['score_2']),
-                      (0, 0),  # Scores reset after set
-                      (game_state['game_1'], game_state['game_2']),
-                      (0, 0),  # Games reset after set
-                      set_before,
-                      (game_state['set_1'], game_state['set_2']))
+    # Add match win to history
+    add_to_history(court, 'match', team,
+                  (0, 0),
+                  (0, 0),
+                  (state.game_1, state.game_2),
+                  (state.game_1, state.game_2),
+                  (state.set_1, state.set_2),
+                  (state.set_1, state.set_2),
+                  at_ns)
+
+    # Store detailed match data
+    store_match_data(court)
+    archive_match(court, at_ns)
+
+def team_names(game_state):
+    """Team names of a match (states from before team names existed get the defaults)"""
+    return game_state.get('teams', DEFAULT_TEAM_NAMES)
+
+def archive_match(court, ended_ns):
+    """Queue the just-completed match for the archive"""
+    if match_archive is None:
+        return
+    game_state = court.game_state
+    state = court.state
+    names = team_names(game_state)
+    totals = calculate_match_statistics(court)
+    started_ns = court.history.started_wall_ns
+    match_archive.save({
+        'court_id': court.court_id,
+        'started_ns': started_ns,
+        'ended_ns': ended_ns,
+        'started_at': timestamp(started_ns),
+        'ended_at': timestamp(ended_ns),
+        'played_on': datetime.fromtimestamp(ended_ns / 1e9).date().isoformat(),
+        'duration_s': (ended_ns - started_ns) // 10**9,
+        'black_team': names['black'],
+        'yellow_team': names['yellow'],
+        'winner': game_state['winner']['team'],
+        'sets_black': state.set_1,
+        'sets_yellow': state.set_2,
+        'games_black': totals['total_games']['black'],
+        'games_yellow': totals['total_games']['yellow'],
+        'points_black': totals['total_points']['black'],
+        'points_yellow': totals['total_points']['yellow'],
+        'set_history': json.dumps(game_state['set_history']),
+        'rules': json.dumps(game_state['rules']),
+        'history': court.history.to_bytes()
+    })
 
-        game_state['game_1'] = 0
-        game_state['game_2'] = 0
-        return check_match_winner()
+def calculate_match_duration(court):
+    """Calculate match duration in minutes"""
+    if court.ended_ns is not None:
+        total_minutes = (court.ended_ns - court.history.started_wall_ns) // (60 * 10**9)
+        return f"{total_minutes} minutes"
+    return "In progress"
 
-    elif game_state['game_2'] >= 6 and game_state['game_2'] - game_state['game_1'] >= 2:
-        # Yellow team wins the set
-        set_before = (game_state['set_1'], game_state['set_2'])
-        game_state['set_2'] += 1
-        game_state['set_history'].append(f"{game_state['game_1']}-{game_state['game_2']}")
+def apply_add_point(court, team, at_ns=None, redo=False):
+    """Score a point through the scoring engine (call with court.lock held), returns the action type.
 
-        # Add set win to history
-        add_to_history('set', 'yellow',
+    Returns None when the match is already over, so a replayed point never
+    lands on a finished match.
+    """
+    game_state = court.game_state
+    if game_state['match_won']:
+        return None
+    if at_ns is None:
+        at_ns = court.history.now_ns()
+
+    # Store state before the point for history
+    log_length = len(court.history)
+    before = court.state
+    score_before = (game_state['score_1'], game_state['score_2'])
+    game_before = (before.game_1, before.game_2)
+    set_before = (before.set_1, before.set_2)
+
+    after = court.state = apply_point(before, TEAM_CODES[team], court.rules)
+    set_won = len(after.set_scores) != len(before.set_scores)
+    game_won = set_won or (after.game_1, after.game_2) != game_before
+    action_type = 'game' if game_won else 'point'
+    court.stats.rally(team, game_won, at_ns, set_won, before.tiebreak)
+
+    sync_scores(court)
+    if set_won:
+        # Check if match is won as well
+        record_set_won(court, team, at_ns)
+
+    # Add to detailed history (only if not a match win, which adds its own history)
+    if not game_state['match_won']:
+        add_to_history(court, action_type, team,
+                      score_before,
                       (game_state['score_1'], game_state['score_2']),
-                      (0, 0),  # Scores reset after set
+                      game_before,
                       (game_state['game_1'], game_state['game_2']),
-                      (0, 0),  # Games reset after set
                       set_before,
-                      (game_state['set_1'], game_state['set_2']))
-
-        game_state['game_1'] = 0
-        game_state['game_2'] = 0
-        return check_match_winner()
-
-    return False
-
-def check_match_winner():
-    """Check if the match is complete (first to 2 sets wins)"""
-    global game_state
-
-    if game_state['set_1'] >= 2:
-        # Black team wins the match
-        game_state['match_won'] = True
-        game_state['match_end_time'] = datetime.now().isoformat()
-        game_state['winner'] = {
-            'team': 'black',
-            'team_name': 'BLACK TEAM',
-            'final_sets': f"{game_state['set_1']}-{game_state['set_2']}",
-            'match_summary': ', '.join(game_state['set_history']),
-            'total_games_won': sum(int(s.split('-')[0]) for s in game_state['set_history']) + game_state['game_1'],
-            'match_duration': calculate_match_duration()
-        }
-
-        # Add match win to history
-        add_to_history('match', 'black',
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['game_1'], game_state['game_2']),
-                      (game_state['game_1'], game_state['game_2']),
                       (game_state['set_1'], game_state['set_2']),
-                      (game_state['set_1'], game_state['set_2']))
-
-        # Store detailed match data
-        store_match_data()
-        return True
-
-    elif game_state['set_2'] >= 2:
-        # Yellow team wins the match
-        game_state['match_won'] = True
-        game_state['match_end_time'] = datetime.now().isoformat()
-        game_state['winner'] = {
-            'team': 'yellow',
-            'team_name': 'YELLOW TEAM',
-            'final_sets': f"{game_state['set_1']}-{game_state['set_2']}",
-            'match_summary': ', '.join(game_state['set_history']),
-            'total_games_won': sum(int(s.split('-')[1]) for s in game_state['set_history']) + game_state['game_2'],
-            'match_duration': calculate_match_duration()
-        }
+                      at_ns)
 
-        # Add match win to history
-        add_to_history('match', 'yellow',
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['game_1'], game_state['game_2']),
-                      (game_state['game_1'], game_state['game_2']),
-                      (game_state['set_1'], game_state['set_2']),
-                      (game_state['set_1'], game_state['set_2']))
-
-        # Store detailed match data
-        store_match_data()
-        return True
-
-    return False
+    if redo:
+        court.timeline.advance(after, court.stats)
+    else:
+        court.timeline.record(TEAM_CODES[team], game_won, at_ns, log_length, after, court.stats)
+
+    court.updated_ns = at_ns
+    return action_type
+
+def teams_from_dict(data):
+    """Validate team names {"black": ..., "yellow": ...}; a missing team keeps its default name"""
+    if not isinstance(data, dict):
+        raise ValueError('teams must be a JSON object')
+    unknown = set(data) - set(TEAM_CODES)
+    if unknown:
+        raise ValueError(f"Unknown team(s): {', '.join(sorted(unknown))}")
+    teams = dict(DEFAULT_TEAM_NAMES)
+    for team, name in data.items():
+        if not (isinstance(name, str) and 0 < len(name.strip()) <= TEAM_NAME_LENGTH):
+            raise ValueError(f'{team} name must be a string of 1 to {TEAM_NAME_LENGTH} characters')
+        teams[team] = name.strip()
+    if teams['black'] == teams['yellow']:
+        raise ValueError('Both teams have the same name')
+    return teams
+
+def parse_point(data):
+    """Validate a submitted point {"team": ..., "request_id": ...}, returns (team, request_id)"""
+    if not isinstance(data, dict):
+        raise ValueError('Point must be a JSON object')
+    team = data.get('team', 'black')
+    if team not in TEAM_CODES:
+        raise ValueError(f'Unknown team: {team}')
+    request_id = data.get('request_id')
+    if request_id is not None and not (isinstance(request_id, str) and 0 < len(request_id) <= REQUEST_ID_LENGTH):
+        raise ValueError(f'request_id must be a string of 1 to {REQUEST_ID_LENGTH} characters')
+    return team, request_id
+
+def score_point(court, team, request_id=None):
+    """Log and apply a submitted point unless its request_id was already applied (call with court.lock held).
+
+    Returns the action type, 'duplicate', or None when the match is already over.
+    """
+    if request_id is not None and request_id in court.recent_requests:
+        return 'duplicate'
+    if court.game_state['match_won']:
+        return None
+
+    at_ns = court.history.now_ns()
+    if request_id is None:
+        log_event(court, 'add_point', at_ns, team=team)
+    else:
+        log_event(court, 'add_point', at_ns, team=team, request_id=request_id)
+    action_type = apply_add_point(court, team, at_ns)
+    if request_id is not None:
+        court.recent_requests.add(request_id)
+    points_total.inc(court.court_id)
+    return action_type
+
+def apply_undo(court, at_ns=None):
+    """Take back the last point (call with court.lock held)"""
+    restore_position(court, court.timeline.cursor - 1, at_ns)
+
+def apply_redo(court):
+    """Re-apply the next undone point with its original time (call with court.lock held)"""
+    timeline = court.timeline
+    at_ns, _, point = timeline[timeline.cursor]
+    apply_add_point(court, TEAMS[point & 1], at_ns, redo=True)
+
+def restore_position(court, position, at_ns=None):
+    """Rewind the court to the match as it was after `position` points"""
+    timeline = court.timeline
+    if court.game_state['match_won'] and match_archive is not None:
+        # The winning point is being taken back: the match is no longer complete
+        match_archive.discard(court.court_id, timeline[timeline.cursor - 1][0])
+    state, stats, points, log_start = timeline.rewind(position)
+
+    # Short replay from the nearest checkpoint, never more than CHECKPOINT_INTERVAL points
+    log_end = timeline[position][1]
+    stats.recount(court.history.records(log_start, log_end))
+    for team_code, game_won, point_ns in points:
+        after = apply_point(state, team_code, court.rules)
+        stats.rally(TEAMS[team_code], game_won, point_ns, len(after.set_scores) != len(state.set_scores), state.tiebreak)
+        state = after
+
+    court.state = state
+    court.stats = stats
+    court.history.truncate(log_end)
+    timeline.cursor = position
+
+    game_state = court.game_state
+    sync_scores(court)
+    game_state['set_history'] = [f"{games_1}-{games_2}" for games_1, games_2 in state.set_scores]
+    if game_state['match_won']:
+        # Taking back the winning point reopens the match
+        game_state['match_won'] = False
+        game_state['winner'] = None
+        court.ended_ns = None
+        court.match_storage = new_match_storage()
+    court.updated_ns = court.history.now_ns() if at_ns is None else at_ns
+
+def apply_reset_match(court, at_ns=None, rules=None, teams=None, first_server=None):
+    """Reset the entire match including sets and history (call with court.lock held)"""
+    # Wipe any stored match data first
+    wipe_match_storage(court)
+
+    if rules is not None:
+        court.rules = rules
+    if teams is None:
+        teams = team_names(court.game_state)  # Same teams play on
+    court.state = NEW_MATCH
+    court.game_state = new_game_state(court.rules, teams)
+    court.history = PointLog(at_ns)
+    court.ended_ns = None
+    court.updated_ns = court.history.started_wall_ns
+    court.stats = MatchStats(first_server)
+    court.timeline = PointTimeline(court.state, court.stats)
+
+def apply_mark_match_displayed(court, wipe_immediately):
+    """Mark match data as displayed, optionally wiping it (call with court.lock held)"""
+    court.match_storage['display_shown'] = True
+    if wipe_immediately:
+        wipe_match_storage(court)
 
-def calculate_match_duration():
-    """Calculate match duration in minutes"""
-    if game_state['match_end_time']:
-        start = datetime.fromisoformat(game_state['match_start_time'])
-        end = datetime.fromisoformat(game_state['match_end_time'])
-        duration = end - start
-        total_minutes = int(duration.total_seconds() / 60)
-        return f"{total_minutes} minutes"
-    return "In progress"
+def static_response(asset, max_age):
+    """Serve a cached asset in the best encoding the client accepts, 304 when its ETag matches"""
+    encoding, body, etag = asset.select(request.accept_encodings)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype=asset.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={max_age}' if max_age else 'no-cache'
+    return response
 
 # Serve the final HTML file with enhanced logo
 @app.route('/')
 def serve_scoreboard():
     """Serve the final scoreboard with enhanced logo"""
-    return send_from_directory('.', 'padel_scoreboard.html')
+    asset = static_assets.get('padel_scoreboard.html')
+    if asset is None:
+        return send_from_directory('.', 'padel_scoreboard.html')
+    return static_response(asset, 0)  # Always revalidated, so new releases show up on reload
 
-# Serve static files (images) with better logging
+# Serve static files (images) from the in-memory asset cache
 @app.route('/<path:filename>')
 def serve_static_files(filename):
     """Serve static files like back.png and logo.png"""
-    if os.path.exists(filename):
-        print(f"✅ Serving {filename}")
-        return send_from_directory('.', filename)
+    asset = static_assets.get(filename)
+    if asset is not None:
+        return static_response(asset, 0 if filename.endswith(STATIC_REVALIDATED) else STATIC_MAX_AGE)
+    elif static_assets.allows(filename) and os.path.isfile(filename):
+        return send_from_directory('.', filename)  # Too large to keep in memory
     else:
-        print(f"⚠️ File not found: {filename}")
+        log.warning("⚠️ File not found", filename=filename)
         return f"File {filename} not found", 404
 
 # API endpoint to add point with detailed history tracking
-@app.route('/add_point', methods=['POST'])
-def add_point():
+@app.route('/add_point', methods=['POST'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/add_point', methods=['POST'])
+def add_point(court_id):
     """Add a point with complete tennis scoring and detailed history tracking"""
-    global game_state
-
-    # Check if match is already won
-    if game_state['match_won']:
-        return jsonify({
-            'success': False,
-            'error': 'Match is already completed',
-            'winner': game_state['winner'],
-            'match_won': True
-        }), 400
+    court = get_court(court_id, create=True)
+    if court is None:
+        return court_not_found(court_id)
 
     try:
-        data = request.get_json()
-        team = data.get('team', 'black')
-
-        # Store state before the point for history
-        score_before = (game_state['score_1'], game_state['score_2'])
-        game_before = (game_state['game_1'], game_state['game_2'])
-        set_before = (game_state['set_1'], game_state['set_2'])
-
-        if team == 'black':
-            # Tennis scoring system: 0, 15, 30, 40, Game
-            current_score = game_state['score_1']
-
-            if current_score == 0:
-                game_state['score_1'] = 15
-                action_type = 'point'
-            elif current_score == 15:
-                game_state['score_1'] = 30
-                action_type = 'point'
-            elif current_score == 30:
-                game_state['score_1'] = 40
-                action_type = 'point'
-            elif current_score == 40:
-                # Win the game
-                game_state['game_1'] += 1
-                game_state['score_1'] = 0
-                game_state['score_2'] = 0
-                game_state['point_1'] = 0
-                game_state['point_2'] = 0
-                action_type = 'game'
-
-                # Check if set is won and potentially match
-                match_won = check_set_winner()
-
-            # Increment point counter
-            game_state['point_1'] += 1
-
-        elif team == 'yellow':
-            # Tennis scoring system for yellow team
-            current_score = game_state['score_2']
-
-            if current_score == 0:
-                game_state['score_2'] = 15
-                action_type = 'point'
-            elif current_score == 15:
-                game_state['score_2'] = 30
-                action_type = 'point'
-            elif current_score == 30:
-                game_state['score_2'] = 40
-                action_type = 'point'
-            elif current_score == 40:
-                # Win the game
-                game_state['game_2'] += 1
-                game_state['score_1'] = 0
-                game_state['score_2'] = 0
-                game_state['point_1'] = 0
-                game_state['point_2'] = 0
-                action_type = 'game'
-
-                # Check if set is won and potentially match
-                match_won = check_set_winner()
-
-            # Increment point counter
-            game_state['point_2'] += 1
-
-        # Add to detailed history (only if not set/match win, which adds their own history)
-        if action_type in ['point', 'game'] and not game_state['match_won']:
-            add_to_history(action_type, team,
-                          score_before,
-                          (game_state['score_1'], game_state['score_2']),
-                          game_before,
-                          (game_state['game_1'], game_state['game_2']),
-                          set_before,
-                          (game_state['set_1'], game_state['set_2']))
-
-        game_state['last_updated'] = datetime.now().isoformat()
-
-        # Log the action with detailed match info
-        if game_state['match_won']:
-            print(f"🏆 MATCH WON by {game_state['winner']['team_name']}!")
-            print(f"📊 Detailed match data stored for winner display")
-        else:
-            print(f"{action_type.title()} won by {team} team.")
-            print(f"Current state: {game_state['score_1']}-{game_state['score_2']} | Games: {game_state['game_1']}-{game_state['game_2']} | Sets: {game_state['set_1']}-{game_state['set_2']}")
-
-        # Return response with match storage info
+        # NEW: optional client request_id, so a retried request is not counted twice
+        try:
+            team, request_id = parse_point(request.get_json())
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        # The point is applied atomically: engine, history, statistics and event log under one lock
+        with court.lock:
+            action_type = score_point(court, team, request_id)
+
+            # Check if match is already won
+            if action_type is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Match is already completed',
+                    'winner': court.game_state['winner'],
+                    'match_won': True
+                }), 400
+
+            delta = {}
+            if action_type != 'duplicate':
+                delta = publish(court, [request_id] if request_id is not None else None)
+            view = court.view
+
+        # Log the action and build the response from the snapshot, outside the lock
+        game_state = view.game_state
+        if action_type == 'duplicate':
+            log.info("🔁 Duplicate point ignored", court=court.court_id, request_id=request_id)
+        elif game_state['match_won']:
+            log.info("🏆 Match won", court=court.court_id, winner=game_state['winner']['team_name'])
+        elif log.enabled(logging.DEBUG):
+            log.debug(f"{action_type.title()} won", court=court.court_id, team=team,
+                      score=f"{game_state['score_1']}-{game_state['score_2']}",
+                      games=f"{game_state['game_1']}-{game_state['game_2']}",
+                      sets=f"{game_state['set_1']}-{game_state['set_2']}")
+
+        # NEW: Compact response: the sequence number, what changed and the scoreboard, not the whole log
         response_data = {
             'success': True,
-            'message': f'Point added to {team} team',
-            'game_state': game_state,
+            'message': f'Point already applied (request {request_id})' if action_type == 'duplicate' else f'Point added to {team} team',
+            'court_id': court.court_id,
+            'duplicate': action_type == 'duplicate',
+            'action': None if action_type == 'duplicate' else action_type,
+            'version': view.version,  # Matches the version of the /stream delta for this point
+            'delta': delta,
+            'scoreboard': scoreboard(view),
             'match_won': game_state['match_won'],
             'winner': game_state['winner'] if game_state['match_won'] else None,
-            'match_stored': match_storage['match_completed'] and not match_storage['display_shown']
+            'match_stored': view.match_storage['match_completed'] and not view.match_storage['display_shown']
         }
+        if wants_full():
+            response_data['game_state'] = full_game_state(view)  # Previous response shape
 
         return jsonify(response_data)
 
     except Exception as e:
-        print(f"Error adding point: {str(e)}")
+        log.error("Error adding point", exc_info=True, court=court_id)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+# NEW: Batch point submission, e.g. a scoring tablet's offline queue
+@app.route('/add_points', methods=['POST'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/add_points', methods=['POST'])
+def add_points(court_id):
+    """Apply several points in order in one request, skipping request IDs already applied"""
+    court = get_court(court_id, create=True)
+    if court is None:
+        return court_not_found(court_id)
+
+    data = request.get_json(silent=True) or {}
+    points = data.get('points')
+    if not isinstance(points, list) or not 1 <= len(points) <= BATCH_MAX:
+        return jsonify({
+            'success': False,
+            'error': f'points must be a list of 1 to {BATCH_MAX} points'
+        }), 400
+    parsed = []
+    for index, point in enumerate(points):
+        try:
+            parsed.append(parse_point(point))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Point {index}: {e}'
+            }), 400
+
+    # The whole batch is applied under one lock and published as one change
+    results = []
+    with court.lock:
+        for team, request_id in parsed:
+            action_type = score_point(court, team, request_id)
+            if action_type is None:
+                status = 'rejected'  # Match already completed
+            elif action_type == 'duplicate':
+                status = 'duplicate'
+            else:
+                status = 'applied'
+            results.append({
+                'request_id': request_id,
+                'team': team,
+                'status': status,
+                'action': action_type if status == 'applied' else None
+            })
+        applied = sum(result['status'] == 'applied' for result in results)
+        if applied:
+            publish(court, [result['request_id'] for result in results
+                            if result['status'] == 'applied' and result['request_id'] is not None])
+        view = court.view
+
+    game_state = view.game_state
+    duplicates = sum(result['status'] == 'duplicate' for result in results)
+    log.info("📦 Point batch", court=court.court_id, points=len(results), applied=applied, duplicates=duplicates)
+    response_data = {
+        'success': True,
+        'court_id': court.court_id,
+        'applied': applied,
+        'duplicates': duplicates,
+        'rejected': len(results) - applied - duplicates,
+        'results': results,
+        'version': view.version,
+        'scoreboard': scoreboard(view),
+        'match_won': game_state['match_won'],
+        'winner': game_state['winner'] if game_state['match_won'] else None,
+        'match_stored': view.match_storage['match_completed'] and not view.match_storage['display_shown']
+    }
+    if wants_full():
+        response_data['game_state'] = full_game_state(view)
+    return jsonify(response_data)
+
 # NEW: API endpoint to get stored match data for winner display
-@app.route('/get_match_data', methods=['GET'])
-def get_match_data():
+@app.route('/get_match_data', methods=['GET'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/get_match_data', methods=['GET'])
+def get_match_data(court_id):
     """Get detailed match data for winner display"""
-    global match_storage
+    court = get_court(court_id)
+    if court is None:
+        return court_not_found(court_id)
 
-    if not match_storage['match_completed']:
+    if not court.view.match_storage['match_completed']:
         return jsonify({
             'success': False,
             'error': 'No completed match data available'
         }), 404
 
-    return jsonify({
-        'success': True,
-        'match_data': match_storage['match_data'],
-        'display_shown': match_storage['display_shown']
-    })
+    def build(view):
+        match_storage = view.match_storage
+        return {
+            'success': match_storage['match_completed'],
+            'match_data': match_storage['match_data'],
+            'display_shown': match_storage['display_shown']
+        }
+
+    return versioned_json(court, 'match_data', build)
 
 # NEW: API endpoint to mark match data as displayed and wipe it
-@app.route('/mark_match_displayed', methods=['POST'])
-def mark_match_displayed():
+@app.route('/mark_match_displayed', methods=['POST'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/mark_match_displayed', methods=['POST'])
+def mark_match_displayed(court_id):
     """Mark match data as displayed and wipe storage"""
-    global match_storage
+    court = get_court(court_id)
+    if court is None:
+        return court_not_found(court_id)
 
-    if not match_storage['match_completed']:
-        return jsonify({
-            'success': False,
-            'error': 'No match data to mark as displayed'
-        }), 400
+    with court.lock:
+        match_storage = court.match_storage
 
-    match_storage['display_shown'] = True
+        if not match_storage['match_completed']:
+            return jsonify({
+                'success': False,
+                'error': 'No match data to mark as displayed'
+            }), 400
 
-    # Optional: Wipe immediately or after a delay
-    wipe_immediately = request.get_json().get('wipe_immediately', True)
+        # Optional: Wipe immediately or after a delay
+        wipe_immediately = request.get_json().get('wipe_immediately', True)
 
-    if wipe_immediately:
-        wipe_match_storage()
-        message = 'Match data marked as displayed and wiped'
-    else:
-        message = 'Match data marked as displayed'
+        log_event(court, 'mark_match_displayed', court.history.now_ns(), wipe_immediately=wipe_immediately)
+        apply_mark_match_displayed(court, wipe_immediately)
+
+        if wipe_immediately:
+            message = 'Match data marked as displayed and wiped'
+        else:
+            message = 'Match data marked as displayed'
+        publish(court)
 
     return jsonify({
         'success': True,
@@ -459,134 +1371,764 @@ def mark_match_displayed():
     })
 
 # API endpoint to get current complete game state
-@app.route('/game_state', methods=['GET'])
-def get_game_state():
-    """Get the current complete game state including sets and winner"""
-    response_data = game_state.copy()
-    # Add match storage status
-    response_data['match_storage_available'] = match_storage['match_completed'] and not match_storage['display_shown']
-    return jsonify(response_data)
+@app.route('/game_state', methods=['GET'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/game_state', methods=['GET'])
+def get_game_state(court_id):
+    """Get the current game state including sets and winner (?full=1 adds the whole point log)"""
+    court = get_court(court_id)
+    if court is None:
+        return court_not_found(court_id)
+
+    # NEW: The scoreboard only needs the fixed-size state, serialized once per change
+    if not wants_full():
+        return versioned_json(court, 'game_state', lambda view: view.lean_json(), cache=False, serialized=True)
+
+    def build(view):
+        match_storage = view.match_storage
+        response_data = full_game_state(view)
+        # Add match storage status
+        response_data['match_storage_available'] = match_storage['match_completed'] and not match_storage['display_shown']
+        response_data['version'] = view.version
+        return response_data
+
+    return versioned_json(court, 'game_state_full', build)
 
 # Match history endpoint
-@app.route('/match_history', methods=['GET'])
-def get_match_history():
+@app.route('/match_history', methods=['GET'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/match_history', methods=['GET'])
+def get_match_history(court_id):
     """Get detailed match history and statistics"""
-    global game_state
+    court = get_court(court_id)
+    if court is None:
+        return court_not_found(court_id)
+
+    # NEW: Cursor paging (?since=<seq>&limit=N) and field projection (?fields=team,scores.after)
+    # An undo rewrites the history from some seq on and starts a new paging generation:
+    # pass back ?generation=<paging.generation> and a stale cursor restarts from seq 0
+    paged = 'since' in request.args or 'limit' in request.args
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        generation = int(request.args['generation']) if 'generation' in request.args else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'since, limit and generation must be integers'
+        }), 400
+    if since < 0 or not 1 <= limit <= HISTORY_PAGE_MAX:
+        return jsonify({
+            'success': False,
+            'error': f'since must be >= 0 and limit between 1 and {HISTORY_PAGE_MAX}'
+        }), 400
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    try:
+        project_entry(HISTORY_ENTRY_SHAPE, fields)  # Every entry has this shape
+    except (KeyError, TypeError):
+        return jsonify({
+            'success': False,
+            'error': f'Unknown history field in fields={request.args.get("fields")}'
+        }), 400
 
-    # Calculate statistics
-    black_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'black'])
-    yellow_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'yellow'])
+    def build(view):
+        game_state = view.game_state
+        history = view.history
+        stats = view.stats
+
+        total = len(history)
+        restarted = generation is not None and generation != history.generation
+        start = 0 if restarted else since
+        stop = min(start + limit, total) if paged else total
+        detailed_history = []
+        for seq, entry in enumerate(history.entries(start, stop), start):
+            entry['seq'] = seq
+            detailed_history.append(project_entry(entry, fields) if fields else entry)
+
+        # Statistics from the running counters, the same totals as the winner display and the archive
+        totals = calculate_match_statistics(view)
+        black_points = totals['total_points']['black']
+        yellow_points = totals['total_points']['yellow']
+
+        black_games = totals['total_games']['black']
+        yellow_games = totals['total_games']['yellow']
+
+        black_sets = stats.count('set', 'black')
+        yellow_sets = stats.count('set', 'yellow')
+
+        # Match info
+        times = match_times(view)
+        match_info = {
+            'start_time': times['match_start_time'],
+            'end_time': times['match_end_time'],
+            'duration': calculate_match_duration(view),
+            'winner': game_state['winner'] if game_state['match_won'] else None,
+            'match_completed': game_state['match_won'],
+            'total_actions': total
+        }
 
-    black_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'black'])
-    yellow_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'yellow'])
+        # Team statistics
+        statistics = {
+            'black_team_stats': {
+                'points_won': black_points,
+                'games_won': black_games,
+                'sets_won': black_sets,
+                'current_score': game_state['score_1'],
+                'current_games': game_state['game_1'],
+                'current_sets': game_state['set_1']
+            },
+            'yellow_team_stats': {
+                'points_won': yellow_points,
+                'games_won': yellow_games,
+                'sets_won': yellow_sets,
+                'current_score': game_state['score_2'],
+                'current_games': game_state['game_2'],
+                'current_sets': game_state['set_2']
+            }
+        }
 
-    black_sets = len([h for h in game_state['match_history'] if h['action'] == 'set' and h['team'] == 'black'])
-    yellow_sets = len([h for h in game_state['match_history'] if h['action'] == 'set' and h['team'] == 'yellow'])
+        return {
+            'success': True,
+            'match_info': match_info,
+            'statistics': statistics,
+            'rally_statistics': stats.summary(),
+            'detailed_history': detailed_history,
+            'paging': {
+                'since': start,
+                'limit': limit if paged else None,
+                'next_since': max(stop, start),
+                'has_more': stop < total,
+                'generation': history.generation,
+                'restarted': restarted  # True: the client's generation is stale, drop what it has and use this page
+            },
+            'set_history': game_state['set_history'],
+            'current_state': {
+                'score_1': game_state['score_1'],
+                'score_2': game_state['score_2'],
+                'game_1': game_state['game_1'],
+                'game_2': game_state['game_2'],
+                'set_1': game_state['set_1'],
+                'set_2': game_state['set_2'],
+                'match_won': game_state['match_won']
+            }
+        }
 
-    # Match info
-    match_info = {
-        'start_time': game_state['match_start_time'],
-        'end_time': game_state['match_end_time'],
-        'duration': calculate_match_duration(),
-        'winner': game_state['winner'] if game_state['match_won'] else None,
-        'match_completed': game_state['match_won'],
-        'total_actions': len(game_state['match_history'])
-    }
+    # Only the plain full-history form is cached, paged queries are just ETag'ed
+    query = request.query_string
+    key = f'match_history.{zlib.crc32(query):08x}' if query else 'match_history'
+    return versioned_json(court, key, build, cache=not query)
 
-    # Team statistics
-    statistics = {
-        'black_team_stats': {
-            'points_won': black_points,
-            'games_won': black_games,
-            'sets_won': black_sets,
-            'current_score': game_state['score_1'],
-            'current_games': game_state['game_1'],
-            'current_sets': game_state['set_1']
-        },
-        'yellow_team_stats': {
-            'points_won': yellow_points,
-            'games_won': yellow_games,
-            'sets_won': yellow_sets,
-            'current_score': game_state['score_2'],
-            'current_games': game_state['game_2'],
-            'current_sets': game_state['set_2']
-        }
-    }
+# API endpoint to reset the entire match
+@app.route('/reset_match', methods=['POST'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/reset_match', methods=['POST'])
+def reset_match(court_id):
+    """Reset the entire match including sets and history"""
+    court = get_court(court_id, create=True)
+    if court is None:
+        return court_not_found(court_id)
+
+    # Optional: new scoring rules for this court, e.g. {"rules": {"golden_point": false, "tiebreak": true}}
+    data = request.get_json(silent=True) or {}
+    rules = None
+    if data.get('rules') is not None:
+        try:
+            rules = rules_from_dict(data['rules'])
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid rules: {e}'
+            }), 400
+
+    # Optional: team names for the new match, e.g. {"teams": {"black": "Lopez/Ruiz", "yellow": "Diaz/Moreno"}}
+    teams = None
+    if data.get('teams') is not None:
+        try:
+            teams = teams_from_dict(data['teams'])
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid teams: {e}'
+            }), 400
+
+    # Optional: the team serving first, e.g. {"first_server": "yellow"}; without it breaks are not counted
+    first_server = data.get('first_server')
+    if first_server is not None and first_server not in TEAM_CODES:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid first_server: {first_server}'
+        }), 400
 
+    with court.lock:
+        at_ns = time.time_ns()
+        fields = {}
+        if rules is not None:
+            fields['rules'] = rules._asdict()
+        if teams is not None:
+            fields['teams'] = teams
+        if first_server is not None:
+            fields['first_server'] = first_server
+        log_event(court, 'reset_match', at_ns, **fields)
+        apply_reset_match(court, at_ns, rules, teams, first_server)
+        publish(court)
+        view = court.view
+
+    log.info("🔄 Match reset", court=court.court_id, teams=f"{view.game_state['teams']['black']} vs {view.game_state['teams']['yellow']}")
     return jsonify({
         'success': True,
-        'match_info': match_info,
-        'statistics': statistics,
-        'detailed_history': game_state['match_history'],
-        'set_history': game_state['set_history'],
-        'current_state': {
-            'score_1': game_state['score_1'],
-            'score_2': game_state['score_2'],
-            'game_1': game_state['game_1'],
-            'game_2': game_state['game_2'],
-            'set_1': game_state['set_1'],
-            'set_2': game_state['set_2'],
-            'match_won': game_state['match_won']
+        'message': 'Match reset successfully',
+        'court_id': court.court_id,
+        'game_state': full_game_state(view)
+    })
+
+# NEW: Server-side undo / redo by point number
+@app.route('/undo', methods=['POST'], defaults={'court_id': DEFAULT_COURT_ID, 'direction': 'undo'})
+@app.route('/redo', methods=['POST'], defaults={'court_id': DEFAULT_COURT_ID, 'direction': 'redo'})
+@app.route('/courts/<court_id>/<any(undo, redo):direction>', methods=['POST'])
+def undo_redo(court_id, direction):
+    """Take back the last point, or re-apply the last undone one"""
+    court = get_court(court_id)
+    if court is None:
+        return court_not_found(court_id)
+
+    with court.lock:
+        timeline = court.timeline
+        if direction == 'undo' and timeline.cursor == 0:
+            error = 'Nothing to undo'
+        elif direction == 'redo' and timeline.cursor == len(timeline):
+            error = 'Nothing to redo'
+        else:
+            error = None
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+
+        at_ns = court.history.now_ns()
+        log_event(court, direction, at_ns)
+        if direction == 'undo':
+            apply_undo(court, at_ns)
+        else:
+            apply_redo(court)
+        publish(court)
+
+        log.info(f"↩️ {direction.title()}", court=court.court_id, position=timeline.cursor, points=len(timeline))
+        return jsonify({
+            'success': True,
+            'message': f'{direction.title()} applied',
+            'court_id': court.court_id,
+            'position': timeline.cursor,
+            'can_undo': timeline.cursor > 0,
+            'can_redo': timeline.cursor < len(timeline),
+            'scoreboard': scoreboard(court),
+            'version': court.version
+        })
+
+# NEW: Live win probability for the broadcast overlay
+# One Monte Carlo simulation at a time: each holds the GIL for up to SIMULATION_BUDGET_MS
+simulation_lock = threading.Lock()
+
+class SimulationBusy(Exception):
+    """Raised by a /win_probability simulation while another one is running"""
+
+@app.route('/win_probability', methods=['GET'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/win_probability', methods=['GET'])
+def get_win_probability(court_id):
+    """Each team's chance of winning the match from the current score and point-win rates"""
+    court = get_court(court_id)
+    if court is None:
+        return court_not_found(court_id)
+
+    # Exact Markov calculation by default, ?method=monte_carlo&paths=N to simulate instead
+    method = request.args.get('method', 'exact')
+    try:
+        paths = int(request.args.get('paths', SIMULATION_PATHS))
+    except ValueError:
+        paths = 0
+    if method not in ('exact', 'monte_carlo') or not 1 <= paths <= SIMULATION_PATHS_MAX:
+        return jsonify({
+            'success': False,
+            'error': f'method must be exact or monte_carlo and paths between 1 and {SIMULATION_PATHS_MAX}'
+        }), 400
+
+    def build(view):
+        rallies = view.stats.rallies
+        p = point_win_rate(rallies[0], rallies[1])
+        started = time.perf_counter()
+        played = None
+        if method == 'exact':
+            black = win_probability(view.state, p, view.rules)
+        elif not simulation_lock.acquire(blocking=False):
+            raise SimulationBusy()
+        else:
+            try:
+                black, played = simulate(view.state, p, view.rules, paths, budget_s=SIMULATION_BUDGET_MS / 1000)
+            finally:
+                simulation_lock.release()
+        return {
+            'success': True,
+            'court_id': view.court_id,
+            'version': view.version,
+            'method': method,
+            'paths': played,  # Fewer than asked when the time budget ran out
+            'points_played': rallies[0] + rallies[1],
+            'point_win_rate': {'black': round(p, 4), 'yellow': round(1 - p, 4)},
+            'win_probability': {'black': round(black, 4), 'yellow': round(1 - black, 4)},
+            'compute_ms': round((time.perf_counter() - started) * 1000, 3)
         }
+
+    if method == 'exact':
+        # Deterministic: computed once per state version
+        return versioned_json(court, 'win_probability', build)
+    # Simulated once per (state version, paths); one slot per court, so other path counts replace it
+    try:
+        return versioned_json(court, f'win_probability.monte_carlo.{paths}', build, slot='win_probability.monte_carlo')
+    except SimulationBusy:
+        response = jsonify({
+            'success': False,
+            'error': 'Another simulation is running, retry shortly or use method=exact'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = '1'
+        return response
+
+# NEW: Live score stream (server-sent events) replacing /game_state polling
+@app.route('/stream', methods=['GET'], defaults={'court_id': DEFAULT_COURT_ID})
+@app.route('/courts/<court_id>/stream', methods=['GET'])
+def stream(court_id):
+    """Push a scoreboard snapshot, then a small delta event on every state change"""
+    court = get_court(court_id)
+    if court is None:
+        return court_not_found(court_id)
+
+    # Every open stream holds a server thread: past the limit, screens poll so writers always get one
+    if sum(len(other.subscribers) for other in list(courts.values())) >= MAX_STREAMS:
+        response = jsonify({
+            'success': False,
+            'error': f'Stream limit of {MAX_STREAMS} reached, poll /game_state'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+        return response
+
+    subscriber = Subscriber()
+    with court.lock:
+        snapshot = snapshot_event(court)
+        court.subscribers.add(subscriber)
+
+    def events():
+        try:
+            yield snapshot
+            while not subscriber.dropped:
+                try:
+                    yield subscriber.queue.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            with court.lock:
+                court.subscribers.discard(subscriber)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
-# API endpoint to reset the entire match
-@app.route('/reset_match', methods=['POST'])
-def reset_match():
-    """Reset the entire match including sets and history"""
-    global game_state, match_storage
+# NEW: Archive of completed matches
+def archive_unavailable():
+    """Error response when the match archive is not enabled"""
+    return jsonify({
+        'success': False,
+        'error': 'Match archive not enabled'
+    }), 503
+
+def archive_args(*names):
+    """Optional string query arguments (None when absent)"""
+    return {name: request.args.get(name) or None for name in names}
+
+@app.route('/matches', methods=['GET'])
+def list_matches():
+    """Archived matches, newest first: ?team=&court=&from=YYYY-MM-DD&to=YYYY-MM-DD&before=<id>&limit=N"""
+    if match_archive is None:
+        return archive_unavailable()
+    try:
+        limit = int(request.args.get('limit', 50))
+        before = int(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'before and limit must be integers'
+        }), 400
+    if not 1 <= limit <= ARCHIVE_PAGE_MAX:
+        return jsonify({
+            'success': False,
+            'error': f'limit must be between 1 and {ARCHIVE_PAGE_MAX}'
+        }), 400
 
-    # Wipe any stored match data first
-    wipe_match_storage()
+    args = archive_args('team', 'court', 'from', 'to')
+    matches = match_archive.matches(team=args['team'], court_id=args['court'], date_from=args['from'],
+                                    date_to=args['to'], before=before, limit=limit)
+    return jsonify({
+        'success': True,
+        'matches': matches,
+        'next_before': matches[-1]['id'] if len(matches) == limit else None
+    })
 
-    game_state = {
-        'score_1': 0,
-        'score_2': 0,
-        'point_1': 0,
-        'point_2': 0,
-        'game_1': 0,
-        'game_2': 0,
-        'set_1': 0,
-        'set_2': 0,
-        'match_won': False,
-        'winner': None,
-        'set_history': [],
-        'match_history': [],
-        'match_start_time': datetime.now().isoformat(),
-        'match_end_time': None,
-        'last_updated': datetime.now().isoformat()
+@app.route('/matches/<int:match_id>', methods=['GET'])
+def get_archived_match(match_id):
+    """One archived match with its point-by-point history"""
+    if match_archive is None:
+        return archive_unavailable()
+    match = match_archive.match(match_id)
+    if match is None:
+        return jsonify({
+            'success': False,
+            'error': f'Match {match_id} not found'
+        }), 404
+
+    history = PointLog(match.pop('started_ns'))
+    history.buffer = bytearray(match.pop('history'))
+    match['detailed_history'] = history.to_list()
+    return jsonify({
+        'success': True,
+        'match': match
+    })
+
+@app.route('/matches/head_to_head', methods=['GET'])
+def head_to_head():
+    """Record of two teams against each other: ?team_a=&team_b="""
+    if match_archive is None:
+        return archive_unavailable()
+    args = archive_args('team_a', 'team_b')
+    if not args['team_a'] or not args['team_b']:
+        return jsonify({
+            'success': False,
+            'error': 'team_a and team_b are required'
+        }), 400
+    return jsonify(dict(match_archive.head_to_head(args['team_a'], args['team_b']), success=True))
+
+@app.route('/matches/leaderboard', methods=['GET'])
+def leaderboard():
+    """Teams ranked by matches won: ?from=YYYY-MM-DD&limit=N"""
+    if match_archive is None:
+        return archive_unavailable()
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= ARCHIVE_PAGE_MAX:
+        return jsonify({
+            'success': False,
+            'error': f'limit must be an integer between 1 and {ARCHIVE_PAGE_MAX}'
+        }), 400
+    return jsonify({
+        'success': True,
+        'leaderboard': match_archive.leaderboard(date_from=archive_args('from')['from'], limit=limit)
+    })
+
+@app.route('/matches/average_duration', methods=['GET'])
+def average_duration():
+    """Average match duration, overall or for ?team= and/or ?court="""
+    if match_archive is None:
+        return archive_unavailable()
+    args = archive_args('team', 'court')
+    return jsonify(dict(match_archive.average_duration(team=args['team'], court_id=args['court']), success=True))
+
+# NEW: Streaming export of the archive for analytics
+@app.route('/export/<any(matches, points):table>.<any(csv, arrow, parquet):fmt>', methods=['GET'])
+def export_archive(table, fmt):
+    """Stream archived matches or their point logs as CSV, Arrow or Parquet: ?team=&court=&from=&to="""
+    if match_archive is None:
+        return archive_unavailable()
+    if fmt != 'csv' and pyarrow is None:
+        return jsonify({
+            'success': False,
+            'error': 'Arrow and Parquet export need the pyarrow package, use .csv'
+        }), 501
+
+    args = archive_args('team', 'court', 'from', 'to')
+    chunks = export_chunks(match_archive, table, fmt, team=args['team'], court_id=args['court'],
+                           date_from=args['from'], date_to=args['to'])
+    return Response(chunks, mimetype=MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename=padel_{table}.{fmt}'
+    })
+
+# NEW: Replication status, manual promotion, and read-only standbys
+@app.before_request
+def refuse_writes_on_standby():
+    """A standby only changes state through the primary's event stream"""
+    if request.method == 'POST' and request.endpoint != 'promote_standby' and standby_read_only():
+        if replication_standby is not None and not replication_standby.promoted.is_set():
+            return jsonify({
+                'success': False,
+                'error': 'Standby replica, read-only until promoted',
+                'primary': replication_standby.stats()['primary']
+            }), 503
+        return jsonify({
+            'success': False,
+            'error': f'Fenced off: a newer primary took over (term {replication_primary.fenced_term})'
+        }), 503
+
+@app.after_request
+def add_replication_term(response):
+    """Tag responses with this process's term, so screens can ignore a fenced-off primary"""
+    term = replication_term()
+    if term is not None:
+        response.headers['X-Padel-Term'] = str(term)
+    return response
+
+def replication_stats():
+    return {
+        'primary': replication_primary.stats() if replication_primary is not None else None,
+        'standby': replication_standby.stats() if replication_standby is not None else None
+    }
+
+@app.route('/replication', methods=['GET'])
+def get_replication():
+    """Role, lag and failover figures of this process"""
+    return jsonify(replication_stats())
+
+@app.route('/replication/promote', methods=['POST'])
+def promote_standby():
+    """Promote this standby to primary now, without waiting for the failover timeout"""
+    if replication_standby is None:
+        return jsonify({'success': False, 'error': 'Not a standby'}), 400
+    promoted = replication_standby.promote('manual')
+    return jsonify({'success': True, 'promoted': promoted, 'replication': replication_stats()})
+
+# NEW: Request metrics and the /metrics endpoint
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and time it, by route (the endpoint name, so /courts/<id>/... share a series)"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.endpoint or 'unmatched'
+        request_seconds.observe(time.perf_counter() - started, route)
+        requests_total.inc(route, request.method, response.status_code)
+    return response
+
+def court_memory(court):
+    """Approximate bytes held by a court's match state, by part"""
+    view = court.view
+    with court.lock:
+        timeline = court.timeline
+        arrays = timeline.nbytes
+        checkpoints = list(timeline.checkpoints)
+    return {
+        'history': view.history.nbytes,
+        'timeline': arrays + deep_size(checkpoints),
+        'state': deep_size(view.game_state) + deep_size(view.match_storage),
+        'body_cache': sum(len(body) for _, body in list(court.body_cache.values()))
     }
 
-    print("🔄 Complete match reset with history and storage cleared")
+def courts_memory():
+    """Approximate bytes of match state held by all courts"""
+    return sum(sum(court_memory(court).values()) for court in list(courts.values()))
+
+def process_rss():
+    """Resident memory of this process in bytes, None without /proc"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def sweep_courts():
+    """Evict finished matches idle past COURT_IDLE_TTL, then more while the courts are over MEMORY_BUDGET.
+
+    Also measures the memory report served by /health, so health checks
+    never walk the courts themselves.
+    """
+    with courts_lock:
+        evict_idle_courts(COURT_IDLE_TTL)
+    used = courts_memory()
+    while used > MEMORY_BUDGET:
+        with courts_lock:
+            if not evict_idle_courts(COURT_EVICT_MIN_IDLE, limit=1):
+                break
+        used = courts_memory()
+    over_budget = used > MEMORY_BUDGET
+    if over_budget and not retention_stats['over_budget']:
+        log.warning("⚠️ Over the memory budget with no idle finished match left to evict",
+                    used_bytes=used, budget_bytes=MEMORY_BUDGET)
+    retention_stats['over_budget'] = over_budget
+    retention_stats['memory'] = memory_report(used)
+
+def memory_report(courts_bytes):
+    """Memory budget, what the courts hold and the retention settings"""
+    court_list = list(courts.values())
+    return {
+        'measured_at': datetime.now().isoformat(timespec='seconds'),
+        'budget_bytes': MEMORY_BUDGET,
+        'courts_bytes': courts_bytes,
+        'over_budget': retention_stats['over_budget'],
+        'rss_bytes': process_rss(),
+        'history_memory_max': PointLog.memory_max,
+        'history_spilled_bytes': sum(court.view.history.spilled_bytes for court in court_list),
+        'timeline_spilled_bytes': sum(court.timeline.spilled_bytes for court in court_list),
+        'court_idle_ttl_s': COURT_IDLE_TTL,
+        'courts_evicted': retention_stats['evicted']
+    }
+
+def points_last_minute(court, now_ns):
+    """Points scored on the court in the last POINTS_WINDOW_NS"""
+    with court.lock:
+        timeline = court.timeline
+        return timeline.cursor - bisect_left(timeline, now_ns - POINTS_WINDOW_NS, 0, timeline.cursor, key=itemgetter(0))
+
+@metrics.collector
+def collect_court_metrics():
+    """Per-court and process figures, read at scrape time"""
+    now_ns = time.time_ns()
+    points_per_minute = Family('padel_points_per_minute', 'gauge', 'Points scored in the last 60 seconds per court')
+    history_entries = Family('padel_history_entries', 'gauge', 'Point log entries of the current match per court')
+    state_bytes = Family('padel_match_state_bytes', 'gauge', 'Approximate memory held by match state per court')
+    subscribers = Family('padel_stream_subscribers', 'gauge', 'Open /stream connections per court')
+    for court in list(courts.values()):
+        points_per_minute.add(points_last_minute(court, now_ns), court=court.court_id)
+        history_entries.add(len(court.view.history), court=court.court_id)
+        for part, size in court_memory(court).items():
+            state_bytes.add(size, court=court.court_id, part=part)
+        subscribers.add(len(court.subscribers), court=court.court_id)
+
+    spilled = Family('padel_history_spilled_bytes', 'gauge', 'Point log records spilled to disk per court')
+    for court in list(courts.values()):
+        spilled.add(court.view.history.spilled_bytes, court=court.court_id)
+
+    families = [
+        Family('padel_courts_active', 'gauge', 'Courts served by this process').add(len(courts)),
+        points_per_minute, history_entries, state_bytes, subscribers, spilled,
+        Family('padel_courts_evicted_total', 'counter', 'Idle finished matches evicted from memory')
+        .add(retention_stats['evicted']),
+        Family('padel_memory_budget_bytes', 'gauge', 'Memory budget for the match state of all courts')
+        .add(MEMORY_BUDGET)
+    ]
+    rss = process_rss()
+    if rss is not None:
+        families.append(Family('padel_process_resident_bytes', 'gauge', 'Resident memory of the process').add(rss))
+    logging_stats = padel_logging.stats()
+    families.append(Family('padel_log_records_queued', 'gauge', 'Log records waiting for the log writer thread')
+                    .add(logging_stats['queued']))
+    families.append(Family('padel_log_records_dropped_total', 'counter', 'Log records dropped because the queue was full')
+                    .add(logging_stats['dropped']))
+    if event_log is not None:
+        wal = event_log.stats()
+        families.append(Family('padel_event_log_events_total', 'counter', 'Events appended to the event log')
+                        .add(wal['events_written']))
+        families.append(Family('padel_event_log_pending_fsync', 'gauge', 'Logged events not yet fsynced')
+                        .add(wal['pending_fsync']))
+    if match_archive is not None:
+        archive = match_archive.stats()
+        families.append(Family('padel_archive_matches_written_total', 'counter', 'Matches written to the archive')
+                        .add(archive['written']))
+        families.append(Family('padel_archive_queue', 'gauge', 'Archive writes waiting for the writer thread')
+                        .add(archive['queued']))
+    if replication_primary is not None:
+        lag_events = Family('padel_replication_lag_events', 'gauge', 'Events shipped to a standby and not yet applied')
+        lag_seconds = Family('padel_replication_lag_seconds', 'gauge', 'Shipping to applying time of the last acked event')
+        for link in replication_primary.stats()['standbys']:
+            lag_events.add(link['lag_events'], standby=link['standby'])
+            lag_seconds.add(link['lag_ms'] / 1000, standby=link['standby'])
+        families += [lag_events, lag_seconds]
+    if replication_standby is not None:
+        standby = replication_standby.stats()
+        families.append(Family('padel_replication_promoted', 'gauge', 'Whether this standby took over as primary')
+                        .add(int(standby['role'] == 'promoted')))
+        families.append(Family('padel_replication_applied_seq', 'gauge', 'Last primary sequence number applied')
+                        .add(standby['applied_seq']))
+        if standby['last_contact_ms'] is not None:
+            families.append(Family('padel_replication_last_contact_seconds', 'gauge', 'Time since the primary was last heard')
+                            .add(standby['last_contact_ms'] / 1000))
+        if standby['failover_ms'] is not None:
+            families.append(Family('padel_replication_failover_seconds', 'gauge', 'Last contact with the primary to promotion done')
+                            .add(standby['failover_ms'] / 1000))
+    if button_listener is not None:
+        packets = Family('padel_button_packets_total', 'counter', 'Button packets received by outcome')
+        for result, count in button_listener.stats()['packets'].items():
+            packets.add(count, result=result)
+        families.append(packets)
+    return families
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of every metric"""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+# NEW: Court registry overview
+@app.route('/courts', methods=['GET'])
+def list_courts():
+    """List every active court with its current score"""
+    summaries = []
+    for court in list(courts.values()):
+        view = court.view
+        game_state = view.game_state
+        summaries.append({
+            'court_id': court.court_id,
+            'score': [game_state['score_1'], game_state['score_2']],
+            'games': [game_state['game_1'], game_state['game_2']],
+            'sets': [game_state['set_1'], game_state['set_2']],
+            'match_won': game_state['match_won'],
+            'last_updated': timestamp(view.updated_ns),
+            'subscribers': len(court.subscribers)
+        })
+
     return jsonify({
         'success': True,
-        'message': 'Match reset successfully',
-        'game_state': game_state
+        'courts': summaries,
+        'max_courts': MAX_COURTS
     })
 
 # Enhanced health check endpoint
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint with file status and match storage"""
+@app.route('/health', methods=['GET'], defaults={'court_id': None})
+@app.route('/courts/<court_id>/health', methods=['GET'])
+def health_check(court_id):
+    """Health check endpoint with file status and match storage (/health answers before any court is in play)"""
+    # Not get_court(): a monitor's polling must not keep a finished match from being evicted
+    court = courts.get(court_id or DEFAULT_COURT_ID)
+    if court is None and court_id is not None:
+        return court_not_found(court_id)
+
     logo_exists = os.path.exists('logo.png')
     back_exists = os.path.exists('back.png')
 
-    return jsonify({
+    health = {
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'game_state': game_state,
+        'courts_active': len(courts),
+        'event_log': event_log.stats() if event_log is not None else None,
+        'static_assets': static_assets.stats(),
+        'archive': match_archive.stats() if match_archive is not None else None,
+        'buttons': button_listener.stats() if button_listener is not None else None,
+        'replication': replication_stats(),
+        'memory': retention_stats['memory'],  # Measured by the retention sweep
+        'files': {
+            'logo_png': 'found' if logo_exists else 'missing',
+            'back_png': 'found' if back_exists else 'missing'
+        }
+    }
+    if event_log is not None and not health['event_log']['healthy']:
+        health['status'] = 'degraded'  # Writes are answered but may not be on disk
+    if court is None:
+        return jsonify(health)
+
+    view = court.view
+    game_state = view.game_state
+    match_storage = view.match_storage
+    health.update({
+        'court_id': court.court_id,
+        'stream_subscribers': len(court.subscribers),
+        'version': view.version,
+        'scoreboard': scoreboard(view),
         'match_status': 'completed' if game_state['match_won'] else 'in_progress',
-        'history_entries': len(game_state['match_history']),
+        'history_entries': len(view.history),
         'match_storage': {
             'completed': match_storage['match_completed'],
             'displayed': match_storage['display_shown'],
             'available_for_display': match_storage['match_completed'] and not match_storage['display_shown']
-        },
-        'files': {
-            'logo_png': 'found' if logo_exists else 'missing',
-            'back_png': 'found' if back_exists else 'missing'
         }
     })
+    return jsonify(health)
 
 if __name__ == '__main__':
     print("🏓 Starting Complete Padel Scoreboard System...")
@@ -615,7 +2157,9 @@ if __name__ == '__main__':
         print("📝 The scoreboard will use fallback designs for missing images.")
 
     print("")
-    print("🌐 Access the scoreboard at: http://localhost:5000")
+    port = int(os.environ.get('PADEL_PORT', 5000))
+    debug = os.environ.get('PADEL_DEBUG', '1') != '0'
+    print(f"🌐 Access the scoreboard at: http://localhost:{port}")
     print("📊 COMPLETE: Sets-Only Winner Display System")
     print("🏆 Professional winner screen with sets history table")
     print("📋 Full match tracking with automatic data management")
@@ -623,13 +2167,24 @@ if __name__ == '__main__':
     print("=" * 90)
     print("🔗 Complete API Endpoints:")
     print("  GET  /                     - Serve main scoreboard")
-    print("  POST /add_point           - Add point to team")
-    print("  GET  /game_state          - Current game state")
+    print("  GET  /courts              - All courts of the venue")
+    print("  *    /courts/<id>/...     - Any endpoint below, for one court")
+    print("  POST /add_point           - Add point to team (compact delta, ?full=1 with the game state)")
+    print("  POST /add_points          - Add several queued points at once")
+    print("  GET  /game_state          - Current game state (?full=1 with the point log)")
+    print("  GET  /stream              - Live score events (SSE)")
     print("  GET  /get_match_data      - Retrieve detailed match data")
     print("  POST /mark_match_displayed- Mark as shown and wipe storage")
     print("  GET  /match_history       - Full match history and stats")
-    print("  POST /reset_match         - Reset everything")
+    print("  POST /undo, /redo         - Take back / re-apply a point")
+    print("  GET  /win_probability     - Live win chances for each team")
+    print("  POST /reset_match         - Reset everything (optional rules, team names, first server)")
+    print("  GET  /matches             - Archived matches (/<id>, /head_to_head, /leaderboard, /average_duration)")
+    print("  GET  /export/<table>.<fmt>- Stream matches or points as csv, arrow or parquet")
     print("  GET  /health              - System status")
+    print("  GET  /metrics             - Prometheus metrics")
+    print("  GET  /replication         - Primary/standby role, lag and failover (POST /replication/promote)")
+    print("  UDP  $PADEL_UDP_PORT      - Court button presses (see padel_udp.py)")
     print("=" * 90)
     print("✨ COMPLETE FEATURES:")
     print("  • Professional sets-only winner display")
@@ -639,7 +2194,21 @@ if __name__ == '__main__':
     print("  • Beautiful UI with hover effects")
     print("  • Responsive design for all devices")
     print("=" * 90)
-    print("🚀 Starting server...")
+    print("🚀 Starting development server... (production: python padel_wsgi.py)")
     print("")
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Rebuild matches from the event log, only in the reloader child that serves requests
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        data_dir = os.environ.get('PADEL_DATA_DIR', 'padel_data')
+        enable_retention(data_dir)
+        enable_archive(os.path.join(data_dir, 'archive.sqlite3'))
+        enable_event_log(data_dir)
+        replication_port = int(os.environ.get('PADEL_REPLICATION_PORT', 0))
+        if os.environ.get('PADEL_REPLICA_OF'):
+            enable_standby(os.environ['PADEL_REPLICA_OF'], replication_port)
+        elif replication_port:
+            enable_replication_primary(replication_port)
+        if os.environ.get('PADEL_UDP_PORT'):
+            enable_button_listener(int(os.environ['PADEL_UDP_PORT']))
+
+    app.run(debug=debug, host='0.0.0.0', port=port)
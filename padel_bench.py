@@ -0,0 +1,253 @@
+"""Benchmark suite for the scoring and API hot paths, with regression checks.
+
+    python padel_bench.py --quick                             # run and print the figures
+    python padel_bench.py --save-baseline bench_baseline.json # record this machine's baseline
+    python padel_bench.py --baseline bench_baseline.json      # compare with it, exit 1 on a regression
+    python padel_bench.py --json results.json --quick
+
+Runs in process against the Flask test client, without the event log or the
+archive, so it measures the application code and not the disk:
+
+- add_point: throughput and per-request latency of POST /add_point
+- match: a full simulated best-of-3 match, through the engine and the API
+- serialization: uncached /game_state (lean and ?full=1) and /match_history
+  as the point log grows past 10k entries (an endless deuce, golden point off)
+- memory: bytes retained per completed match on a court
+
+Every result is a named figure with a unit and a direction. Compared with
+a baseline, a figure more than --tolerance worse is a regression. Baselines
+depend on the machine, so none is kept in the tree: record one per host.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+os.environ.setdefault('PADEL_LOG_LEVEL', 'WARNING')  # Keep per-request log lines out of the timings
+
+import padel_backend
+from padel_metrics import deep_size
+
+TOLERANCE = 0.20                                  # Allowed slowdown before a figure counts as a regression
+HISTORY_SIZES = (1000, 5000, 10000, 20000)        # Point log lengths for the serialization benchmark
+DEUCE_RULES = {'golden_point': False}             # Advantage play: alternating points never end the game
+
+# (figure name, path) of the GET endpoints timed as the point log grows
+SERIALIZED_ENDPOINTS = (
+    ('game_state', 'game_state'),
+    ('game_state_full', 'game_state?full=1'),
+    ('match_history', 'match_history'),
+)
+
+
+class Results:
+    """Named figures of one run: value, unit and whether lower or higher is better"""
+
+    def __init__(self):
+        self.figures = {}
+
+    def add(self, name, value, unit, better='lower'):
+        self.figures[name] = {'value': round(value, 3), 'unit': unit, 'better': better}
+        print(f"   {name:<40} {value:>14,.3f} {unit}")
+
+    def timings(self, name, seconds, unit='us'):
+        """p50 and p99 of a list of durations"""
+        scale = 1e6 if unit == 'us' else 1e3
+        values = sorted(seconds)
+        self.add(f'{name}.p50_{unit}', statistics.median(values) * scale, unit)
+        self.add(f'{name}.p99_{unit}', values[min(len(values) - 1, int(0.99 * len(values)))] * scale, unit)
+
+
+def fresh_court(court_id, rules=None):
+    """A court with a new match, its cached bodies dropped"""
+    court = padel_backend.get_court(court_id, create=True)
+    with court.lock:
+        padel_backend.apply_reset_match(court, rules=padel_backend.rules_from_dict(rules) if rules else None)
+        padel_backend.publish(court)
+    court.body_cache.clear()
+    return court
+
+
+def play_match(court, rng, p=0.55):
+    """Score points straight through the engine until the match is won, returns the points played"""
+    points = 0
+    with court.lock:
+        while not court.game_state['match_won']:
+            padel_backend.score_point(court, 'black' if rng.random() < p else 'yellow')
+            points += 1
+        padel_backend.publish(court)
+    return points
+
+
+def bench_add_point(client, results, points):
+    """POST /add_point throughput, starting a new match whenever one is won"""
+    fresh_court('bench_add')
+    url = '/courts/bench_add/add_point'
+    latencies = []
+    started = time.perf_counter()
+    for i in range(points):
+        before = time.perf_counter()
+        response = client.post(url, json={'team': 'black' if i % 3 else 'yellow'})
+        latencies.append(time.perf_counter() - before)
+        if response.status_code == 400:
+            client.post('/courts/bench_add/reset_match', json={})
+    elapsed = time.perf_counter() - started
+    results.add('add_point.points_per_sec', points / elapsed, 'points/s', better='higher')
+    results.timings('add_point', latencies)
+
+
+def bench_match(client, results, matches):
+    """Complete best-of-3 matches, through the scoring engine and through the API"""
+    rng = random.Random(1)
+    engine_times = []
+    played = []
+    for _ in range(matches):
+        court = fresh_court('bench_match')
+        before = time.perf_counter()
+        played.append(play_match(court, rng))
+        engine_times.append(time.perf_counter() - before)
+    results.add('match.points_per_match', statistics.mean(played), 'points', better='none')
+    results.timings('match.engine', engine_times, unit='ms')
+
+    api_times = []
+    for _ in range(max(1, matches // 10)):
+        fresh_court('bench_match')
+        before = time.perf_counter()
+        while client.post('/courts/bench_match/add_point',
+                          json={'team': 'black' if rng.random() < 0.55 else 'yellow'}).status_code == 200:
+            pass
+        api_times.append(time.perf_counter() - before)
+    results.timings('match.api', api_times, unit='ms')
+
+
+def bench_serialization(client, results, sizes, samples):
+    """Uncached /game_state and /match_history as the point log grows"""
+    court = fresh_court('bench_history', DEUCE_RULES)
+    for size in sizes:
+        with court.lock:
+            while len(court.history) < size:
+                # 40-40 first, then alternate: advantage and back to deuce, forever
+                padel_backend.score_point(court, 'black' if len(court.history) % 2 else 'yellow')
+            padel_backend.publish(court)
+
+        gc.collect()
+        for endpoint, path in SERIALIZED_ENDPOINTS:
+            url = f'/courts/bench_history/{path}'
+            durations = []
+            sizes_bytes = []
+            for _ in range(samples):
+                with court.lock:
+                    padel_backend.publish(court)  # New version: the next GET serializes again
+                before = time.perf_counter()
+                response = client.get(url)
+                durations.append(time.perf_counter() - before)
+                sizes_bytes.append(len(response.data))
+            # Best of the samples: the work is deterministic, anything slower is noise from the machine
+            results.add(f'{endpoint}.{size}.best_ms', min(durations) * 1e3, 'ms')
+            results.add(f'{endpoint}.{size}.bytes', statistics.median(sizes_bytes), 'bytes')
+
+
+def bench_memory(results, matches):
+    """Bytes retained per completed match: one court per match, measured with tracemalloc"""
+    rng = random.Random(2)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    courts = []
+    for i in range(matches):
+        court = fresh_court(f'bench_memory_{i}')
+        play_match(court, rng)
+        courts.append(court)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    results.add('memory.retained_bytes_per_match', retained / matches, 'bytes')
+
+    court = courts[-1]
+    results.add('memory.history_bytes_per_match', court.history.nbytes, 'bytes')
+    results.add('memory.game_state_bytes', deep_size(court.game_state) + deep_size(court.match_storage), 'bytes')
+
+
+def run(args):
+    """Run every benchmark, returns the results document"""
+    padel_backend.MAX_COURTS = max(padel_backend.MAX_COURTS, args.matches + 10)
+    client = padel_backend.app.test_client()
+    results = Results()
+    print("⏱️ add_point")
+    bench_add_point(client, results, args.points)
+    print("⏱️ full match")
+    bench_match(client, results, args.matches)
+    print("⏱️ serialization")
+    bench_serialization(client, results, args.sizes, args.samples)
+    print("⏱️ memory")
+    bench_memory(results, args.matches)
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'settings': {'points': args.points, 'matches': args.matches, 'sizes': list(args.sizes), 'samples': args.samples},
+        'results': results.figures
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print each figure against the baseline, returns the names that regressed"""
+    regressions = []
+    print(f"📏 Compared with baseline from {baseline['created']} ({baseline['machine']})")
+    for name, figure in current['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None or figure['better'] == 'none' or not reference['value']:
+            continue
+        change = figure['value'] / reference['value'] - 1
+        worse = change > tolerance if figure['better'] == 'lower' else change < -tolerance
+        if worse:
+            regressions.append(name)
+        print(f"   {'❌' if worse else '✅'} {name:<40} {reference['value']:>14,.3f} -> {figure['value']:>14,.3f} "
+              f"{figure['unit']} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the padel scoring and API hot paths')
+    parser.add_argument('--points', type=int, default=5000, help='add_point requests')
+    parser.add_argument('--matches', type=int, default=50, help='simulated matches')
+    parser.add_argument('--sizes', type=int, nargs='+', default=HISTORY_SIZES, help='point log lengths to serialize')
+    parser.add_argument('--samples', type=int, default=20, help='requests per endpoint and size')
+    parser.add_argument('--quick', action='store_true', help='smaller run for a fast check')
+    parser.add_argument('--json', metavar='PATH', help='also write the results to PATH')
+    parser.add_argument('--baseline', metavar='PATH', help='baseline results to compare with')
+    parser.add_argument('--save-baseline', metavar='PATH', help='store this run as the baseline at PATH')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown, e.g. 0.2 for 20%%')
+    args = parser.parse_args()
+    if args.quick:
+        args.points, args.matches, args.sizes, args.samples = 1000, 10, (1000, 10000), 5
+
+    current = run(args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"💾 Baseline saved to {args.save_baseline}")
+    if not args.baseline:
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Export archived matches for analytics: CSV, Arrow IPC stream or Parquet.
+
+    python padel_export.py points --format parquet -o season.parquet
+    python padel_export.py matches --from 2026-01-01 --team "Lopez/Ruiz" > matches.csv
+
+Two tables: `matches` (one row per match, the figures of the winner display)
+and `points` (one row per point log event). Rows come from generators over
+the archive, read a batch of matches at a time, and are written in chunks,
+so exporting a whole season never holds it in memory; the same generators
+back the /export endpoints. Arrow and Parquet need the optional pyarrow
+package, CSV works everywhere.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+from datetime import datetime
+
+from padel_history import ACTIONS, RECORD, TEAMS, score_value
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional: CSV only
+    pyarrow = None
+
+FORMATS = ('csv', 'arrow', 'parquet')
+CHUNK_ROWS = 5000  # Rows per CSV chunk, Arrow record batch or Parquet row group
+
+# (column, kind) per table; kinds map to CSV text and Arrow types
+MATCH_COLUMNS = (
+    ('match_id', 'int'), ('court_id', 'str'), ('started_at', 'time'), ('ended_at', 'time'),
+    ('played_on', 'str'), ('duration_s', 'int'), ('black_team', 'str'), ('yellow_team', 'str'),
+    ('winner', 'str'), ('winner_name', 'str'), ('final_sets_score', 'str'), ('detailed_sets', 'str'),
+    ('sets_black', 'int'), ('sets_yellow', 'int'), ('games_black', 'int'), ('games_yellow', 'int'),
+    ('points_black', 'int'), ('points_yellow', 'int'), ('golden_point', 'bool'), ('tiebreak', 'bool'),
+)
+POINT_COLUMNS = (
+    ('match_id', 'int'), ('seq', 'int'), ('timestamp', 'time'), ('elapsed_ms', 'int'),
+    ('team', 'str'), ('action', 'str'),
+    ('score_before_1', 'str'), ('score_before_2', 'str'), ('score_after_1', 'str'), ('score_after_2', 'str'),
+    ('game_before_1', 'int'), ('game_before_2', 'int'), ('game_after_1', 'int'), ('game_after_2', 'int'),
+    ('set_before_1', 'int'), ('set_before_2', 'int'), ('set_after_1', 'int'), ('set_after_2', 'int'),
+)
+TABLES = {'matches': MATCH_COLUMNS, 'points': POINT_COLUMNS}
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def match_rows(archive, **filters):
+    """One tuple per archived match, in MATCH_COLUMNS order"""
+    for match in archive.iter_matches(**filters):
+        winner = match['winner']
+        yield (
+            match['id'], match['court_id'],
+            datetime.fromisoformat(match['started_at']), datetime.fromisoformat(match['ended_at']),
+            match['played_on'], match['duration_s'], match['black_team'], match['yellow_team'],
+            winner, match[f'{winner}_team'], f"{match['sets_black']}-{match['sets_yellow']}",
+            ', '.join(match['set_history']),
+            match['sets_black'], match['sets_yellow'], match['games_black'], match['games_yellow'],
+            match['points_black'], match['points_yellow'],
+            match['rules'].get('golden_point'), match['rules'].get('tiebreak'),
+        )
+
+
+def point_rows(archive, **filters):
+    """One tuple per point log event of every archived match, in POINT_COLUMNS order"""
+    for match in archive.iter_matches(with_history=True, **filters):
+        match_id = match['id']
+        started_ns = match['started_ns']
+        for seq, record in enumerate(RECORD.iter_unpack(match['history'])):
+            (elapsed_ns, team, action,
+             score_b1, score_b2, score_a1, score_a2,
+             game_b1, game_b2, game_a1, game_a2,
+             set_b1, set_b2, set_a1, set_a2) = record
+            yield (
+                match_id, seq, datetime.fromtimestamp((started_ns + elapsed_ns) / 1e9), elapsed_ns // 1_000_000,
+                TEAMS[team], ACTIONS[action],
+                str(score_value(score_b1)), str(score_value(score_b2)),
+                str(score_value(score_a1)), str(score_value(score_a2)),
+                game_b1, game_b2, game_a1, game_a2, set_b1, set_b2, set_a1, set_a2,
+            )
+
+
+def table_rows(archive, table, **filters):
+    """Row generator for a table name"""
+    return match_rows(archive, **filters) if table == 'matches' else point_rows(archive, **filters)
+
+
+def chunked(rows, size=CHUNK_ROWS):
+    """Group a row generator into lists of at most size rows"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_chunks(columns, rows):
+    """CSV text in chunks: the header, then CHUNK_ROWS rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(name for name, _ in columns)
+    for chunk in chunked(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def arrow_schema(columns):
+    """pyarrow schema for a column list"""
+    types = {
+        'int': pyarrow.int64(),
+        'str': pyarrow.string(),
+        'time': pyarrow.timestamp('us'),
+        'bool': pyarrow.bool_(),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in columns])
+
+
+class ChunkSink:
+    """Write-only file object collecting what a pyarrow writer emits, drained after each batch"""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def columnar_chunks(columns, rows, fmt):
+    """Arrow IPC stream or Parquet bytes in chunks, one record batch / row group per CHUNK_ROWS rows"""
+    if pyarrow is None:
+        raise RuntimeError('Arrow and Parquet export need the pyarrow package')
+    schema = arrow_schema(columns)
+    sink = ChunkSink()
+    output = pyarrow.PythonFile(sink, mode='w')
+    if fmt == 'arrow':
+        writer = pyarrow.ipc.new_stream(output, schema)
+    else:
+        writer = pyarrow.parquet.ParquetWriter(output, schema, compression='zstd')
+
+    for chunk in chunked(rows):
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+        batch = pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+        if fmt == 'arrow':
+            writer.write_batch(batch)
+        else:
+            writer.write_table(pyarrow.Table.from_batches([batch]))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def export_chunks(archive, table, fmt, **filters):
+    """Encoded chunks of one table in one format"""
+    columns = TABLES[table]
+    rows = table_rows(archive, table, **filters)
+    if fmt == 'csv':
+        return csv_chunks(columns, rows)
+    return columnar_chunks(columns, rows, fmt)
+
+
+def main():
+    from padel_archive import MatchArchive
+
+    parser = argparse.ArgumentParser(description='Export archived padel matches')
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('--db', default=os.path.join(os.environ.get('PADEL_DATA_DIR', 'padel_data'), 'archive.sqlite3'))
+    parser.add_argument('--team')
+    parser.add_argument('--court')
+    parser.add_argument('--from', dest='date_from', help='first day, YYYY-MM-DD')
+    parser.add_argument('--to', dest='date_to', help='last day, YYYY-MM-DD')
+    args = parser.parse_args()
+
+    if args.format != 'csv' and pyarrow is None:
+        parser.error('Arrow and Parquet export need the pyarrow package')
+    if not os.path.exists(args.db):
+        parser.error(f'no archive at {args.db}')
+
+    archive = MatchArchive(args.db)
+    chunks = export_chunks(archive, args.table, args.format, team=args.team, court_id=args.court,
+                           date_from=args.date_from, date_to=args.date_to)
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        size = 0
+        for chunk in chunks:
+            output.write(chunk)
+            size += len(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    archive.close()
+    print(f"📤 Exported {args.table} as {args.format} ({size} bytes)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
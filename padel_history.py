@@ -0,0 +1,594 @@
+"""Compact append-only point log for padel matches.
+
+Each history event is one fixed-width binary record instead of a nested dict:
+elapsed monotonic nanoseconds since the match started, team code, action code
+and the packed before/after scores, games and sets. Records are expanded to
+the JSON shape served by /match_history only when they are read.
+
+A log keeps at most PointLog.memory_max records in memory; past that the
+oldest half is spilled to an unlinked temporary file and read back from it
+on demand, so an endless match costs disk, not RAM.
+"""
+import base64
+import json
+import os
+import struct
+import tempfile
+from array import array
+import time
+from datetime import datetime
+
+from padel_scoring import ADVANTAGE, state_from_list
+
+ACTIONS = ('point', 'game', 'set', 'match')
+TEAMS = ('black', 'yellow')
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+TEAM_CODES = {team: code for code, team in enumerate(TEAMS)}
+
+# elapsed_ns, team, action, score before/after, games before/after, sets before/after
+RECORD = struct.Struct('<qBB12H')
+ADVANTAGE_CODE = 0xFFFF  # Stored in place of the 'AD' score
+HISTORY_MEMORY_MAX = int(os.environ.get('PADEL_HISTORY_MEMORY_MAX', 2000))  # Records per match kept in memory
+SPILL_READ_RECORDS = 4096  # Records read back from a spill file at a time
+
+
+def score_code(score):
+    """Pack a displayed score (0/15/30/40, tie-break points or 'AD') into a record field"""
+    return ADVANTAGE_CODE if score == ADVANTAGE else score
+
+
+def score_value(code):
+    """Unpack a record score field"""
+    return ADVANTAGE if code == ADVANTAGE_CODE else code
+
+
+class SpillFile:
+    """Records spilled out of a point log, in an already unlinked file shared by the log and its copies.
+
+    The disk space goes back as soon as the last copy is dropped, and nothing
+    is left behind after a crash (snapshots carry every record).
+    """
+
+    __slots__ = ('file',)
+
+    def __init__(self, directory=None):
+        self.file = tempfile.TemporaryFile(prefix='padel-history-', dir=directory)
+
+    def write(self, offset, data):
+        os.pwrite(self.file.fileno(), data, offset)
+
+    def read(self, offset, size):
+        return os.pread(self.file.fileno(), size, offset)
+
+
+class PointLog:
+    """Append-only point log: the newest records in a bytearray, older ones spilled to disk.
+
+    copy() gives a read-only view sharing the bytearray up to its current end.
+    Appends only add bytes past that end; truncate() and spilling give the log
+    a new bytearray, so the bytes a view covers never change.
+
+    Entry indexes are only stable within a generation: truncate() (an undo)
+    starts a new one, after which the same indexes name different entries.
+    """
+
+    __slots__ = ('buffer', 'end', 'started_wall_ns', 'started_mono_ns', 'spilled', 'spill', 'generation')
+
+    memory_max = HISTORY_MEMORY_MAX  # Records held in memory before the older half is spilled, 0 for never
+    spill_dir = None                 # Directory of the spill files (None: the system temporary directory)
+
+    def __init__(self, started_wall_ns=None):
+        self.buffer = bytearray()       # Records from index `spilled` on
+        self.end = None                 # Bytes of buffer a view covers, None for the log itself
+        self.spilled = 0                # Records before them, in the spill file
+        self.spill = None               # SpillFile, created on the first spill
+        # Wall-clock anchor taken once per match, record times are monotonic offsets from it
+        self.started_wall_ns = time.time_ns() if started_wall_ns is None else started_wall_ns
+        self.generation = self.started_wall_ns // 1000  # Bumped whenever entries are dropped, so unique per match
+        self.started_mono_ns = time.monotonic_ns() - (time.time_ns() - self.started_wall_ns)
+
+    def __len__(self):
+        return self.spilled + self.nbytes // RECORD.size
+
+    @property
+    def nbytes(self):
+        """Memory held by the records"""
+        return len(self.buffer) if self.end is None else self.end
+
+    @property
+    def spilled_bytes(self):
+        """Disk held by the spilled records"""
+        return self.spilled * RECORD.size
+
+    def now_ns(self):
+        """Wall-clock time of now, counted on the monotonic clock from the match's anchor"""
+        return self.started_wall_ns + time.monotonic_ns() - self.started_mono_ns
+
+    def append(self, action, team, score_before, score_after, game_before, game_after, set_before, set_after, at_ns=None):
+        """Append one event record (at_ns: wall-clock time of a replayed event)"""
+        if at_ns is None:
+            elapsed_ns = time.monotonic_ns() - self.started_mono_ns
+        else:
+            elapsed_ns = at_ns - self.started_wall_ns
+        self.buffer += RECORD.pack(
+            elapsed_ns,
+            TEAM_CODES[team], ACTION_CODES[action],
+            score_code(score_before[0]), score_code(score_before[1]),
+            score_code(score_after[0]), score_code(score_after[1]),
+            game_before[0], game_before[1], game_after[0], game_after[1],
+            set_before[0], set_before[1], set_after[0], set_after[1])
+        if self.memory_max and len(self.buffer) > self.memory_max * RECORD.size:
+            self.spill_oldest()
+
+    def spill_oldest(self):
+        """Move all but the newest memory_max // 2 records to the spill file"""
+        size = len(self.buffer) - self.memory_max // 2 * RECORD.size
+        if self.spill is None:
+            self.spill = SpillFile(self.spill_dir)
+        self.spill.write(self.spilled * RECORD.size, self.buffer[:size])
+        self.spilled += size // RECORD.size
+        # A fresh buffer: copies and readers may still hold views of the old one
+        self.buffer = self.buffer[size:]
+
+    def truncate(self, length):
+        """Drop every record from index length on"""
+        self.generation += 1
+        if length >= self.spilled:
+            # A new buffer: views share the old one, and the points after the undo would overwrite it
+            self.buffer = self.buffer[:(length - self.spilled) * RECORD.size]
+            return
+        # Undo back into the spilled records: the kept ones move to a new spill file,
+        # copies handed to readers go on reading the old one
+        kept = self.spill.read(0, length * RECORD.size)
+        self.spill = SpillFile(self.spill_dir)
+        self.spill.write(0, kept)
+        self.buffer = bytearray()
+        self.spilled = length
+
+    def copy(self):
+        """Read-only view of the log as it is now, safe to read while the log changes; O(1).
+
+        The buffer and the spill file are shared: the bytes the view covers
+        never change.
+        """
+        log = PointLog.__new__(PointLog)
+        log.buffer = self.buffer
+        log.end = self.nbytes
+        log.spilled = self.spilled
+        log.spill = self.spill
+        log.generation = self.generation
+        log.started_wall_ns = self.started_wall_ns
+        log.started_mono_ns = self.started_mono_ns
+        return log
+
+    def records(self, start=0, stop=None):
+        """Iterate raw record tuples in [start, stop), reading spilled ones back in chunks"""
+        count = len(self)
+        stop = count if stop is None else min(stop, count)
+        start = max(0, min(start, stop))
+        while start < min(stop, self.spilled):
+            chunk_stop = min(stop, self.spilled, start + SPILL_READ_RECORDS)
+            yield from RECORD.iter_unpack(self.spill.read(start * RECORD.size, (chunk_stop - start) * RECORD.size))
+            start = chunk_stop
+        if start < stop:
+            offset = self.spilled
+            # A slice, not a memoryview: an export would stop the log's appends resizing a shared buffer
+            yield from RECORD.iter_unpack(self.buffer[(start - offset) * RECORD.size:(stop - offset) * RECORD.size])
+
+    def to_bytes(self):
+        """Every record, spilled ones included, as one bytes object (archive and snapshots)"""
+        spilled = self.spill.read(0, self.spilled_bytes) if self.spilled else b''
+        return spilled + self.buffer[:self.nbytes]
+
+    def expand(self, record):
+        """Expand a raw record to the /match_history entry shape"""
+        (elapsed_ns, team, action,
+         score_b1, score_b2, score_a1, score_a2,
+         game_b1, game_b2, game_a1, game_a2,
+         set_b1, set_b2, set_a1, set_a2) = record
+        return {
+            'timestamp': datetime.fromtimestamp((self.started_wall_ns + elapsed_ns) / 1e9).isoformat(),
+            'action': ACTIONS[action],
+            'team': TEAMS[team],
+            'scores': {
+                'before': {'score_1': score_value(score_b1), 'score_2': score_value(score_b2)},
+                'after': {'score_1': score_value(score_a1), 'score_2': score_value(score_a2)}
+            },
+            'games': {
+                'before': {'game_1': game_b1, 'game_2': game_b2},
+                'after': {'game_1': game_a1, 'game_2': game_a2}
+            },
+            'sets': {
+                'before': {'set_1': set_b1, 'set_2': set_b2},
+                'after': {'set_1': set_a1, 'set_2': set_a2}
+            }
+        }
+
+    def entries(self, start=0, stop=None):
+        """Iterate expanded history entries in [start, stop)"""
+        for record in self.records(start, stop):
+            yield self.expand(record)
+
+    def to_list(self):
+        """The whole history in its JSON shape"""
+        return list(self.entries())
+
+    def dump(self):
+        """JSON-safe copy of the log for snapshots"""
+        return {
+            'started_wall_ns': self.started_wall_ns,
+            'generation': self.generation,
+            'records': base64.b64encode(self.to_bytes()).decode('ascii')
+        }
+
+    @classmethod
+    def load(cls, data):
+        """Rebuild a log from dump()"""
+        log = cls(data['started_wall_ns'])
+        log.generation = data.get('generation', log.generation)
+        log.buffer = bytearray(base64.b64decode(data['records']))
+        if log.memory_max and len(log.buffer) > log.memory_max * RECORD.size:
+            log.spill_oldest()
+        return log
+
+
+def seconds(ns):
+    """Nanoseconds as seconds for output, None stays None"""
+    return None if ns is None else round(ns / 1e9, 1)
+
+
+def timed_game(game):
+    """Output shape of a [duration_ns, game number, set number] record"""
+    return None if game is None else {'duration_s': seconds(game[0]), 'game': game[1], 'set': game[2]}
+
+
+class MatchStats:
+    """Running match statistics, updated per event so reads are O(1).
+
+    Timing figures come from each point's time: the gaps between consecutive
+    points, and game and set durations from their first to their last point.
+
+    Breaks and the serving team need the first server, given at reset_match;
+    without it they are None rather than guessed.
+    """
+
+    __slots__ = ('counts', 'rallies', 'games_played', 'breaks', 'first_server', 'tiebreak_points',
+                 'streak_team', 'streak_length', 'longest_streak',
+                 'last_point_ns', 'gaps', 'gap_total_ns', 'gap_min_ns', 'gap_max_ns',
+                 'game_start_ns', 'games_timed', 'game_total_ns', 'shortest_game', 'longest_game',
+                 'set_start_ns', 'set_durations')
+
+    def __init__(self, first_server=None):
+        self.counts = [0] * (len(ACTIONS) * len(TEAMS))  # Events per (action, team)
+        self.rallies = [0, 0]          # Every point won, including game-winning points
+        self.games_played = 0
+        self.breaks = [0, 0]           # Service games won by the receiving team (tie-breaks are not)
+        self.first_server = None if first_server is None else TEAM_CODES[first_server]  # None: unknown
+        self.tiebreak_points = 0       # Points played in the current tie-break
+        self.streak_team = None        # Team on the current run of consecutive points
+        self.streak_length = 0
+        self.longest_streak = [0, 0]
+        self.last_point_ns = None      # Time of the last point played
+        self.gaps = 0                  # Gaps between consecutive points, and their total, shortest and longest
+        self.gap_total_ns = 0
+        self.gap_min_ns = None
+        self.gap_max_ns = None
+        self.game_start_ns = None      # First point of the current game, None before it
+        self.games_timed = 0           # Games played since timing started, and their summed durations
+        self.game_total_ns = 0
+        self.shortest_game = None      # [duration_ns, game number, set number]
+        self.longest_game = None
+        self.set_start_ns = None       # First point of the current set
+        self.set_durations = []        # Duration of each completed set (ns)
+
+    def record(self, action, team):
+        """Count one history event"""
+        self.counts[ACTION_CODES[action] * len(TEAMS) + TEAM_CODES[team]] += 1
+
+    def recount(self, records):
+        """Count raw point log records (as yielded by PointLog.records)"""
+        for record in records:
+            self.counts[record[2] * len(TEAMS) + record[1]] += 1
+
+    def count(self, action, team):
+        """Number of events for an action won by a team"""
+        return self.counts[ACTION_CODES[action] * len(TEAMS) + TEAM_CODES[team]]
+
+    def server(self):
+        """Team serving the next point, None when the first server is unknown.
+
+        Service alternates every game, a tie-break included, so the team that
+        served first in a tie-break receives first in the next set. Within a
+        tie-break the serve changes after the first point, then every two.
+        """
+        if self.first_server is None:
+            return None
+        return self.first_server ^ (self.games_played & 1) ^ (((self.tiebreak_points + 1) // 2) & 1)
+
+    def rally(self, team, game_won, at_ns, set_won=False, tiebreak=False):
+        """Count one point played at at_ns (in a tie-break or not), and the game and set it closed if any"""
+        code = TEAM_CODES[team]
+        self.rallies[code] += 1
+        self.time_point(at_ns, game_won, set_won)
+
+        if self.streak_team == code:
+            self.streak_length += 1
+        else:
+            self.streak_team = code
+            self.streak_length = 1
+        if self.streak_length > self.longest_streak[code]:
+            self.longest_streak[code] = self.streak_length
+
+        if game_won:
+            if not tiebreak and self.first_server is not None and code != self.server():
+                self.breaks[code] += 1
+            self.games_played += 1
+            self.tiebreak_points = 0
+        elif tiebreak:
+            self.tiebreak_points += 1
+
+    def time_point(self, at_ns, game_won, set_won):
+        """Update the timing aggregates with one point (before games_played counts its game)"""
+        if self.last_point_ns is not None:
+            gap = at_ns - self.last_point_ns
+            self.gaps += 1
+            self.gap_total_ns += gap
+            if self.gap_min_ns is None or gap < self.gap_min_ns:
+                self.gap_min_ns = gap
+            if self.gap_max_ns is None or gap > self.gap_max_ns:
+                self.gap_max_ns = gap
+        self.last_point_ns = at_ns
+        if self.game_start_ns is None:
+            self.game_start_ns = at_ns
+        if self.set_start_ns is None:
+            self.set_start_ns = at_ns
+
+        if game_won:
+            duration = at_ns - self.game_start_ns
+            game = [duration, self.games_played + 1, len(self.set_durations) + 1]
+            self.games_timed += 1
+            self.game_total_ns += duration
+            if self.shortest_game is None or duration < self.shortest_game[0]:
+                self.shortest_game = game
+            if self.longest_game is None or duration > self.longest_game[0]:
+                self.longest_game = game
+            self.game_start_ns = None
+        if set_won:
+            self.set_durations.append(at_ns - self.set_start_ns)
+            self.set_start_ns = None
+
+    def timing(self):
+        """Rally pace and game/set durations in seconds, from the running aggregates"""
+        return {
+            'time_between_points': {
+                'average_s': seconds(self.gap_total_ns // self.gaps) if self.gaps else None,
+                'shortest_s': seconds(self.gap_min_ns),
+                'longest_s': seconds(self.gap_max_ns)
+            },
+            'average_game_s': seconds(self.game_total_ns // self.games_timed) if self.games_timed else None,
+            'shortest_game': timed_game(self.shortest_game),
+            'longest_game': timed_game(self.longest_game),
+            'set_durations_s': [seconds(duration) for duration in self.set_durations]
+        }
+
+    def summary(self):
+        """Derived statistics: points per game, breaks and streaks"""
+        total_rallies = self.rallies[0] + self.rallies[1]
+        return {
+            'total_points_played': total_rallies,
+            'games_played': self.games_played,
+            'points_per_game': round(total_rallies / self.games_played, 2) if self.games_played else None,
+            'serving': TEAMS[self.server()] if self.first_server is not None else None,
+            'current_streak': {
+                'team': TEAMS[self.streak_team] if self.streak_team is not None else None,
+                'points': self.streak_length
+            },
+            'teams': {
+                team: {
+                    'points_won': self.rallies[code],
+                    'breaks': self.breaks[code] if self.first_server is not None else None,
+                    'longest_streak': self.longest_streak[code]
+                }
+                for code, team in enumerate(TEAMS)
+            },
+            'timing': self.timing()
+        }
+
+    def dump(self):
+        """JSON-safe copy of the counters for snapshots"""
+        return {name: list(value) if isinstance(value, list) else value
+                for name in self.__slots__ for value in (getattr(self, name),)}
+
+    def copy(self):
+        """Independent copy of the counters: fixed-size fields, plus one duration per set played"""
+        stats = MatchStats.__new__(MatchStats)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            setattr(stats, name, value[:] if isinstance(value, list) else value)
+        return stats
+
+    @classmethod
+    def load(cls, data):
+        """Rebuild statistics from dump()"""
+        stats = cls()
+        for name in cls.__slots__:
+            if name not in data:
+                continue  # Dumps from before the timing figures: they start from zero
+            value = data[name]
+            setattr(stats, name, list(value) if isinstance(value, list) else value)
+        return stats
+
+
+CHECKPOINT_INTERVAL = 32  # Points between timeline checkpoints
+CHECKPOINTS_RESIDENT = 8  # Newest timeline checkpoints kept in memory once the timeline spills
+# Wall-clock ns of a point, point log length before it, team code | game_won << 1
+POINT = struct.Struct('<qIB')
+
+
+class PointTimeline:
+    """Every point of the match, for undo/redo by point number.
+
+    Per point it keeps one POINT record: its wall-clock time, the point log
+    length before it and the team (plus a game-won flag). Every
+    CHECKPOINT_INTERVAL points it keeps a checkpoint (engine state,
+    statistics); any earlier position is rebuilt from the nearest checkpoint
+    plus at most CHECKPOINT_INTERVAL replayed points, however long the match is.
+
+    It spills along with the point log: past PointLog.memory_max points the
+    oldest half of the records goes to a spill file, and all but the newest
+    CHECKPOINTS_RESIDENT checkpoints go to another one as JSON, read back
+    when an undo reaches that far.
+    """
+
+    __slots__ = ('buffer', 'spilled', 'spill', 'checkpoints', 'checkpoints_spilled', 'checkpoint_offsets',
+                 'checkpoint_spill', 'cursor')
+
+    def __init__(self, state, stats):
+        self.buffer = bytearray()       # POINT records from index `spilled` on
+        self.spilled = 0                # Records before them, in the spill file
+        self.spill = None               # SpillFile of the records, created on the first spill
+        self.checkpoints = [(state, stats.dump())]  # Checkpoints from index `checkpoints_spilled` on
+        self.checkpoints_spilled = 0
+        self.checkpoint_offsets = array('Q', [0])   # Start of each spilled checkpoint, then the end
+        self.checkpoint_spill = None
+        self.cursor = 0                 # Points currently applied, the rest can be redone
+
+    def __len__(self):
+        return self.spilled + len(self.buffer) // POINT.size
+
+    def __getitem__(self, position):
+        """(at_ns, log_length, point) of one point, read back from the spill file if need be"""
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        if position < self.spilled:
+            return POINT.unpack(self.spill.read(position * POINT.size, POINT.size))
+        return POINT.unpack_from(self.buffer, (position - self.spilled) * POINT.size)
+
+    @property
+    def nbytes(self):
+        """Memory held by the resident records and the checkpoint index (not the checkpoints themselves)"""
+        return len(self.buffer) + self.checkpoint_offsets.itemsize * len(self.checkpoint_offsets)
+
+    @property
+    def spilled_bytes(self):
+        """Disk held by the spilled records and checkpoints"""
+        return self.spilled * POINT.size + self.checkpoint_offsets[-1]
+
+    def record(self, team_code, game_won, at_ns, log_length, state, stats):
+        """Append the point just applied at the cursor, dropping any redo tail"""
+        if self.cursor < len(self):
+            self.truncate(self.cursor)
+        self.buffer += POINT.pack(at_ns, log_length, team_code | (game_won << 1))
+        if PointLog.memory_max and len(self.buffer) > PointLog.memory_max * POINT.size:
+            self.spill_oldest()
+        self.advance(state, stats)
+
+    def advance(self, state, stats):
+        """Move the cursor one point forward, checkpointing on interval boundaries"""
+        self.cursor += 1
+        count = self.checkpoints_spilled + len(self.checkpoints)
+        if self.cursor % CHECKPOINT_INTERVAL == 0 and count == self.cursor // CHECKPOINT_INTERVAL:
+            self.checkpoints.append((state, stats.dump()))
+            if PointLog.memory_max and self.spilled and len(self.checkpoints) > CHECKPOINTS_RESIDENT:
+                self.spill_checkpoints()
+
+    def spill_oldest(self):
+        """Move all but the newest memory_max // 2 records to the spill file"""
+        size = len(self.buffer) - PointLog.memory_max // 2 * POINT.size
+        if self.spill is None:
+            self.spill = SpillFile(PointLog.spill_dir)
+        self.spill.write(self.spilled * POINT.size, self.buffer[:size])
+        self.spilled += size // POINT.size
+        del self.buffer[:size]
+        if len(self.checkpoints) > CHECKPOINTS_RESIDENT:
+            self.spill_checkpoints()
+
+    def spill_checkpoints(self):
+        """Move all but the newest CHECKPOINTS_RESIDENT checkpoints to their spill file"""
+        if self.checkpoint_spill is None:
+            self.checkpoint_spill = SpillFile(PointLog.spill_dir)
+        count = len(self.checkpoints) - CHECKPOINTS_RESIDENT
+        encoded = [json.dumps(checkpoint, separators=(',', ':')).encode() for checkpoint in self.checkpoints[:count]]
+        self.checkpoint_spill.write(self.checkpoint_offsets[-1], b''.join(encoded))
+        for data in encoded:
+            self.checkpoint_offsets.append(self.checkpoint_offsets[-1] + len(data))
+        self.checkpoints_spilled += count
+        del self.checkpoints[:count]
+
+    def checkpoint(self, index):
+        """(state, statistics dump) of checkpoint `index`"""
+        if index >= self.checkpoints_spilled:
+            return self.checkpoints[index - self.checkpoints_spilled]
+        start, stop = self.checkpoint_offsets[index], self.checkpoint_offsets[index + 1]
+        state, stats = json.loads(self.checkpoint_spill.read(start, stop - start))
+        return state_from_list(state), stats
+
+    def records(self, start=0, stop=None):
+        """Iterate POINT tuples in [start, stop), reading spilled ones back in chunks"""
+        count = len(self)
+        stop = count if stop is None else min(stop, count)
+        start = max(0, min(start, stop))
+        while start < min(stop, self.spilled):
+            chunk_stop = min(stop, self.spilled, start + SPILL_READ_RECORDS)
+            yield from POINT.iter_unpack(self.spill.read(start * POINT.size, (chunk_stop - start) * POINT.size))
+            start = chunk_stop
+        if start < stop:
+            offset = self.spilled
+            yield from POINT.iter_unpack(self.buffer[(start - offset) * POINT.size:(stop - offset) * POINT.size])
+
+    def truncate(self, length):
+        """Forget the points from length on"""
+        if length >= self.spilled:
+            del self.buffer[(length - self.spilled) * POINT.size:]
+        else:
+            # Nothing shares the spill file: later spills overwrite the dropped records in place
+            self.buffer = bytearray()
+            self.spilled = length
+        kept = length // CHECKPOINT_INTERVAL + 1
+        if kept >= self.checkpoints_spilled:
+            del self.checkpoints[kept - self.checkpoints_spilled:]
+        else:
+            self.checkpoints = []
+            self.checkpoints_spilled = kept
+            del self.checkpoint_offsets[kept + 1:]
+
+    def rewind(self, position):
+        """Nearest checkpoint at or before `position` points, and what to replay from it.
+
+        Returns (state, stats, [(team_code, game_won, at_ns), ...], point log
+        length at the checkpoint).
+        """
+        base = position // CHECKPOINT_INTERVAL * CHECKPOINT_INTERVAL
+        state, stats = self.checkpoint(base // CHECKPOINT_INTERVAL)
+        records = list(self.records(base, position + 1))
+        replay = [(point & 1, point >> 1, at_ns) for at_ns, _, point in records[:position - base]]
+        return state, MatchStats.load(stats), replay, records[0][1]
+
+    def dump(self):
+        """JSON-safe copy of the timeline for snapshots, spilled points and checkpoints included"""
+        records = list(self.records())
+        return {
+            'points': base64.b64encode(bytes(point for _, _, point in records)).decode('ascii'),
+            'times': [at_ns for at_ns, _, _ in records],
+            'marks': [log_length for _, log_length, _ in records],
+            'checkpoints': [list(self.checkpoint(index)) for index in range(self.checkpoints_spilled + len(self.checkpoints))],
+            'cursor': self.cursor
+        }
+
+    @classmethod
+    def load(cls, data):
+        """Rebuild a timeline from dump()"""
+        timeline = cls.__new__(cls)
+        timeline.buffer = bytearray()
+        timeline.spilled = 0
+        timeline.spill = None
+        timeline.checkpoints = [(state_from_list(state), stats) for state, stats in data['checkpoints']]
+        timeline.checkpoints_spilled = 0
+        timeline.checkpoint_offsets = array('Q', [0])
+        timeline.checkpoint_spill = None
+        timeline.cursor = data['cursor']
+        for point, at_ns, log_length in zip(base64.b64decode(data['points']), data['times'], data['marks']):
+            timeline.buffer += POINT.pack(at_ns, log_length, point)
+            if PointLog.memory_max and len(timeline.buffer) > PointLog.memory_max * POINT.size:
+                timeline.spill_oldest()
+        return timeline
@@ -14,14 +14,16 @@
         // LOCAL: Simple storage for sets history only
         let totalPointsBlack = 0;
         let totalPointsYellow = 0;
-        let totalGamesBlack = 0;
-        let totalGamesYellow = 0;
         let matchStartTime = Date.now();
         let setsHistory = []; // Only track sets, not individual points/games
 
         // API base URL
         const API_BASE = "http://localhost:5000";
 
+        // Court served by this screen (?court=3), one backend serves every court
+        const COURT_ID = new URLSearchParams(window.location.search).get('court') || '1';
+        const COURT_API = `${API_BASE}/courts/${encodeURIComponent(COURT_ID)}`;
+
         // Enhanced logo setup
         function setupLogo() {
             const logo = document.getElementById('logoClick');
@@ -94,26 +96,181 @@
             }
         }
 
+        // Scoring engine, the same rules as padel_scoring.py. It only predicts:
+        // a point is shown the moment it is pressed, the backend's result wins.
+        const TENNIS_SCORES = [0, 15, 30, 40];
+        const DEFAULT_RULES = { sets_to_win: 2, games_per_set: 6, golden_point: true, tiebreak: false, tiebreak_points: 7 };
+
+        function newScoreboard(rules, teams) {
+            return {
+                version: 0,
+                score_1: 0, score_2: 0, point_1: 0, point_2: 0,
+                game_1: 0, game_2: 0, set_1: 0, set_2: 0,
+                tiebreak: false, set_history: [], match_won: false, winner: null,
+                rules: rules || DEFAULT_RULES,
+                teams: teams || { black: 'BLACK TEAM', yellow: 'YELLOW TEAM' }
+            };
+        }
+
+        function displayScore(state) {
+            if (state.tiebreak) return [state.point_1, state.point_2];
+            if (state.point_1 === 4) return ['AD', 40];
+            if (state.point_2 === 4) return [40, 'AD'];
+            return [TENNIS_SCORES[state.point_1], TENNIS_SCORES[state.point_2]];
+        }
+
+        function applyPointLocally(state, team) {
+            if (state.match_won) return state;
+            const rules = state.rules || DEFAULT_RULES;
+            const next = Object.assign({}, state);
+            const mine = team === 'black' ? 'point_1' : 'point_2';
+            const theirs = team === 'black' ? 'point_2' : 'point_1';
+            let gameWon = false;
+
+            if (state.tiebreak) {
+                next[mine] = state[mine] + 1;
+                gameWon = next[mine] >= rules.tiebreak_points && next[mine] - state[theirs] >= 2;
+            } else if (state[mine] === 4 || (state[mine] === 3 && (state[theirs] < 3 || rules.golden_point))) {
+                gameWon = true;
+            } else if (state[theirs] === 4) {
+                next[mine] = 3;  // Back to deuce
+                next[theirs] = 3;
+            } else {
+                next[mine] = state[mine] + 1;
+            }
+            if (gameWon) winGameLocally(next, team, rules);
+            [next.score_1, next.score_2] = displayScore(next);
+            return next;
+        }
+
+        function winGameLocally(next, team, rules) {
+            const wasTiebreak = next.tiebreak;
+            next.point_1 = 0;
+            next.point_2 = 0;
+            if (team === 'black') next.game_1++; else next.game_2++;
+            const mine = team === 'black' ? next.game_1 : next.game_2;
+            const theirs = team === 'black' ? next.game_2 : next.game_1;
+
+            if (wasTiebreak || (mine >= rules.games_per_set && mine - theirs >= 2)) {
+                next.set_history = next.set_history.concat([`${next.game_1}-${next.game_2}`]);
+                if (team === 'black') next.set_1++; else next.set_2++;
+                next.game_1 = 0;
+                next.game_2 = 0;
+                next.tiebreak = false;
+                if (Math.max(next.set_1, next.set_2) >= rules.sets_to_win) {
+                    next.match_won = true;
+                    next.winner = {
+                        team: team,
+                        team_name: next.teams[team],
+                        final_sets: `${next.set_1}-${next.set_2}`,
+                        match_summary: next.set_history.join(', ')
+                    };
+                }
+            } else {
+                next.tiebreak = rules.tiebreak && next.game_1 === rules.games_per_set && next.game_2 === rules.games_per_set;
+            }
+        }
+
+        // Last scoreboard confirmed by the backend; its version is the court's sequence number
+        let confirmed = newScoreboard();
+        // What the screen shows: the confirmed scoreboard plus the points still waiting for the backend
+        let displayed = null;
+
+        function scoreboardKey(state) {
+            return JSON.stringify([state.score_1, state.score_2, state.game_1, state.game_2, state.set_1, state.set_2,
+                                   state.set_history, state.match_won, state.winner && state.winner.team]);
+        }
+
+        // Recompute the prediction and redraw only when it changed
+        function render() {
+            const predicted = pendingPoints.reduce((state, point) => applyPointLocally(state, point.team), confirmed);
+            if (displayed && scoreboardKey(displayed) === scoreboardKey(predicted)) return;
+            if (displayed && displayed.predicted && !predicted.predicted) {
+                console.log('Prediction corrected by the backend');  // Rolled back to the confirmed score
+            }
+            displayed = Object.assign({}, predicted, { predicted: pendingPoints.length > 0 });
+            showScoreboard(displayed);
+        }
+
+        function showScoreboard(state) {
+            const wasWon = matchWon;
+            score_1 = state.score_1;
+            score_2 = state.score_2;
+            games_1 = state.game_1;
+            games_2 = state.game_2;
+            sets_1 = state.set_1 || 0;
+            sets_2 = state.set_2 || 0;
+            setsHistory = (state.set_history || []).map((set) => {
+                const [blackGames, yellowGames] = set.split('-').map(Number);
+                return { blackGames, yellowGames, winner: blackGames > yellowGames ? 'black' : 'yellow' };
+            });
+            matchWon = state.match_won || false;
+            winnerData = state.winner || null;
+
+            updateScoreboard();
+
+            if (matchWon && winnerData) {
+                showSetsWinner(winnerData);
+            } else if (wasWon) {
+                document.getElementById('winnerDisplay').style.display = 'none';  // Winning point taken back
+            }
+        }
+
+        // Replication term of the newest primary heard from. A backend answering with an older
+        // term was fenced off by a promoted standby: its scores are stale, its acks do not count.
+        let knownTerm = Number(localStorage.getItem('padel_term') || 0);
+
+        function freshTerm(term) {
+            if (term === undefined || term === null) return true;  // Backend without replication
+            term = Number(term);
+            if (term < knownTerm) return false;
+            if (term > knownTerm) {
+                knownTerm = term;
+                localStorage.setItem('padel_term', String(term));
+            }
+            return true;
+        }
+
+        // A full scoreboard from the backend (stream snapshot, response, /game_state).
+        // A snapshot or /game_state is authoritative: after a restart, a failover or an
+        // evicted court the backend may count from a lower version than the screen saw.
+        function applyConfirmed(data, authoritative) {
+            if (authoritative || data.version === undefined || data.version >= confirmed.version) {
+                confirmed = Object.assign({}, confirmed, data);
+            }
+            render();
+        }
+
+        // A stream delta: only the changed fields, applied in sequence order
+        function applyDelta(delta) {
+            if (delta.version <= confirmed.version) return;  // Already known from a response
+            if (delta.version !== confirmed.version + 1) {
+                fetchGameState();  // Missed a change: resync from the full state
+                return;
+            }
+            confirmed = Object.assign({}, confirmed, delta);
+            if (delta.request_ids) {
+                // These points are now part of the confirmed score
+                const done = new Set(delta.request_ids);
+                pendingPoints = pendingPoints.filter((point) => !done.has(point.request_id));
+                savePendingPoints();
+            }
+            render();
+        }
+
         // Fetch game state from backend
         async function fetchGameState() {
             try {
-                const response = await fetch(`${API_BASE}/game_state`);
+                const response = await fetch(`${COURT_API}/game_state`);
+                if (!freshTerm(response.headers.get('X-Padel-Term'))) return;
+                if (response.status === 404) {
+                    // No match on this court yet (or it was evicted): a fresh scoreboard
+                    applyConfirmed(newScoreboard(confirmed.rules, confirmed.teams), true);
+                    return;
+                }
                 const data = await response.json();
 
-                score_1 = data.score_1;
-                score_2 = data.score_2;
-                games_1 = data.game_1;
-                games_2 = data.game_2;
-                sets_1 = data.set_1 || 0;
-                sets_2 = data.set_2 || 0;
-                matchWon = data.match_won || false;
-                winnerData = data.winner || null;
-
-                updateScoreboard();
-
-                if (matchWon && winnerData) {
-                    showSetsWinner(winnerData);
-                }
+                applyConfirmed(data, true);
 
                 console.log('Game state synced');
             } catch (error) {
@@ -121,6 +278,39 @@
             }
         }
 
+        // Live score stream: the backend pushes every change, no polling needed
+        let streamConnected = false;
+        const STREAM_RETRY_MS = 30000;  // Wait before asking again for a refused stream
+        const POLL_MS = 2000;           // /game_state polling while there is no stream
+
+        let source = null;
+
+        function connectStream() {
+            if (!window.EventSource) return;
+            if (source && source.readyState !== EventSource.CLOSED) return;  // Already open or reconnecting
+
+            source = new EventSource(`${COURT_API}/stream`);
+            source.addEventListener('snapshot', (event) => {
+                const data = JSON.parse(event.data);
+                if (!freshTerm(data.term)) return;
+                streamConnected = true;
+                applyConfirmed(data, true);
+                flushPendingPoints();  // Back online: resync queued points in one round trip
+            });
+            source.addEventListener('delta', (event) => {
+                const delta = JSON.parse(event.data);
+                if (freshTerm(delta.term)) applyDelta(delta);
+            });
+            source.onerror = () => {
+                // EventSource reconnects by itself and receives a fresh snapshot
+                streamConnected = false;
+                if (source.readyState === EventSource.CLOSED) {
+                    // Refused, e.g. the backend is at its stream limit: poll, and ask again later
+                    setTimeout(connectStream, STREAM_RETRY_MS);
+                }
+            };
+        }
+
         // Update scoreboard display
         function updateScoreboard() {
             document.getElementById('score1').textContent = score_1;
@@ -262,30 +452,96 @@
             `);
         }
 
-        // Send point to backend
-        async function sendPointToBackend(team) {
+        // Points not yet confirmed by the backend, kept across page reloads.
+        // Each carries a request_id, so resending one the backend already got is harmless
+        // for as long as the backend remembers it (REQUEST_ID_TTL): older points are dropped.
+        const PENDING_KEY = `padel_pending_points_${COURT_ID}`;
+        const PENDING_MAX_AGE_MS = 24 * 60 * 60 * 1000;  // Longest offline queue, the backend's REQUEST_ID_TTL
+        const BATCH_MAX = 500;                            // Most points per /add_points request, the backend's BATCH_MAX
+        let pendingPoints = JSON.parse(localStorage.getItem(PENDING_KEY) || '[]')
+            .map((point) => Object.assign({ queued_at: Date.now() }, point));  // Queued before points carried their time
+        let flushInFlight = null;
+        let sendingIds = new Set();  // request_ids of the batch on its way to the backend
+
+        function newRequestId() {
+            if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+            return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+        }
+
+        function savePendingPoints() {
+            localStorage.setItem(PENDING_KEY, JSON.stringify(pendingPoints));
+        }
+
+        // Past the backend's request_id memory a resent point could count twice: drop it instead
+        function dropStalePoints() {
+            const oldest = Date.now() - PENDING_MAX_AGE_MS;
+            const kept = pendingPoints.filter((point) => point.queued_at >= oldest);
+            if (kept.length < pendingPoints.length) {
+                console.warn(`Dropped ${pendingPoints.length - kept.length} point(s) queued offline for over 24 hours`);
+                pendingPoints = kept;
+                savePendingPoints();
+            }
+        }
+
+        // Send the queued points in scoring order, BATCH_MAX per /add_points request
+        function flushPendingPoints() {
+            if (!flushInFlight) {
+                flushInFlight = sendPendingPoints().finally(() => { flushInFlight = null; });
+            }
+            return flushInFlight;
+        }
+
+        async function sendPendingPoints() {
+            dropStalePoints();
+            while (pendingPoints.length > 0) {
+                if (!await sendBatch(pendingPoints.slice(0, BATCH_MAX))) return false;
+            }
+            return true;
+        }
+
+        async function sendBatch(batch) {
+            sendingIds = new Set(batch.map((point) => point.request_id));
             try {
-                const response = await fetch(`${API_BASE}/add_point`, {
+                const response = await fetch(`${COURT_API}/add_points`, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ team: team })
+                    body: JSON.stringify({ points: batch })
                 });
+                if (!response.ok) return false;
+                if (!freshTerm(response.headers.get('X-Padel-Term'))) return false;  // Kept for the current primary
 
-                if (response.ok) {
-                    const data = await response.json();
-                    if (data.match_won) {
-                        showSetsWinner(data.winner);
-                    }
-                    return true;
-                }
+                const data = await response.json();
+                pendingPoints = pendingPoints.filter((point) => !sendingIds.has(point.request_id));
+                savePendingPoints();
+                console.log(`Synced ${data.applied} point(s), ${data.duplicates} already applied, version ${data.version}`);
+
+                // Reconcile: the backend's scoreboard at this version replaces the prediction
+                applyConfirmed(Object.assign({ version: data.version }, data.scoreboard));
+                connectStream();  // The first point creates the court, its stream is there now
+                return true;
             } catch (error) {
-                console.log('Backend unavailable, using local mode');
                 return false;
+            } finally {
+                sendingIds = new Set();
             }
         }
 
+        // Send point to backend
+        async function sendPointToBackend(team) {
+            pendingPoints.push({ team: team, request_id: newRequestId(), queued_at: Date.now() });
+            savePendingPoints();
+            render();  // Shown now, confirmed in the background
+
+            if (flushInFlight) await flushInFlight;  // Let an earlier batch land first
+            if (await flushPendingPoints()) {
+                return true;
+            }
+            console.log('Backend unavailable, using local mode (point queued)');
+            return false;
+        }
+
         // Add point with simplified tracking
-        async function addPoint(team) {
+        function addPoint(team) {
             if (matchWon) {
                 alert('Match is finished! Start a new match.');
                 return;
@@ -293,20 +549,11 @@
 
             showClickFeedback(team);
 
-            // Store last action for undo
+            // Store last action for undo (the score itself comes from the backend)
             lastAction = {
                 team: team,
-                prevScore1: score_1,
-                prevScore2: score_2,
-                prevGames1: games_1,
-                prevGames2: games_2,
-                prevSets1: sets_1,
-                prevSets2: sets_2,
                 prevTotalPointsBlack: totalPointsBlack,
-                prevTotalPointsYellow: totalPointsYellow,
-                prevTotalGamesBlack: totalGamesBlack,
-                prevTotalGamesYellow: totalGamesYellow,
-                prevSetsHistoryLength: setsHistory.length
+                prevTotalPointsYellow: totalPointsYellow
             };
 
             // Update local point counters
@@ -316,118 +563,34 @@
                 totalPointsYellow++;
             }
 
-            // Try backend first
-            const backendSuccess = await sendPointToBackend(team);
-
-            if (backendSuccess) {
-                await fetchGameState();
-            } else {
-                // Local logic
-                if (team === 'black') {
-                    score_1 = nextTennisScore(score_1);
-                    if (score_1 === 0) {
-                        games_1++;
-                        totalGamesBlack++;
-                        score_2 = 0;
-                        checkSetWin('black');
-                    }
-                } else if (team === 'yellow') {
-                    score_2 = nextTennisScore(score_2);
-                    if (score_2 === 0) {
-                        games_2++;
-                        totalGamesYellow++;
-                        score_1 = 0;
-                        checkSetWin('yellow');
-                    }
-                }
-                updateScoreboard();
-            }
-        }
-
-        // Check set win with simplified history tracking
-        function checkSetWin(team) {
-            if (team === 'black' && games_1 >= 6 && games_1 - games_2 >= 2) {
-                // Store set result
-                setsHistory.push({
-                    blackGames: games_1,
-                    yellowGames: games_2,
-                    winner: 'black'
-                });
-
-                sets_1++;
-                games_1 = 0;
-                games_2 = 0;
-                checkMatchWin('black');
-            } else if (team === 'yellow' && games_2 >= 6 && games_2 - games_1 >= 2) {
-                // Store set result
-                setsHistory.push({
-                    blackGames: games_1,
-                    yellowGames: games_2,
-                    winner: 'yellow'
-                });
-
-                sets_2++;
-                games_1 = 0;
-                games_2 = 0;
-                checkMatchWin('yellow');
-            }
-        }
-
-        // Check match win
-        function checkMatchWin(team) {
-            if ((team === 'black' && sets_1 >= 2) || (team === 'yellow' && sets_2 >= 2)) {
-                const winner = {
-                    team_name: team === 'black' ? 'BLACK TEAM' : 'YELLOW TEAM',
-                    final_sets: `${sets_1}-${sets_2}`,
-                    match_summary: 'Match completed'
-                };
-                winnerData = winner;
-                showSetsWinner(winner);
-            }
-        }
-
-        // Tennis scoring logic
-        function nextTennisScore(current) {
-            switch(current) {
-                case 0: return 15;
-                case 15: return 30;
-                case 30: return 40;
-                case 40: return 0;
-                default: return 0;
-            }
+            // Scored on screen at once; the backend confirms, or corrects it, later
+            sendPointToBackend(team);
         }
 
         // Reset match
         async function resetMatch() {
             if (confirm('Reset the entire match?')) {
                 try {
-                    const response = await fetch(`${API_BASE}/reset_match`, {
+                    const response = await fetch(`${COURT_API}/reset_match`, {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' }
                     });
 
-                    if (response.ok) {
+                    if (response.ok && !streamConnected) {
                         await fetchGameState();
                     }
                 } catch (error) {
-                    // Local reset
-                    score_1 = 0;
-                    score_2 = 0;
-                    games_1 = 0;
-                    games_2 = 0;
-                    sets_1 = 0;
-                    sets_2 = 0;
-                    matchWon = false;
-                    winnerData = null;
-                    updateScoreboard();
+                    // Local reset, same rules and teams
+                    pendingPoints = [];
+                    savePendingPoints();
+                    confirmed = newScoreboard(confirmed.rules, confirmed.teams);
+                    render();
                 }
 
                 // Clear local data
                 totalPointsBlack = 0;
                 totalPointsYellow = 0;
-                totalGamesBlack = 0;
-                totalGamesYellow = 0;
-                setsHistory = [];
+                lastAction = null;
                 matchStartTime = Date.now();
 
                 document.getElementById('winnerDisplay').style.display = 'none';
@@ -435,32 +598,59 @@
             }
         }
 
-        // Undo last point
-        function undoLastPoint() {
-            if (matchWon) {
-                alert('Cannot undo after match is finished!');
-                return;
+        // Undo / redo on the backend, which keeps every point of the match
+        async function sendUndoRedo(direction) {
+            try {
+                const response = await fetch(`${COURT_API}/${direction}`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                const data = await response.json();
+
+                if (response.ok && freshTerm(response.headers.get('X-Padel-Term'))) {
+                    applyConfirmed(Object.assign({ version: data.version }, data.scoreboard));
+                    console.log(`${direction} applied, point ${data.position}`);
+                } else {
+                    console.log(data.error);
+                }
+                return true;
+            } catch (error) {
+                return false;
             }
+        }
 
+        function restoreLastAction() {
             if (lastAction) {
-                score_1 = lastAction.prevScore1;
-                score_2 = lastAction.prevScore2;
-                games_1 = lastAction.prevGames1;
-                games_2 = lastAction.prevGames2;
-                sets_1 = lastAction.prevSets1;
-                sets_2 = lastAction.prevSets2;
-
                 totalPointsBlack = lastAction.prevTotalPointsBlack;
                 totalPointsYellow = lastAction.prevTotalPointsYellow;
-                totalGamesBlack = lastAction.prevTotalGamesBlack;
-                totalGamesYellow = lastAction.prevTotalGamesYellow;
+                lastAction = null;
+            }
+        }
 
-                setsHistory = setsHistory.slice(0, lastAction.prevSetsHistoryLength);
+        // Undo last point
+        async function undoLastPoint() {
+            // A point the backend has not received yet is just dropped from the queue
+            const last = pendingPoints[pendingPoints.length - 1];
+            if (last && !sendingIds.has(last.request_id)) {
+                pendingPoints.pop();
+                savePendingPoints();
+                restoreLastAction();
+                render();
+                console.log('Last queued point undone');
+                return;
+            }
 
-                updateScoreboard();
-                lastAction = null;
-                console.log('Last action undone');
+            if (flushInFlight) await flushInFlight;  // Undo the point itself, not the one before it
+            if (await sendUndoRedo('undo')) {
+                restoreLastAction();
+                return;
             }
+            console.log('Backend unavailable, nothing to undo');
+        }
+
+        // Redo last undone point (backend only)
+        function redoLastPoint() {
+            sendUndoRedo('redo');
         }
 
         // Enhanced logo click
@@ -475,10 +665,23 @@
         document.addEventListener('DOMContentLoaded', function() {
             setupLogo();
             fetchGameState();
+            connectStream();
+            flushPendingPoints();
             updateScoreboard();
             matchStartTime = Date.now();
         });
 
+        // Retry queued points when the connection comes back
+        window.addEventListener('online', flushPendingPoints);
+        setInterval(() => {
+            if (pendingPoints.length > 0) flushPendingPoints();
+        }, 5000);
+
+        // Without a stream (refused or unsupported) the scoreboard is polled
+        setInterval(() => {
+            if (!streamConnected) fetchGameState();
+        }, POLL_MS);
+
         // Auto-update time
         setInterval(() => {
             const now = new Date();
@@ -511,6 +714,10 @@
                 case 'U':
                     undoLastPoint();
                     break;
+                case 'y':
+                case 'Y':
+                    redoLastPoint();
+                    break;
                 case 's':
                 case 'S':
                     fetchGameState();
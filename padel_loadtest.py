@@ -0,0 +1,243 @@
+"""Load test for the padel backend: requests/sec and latency percentiles.
+
+    python padel_loadtest.py --compare                     # dev server vs padel_wsgi, side by side
+    python padel_loadtest.py --spawn wsgi --concurrency 32
+    python padel_loadtest.py --url http://scoreboard.local:5000
+
+Each client is its own process with one keep-alive connection, replaying a
+venue's traffic: screens polling /game_state with If-None-Match, operators
+scoring points, the history page and asset loads. Spawned servers get a
+throwaway event log directory and a free port.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (name, weight): share of the traffic per request type
+MIX = (
+    ('game_state', 50),
+    ('add_point', 15),
+    ('match_history', 10),
+    ('win_probability', 10),
+    ('static', 10),
+    ('courts', 5),
+)
+
+SERVERS = {
+    'dev': [sys.executable, os.path.join(HERE, 'padel_backend.py')],
+    'wsgi': [sys.executable, os.path.join(HERE, 'padel_wsgi.py')],
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Client:
+    """One keep-alive connection replaying the traffic mix against one court"""
+
+    def __init__(self, url, court_id, seed):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.court = f'/courts/{court_id}'
+        self.rng = random.Random(seed)
+        self.etag = None
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """One request, reconnecting when the server closes the connection"""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.conn.request(method, path, body, headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+        if response.will_close:
+            self.conn.close()
+            self.conn = None
+        return response, data
+
+    def step(self, name):
+        """Send one request of the given type, returns True on success"""
+        if name == 'game_state':
+            headers = {'If-None-Match': self.etag} if self.etag else None
+            response, _ = self.request('GET', f'{self.court}/game_state', headers=headers)
+            self.etag = response.getheader('ETag', self.etag)
+            return response.status in (200, 304)
+        if name == 'add_point':
+            team = self.rng.choice(('black', 'yellow'))
+            response, _ = self.request('POST', f'{self.court}/add_point', {'team': team})
+            if response.status == 400:
+                # Match over: start the next one
+                response, _ = self.request('POST', f'{self.court}/reset_match', {})
+            return response.status == 200
+        if name == 'match_history':
+            response, _ = self.request('GET', f'{self.court}/match_history?since=0&limit=50')
+            return response.status == 200
+        if name == 'win_probability':
+            response, _ = self.request('GET', f'{self.court}/win_probability')
+            return response.status == 200
+        if name == 'static':
+            response, _ = self.request('GET', '/padel_js.js', headers={'Accept-Encoding': 'gzip'})
+            return response.status == 200
+        response, _ = self.request('GET', '/courts')
+        return response.status == 200
+
+
+def run_client(args):
+    """Worker process: replay the mix until the deadline, return latencies per request type"""
+    url, court_id, seed, deadline = args
+    client = Client(url, court_id, seed)
+    client.request('POST', f'{client.court}/reset_match', {})  # Reads of a court with no match are 404
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    latencies = {name: [] for name in names}
+    errors = 0
+    while time.time() < deadline:
+        name = client.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            ok = client.step(name)
+        except (OSError, http.client.HTTPException):
+            ok = False
+        if ok:
+            latencies[name].append(time.perf_counter() - started)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def run_load(url, concurrency, duration, courts):
+    """Drive the server with `concurrency` clients for `duration` seconds and summarize"""
+    deadline = time.time() + duration
+    jobs = [(url, f'load{i % courts}', i, deadline) for i in range(concurrency)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(concurrency) as pool:
+        results = pool.map(run_client, jobs)
+    elapsed = time.perf_counter() - started
+
+    merged = {name: [] for name, _ in MIX}
+    errors = 0
+    for latencies, client_errors in results:
+        errors += client_errors
+        for name, values in latencies.items():
+            merged[name].extend(values)
+
+    def summarize(values):
+        values.sort()
+        return {
+            'requests': len(values),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2) if values else None,
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2) if values else None
+        }
+
+    every = sorted(value for values in merged.values() for value in values)
+    summary = summarize(every)
+    summary['requests_per_sec'] = round(len(every) / elapsed, 1)
+    summary['errors'] = errors
+    summary['endpoints'] = {name: summarize(values) for name, values in merged.items()}
+    return summary
+
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def spawn(kind, data_dir, **env_vars):
+    """Start a server of the given kind, returns (process, url) once it answers /health"""
+    port = free_port()
+    env = dict(os.environ, PADEL_PORT=str(port), PADEL_DATA_DIR=data_dir, PADEL_MAX_COURTS='1000', **env_vars)
+    process = subprocess.Popen(SERVERS[kind], cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process, url
+        except OSError:
+            time.sleep(0.1)
+    stop(process)
+    raise RuntimeError(f'{kind} server did not start')
+
+
+def stop(process):
+    """Stop a spawned server and everything it started (the dev reloader forks a child)"""
+    try:
+        os.killpg(process.pid, 15)
+    except ProcessLookupError:
+        pass
+    process.wait(timeout=10)
+
+
+def benchmark(kind, args):
+    """Spawn a server, load it and stop it"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        process, url = spawn(kind, data_dir)
+        try:
+            return run_load(url, args.concurrency, args.duration, args.courts)
+        finally:
+            stop(process)
+
+
+def print_summary(label, summary):
+    print(f"{label}: {summary['requests_per_sec']} req/s, p50 {summary['p50_ms']} ms, "
+          f"p99 {summary['p99_ms']} ms, {summary['errors']} errors")
+    for name, endpoint in summary['endpoints'].items():
+        print(f"   {name:<16} {endpoint['requests']:>7} requests  p50 {endpoint['p50_ms']} ms  p99 {endpoint['p99_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the padel backend')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='running server to test')
+    target.add_argument('--spawn', choices=sorted(SERVERS), help='start a server of this kind and test it')
+    target.add_argument('--compare', action='store_true', help='test the dev server and padel_wsgi in turn')
+    parser.add_argument('--concurrency', type=int, default=16, help='client processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--courts', type=int, default=4, help='courts the clients are spread over')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    if args.url:
+        results = {args.url: run_load(args.url, args.concurrency, args.duration, args.courts)}
+    else:
+        kinds = ['dev', 'wsgi'] if args.compare or not args.spawn else [args.spawn]
+        results = {kind: benchmark(kind, args) for kind in kinds}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for label, summary in results.items():
+        print_summary(label, summary)
+
+
+if __name__ == '__main__':
+    main()
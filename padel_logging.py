@@ -0,0 +1,133 @@
+"""Leveled, structured logging that never holds up a request thread.
+
+    log.info('Match won', court='1', winner='Lopez/Ruiz')
+
+Request threads only put the record on a bounded queue; a listener thread
+formats it and writes it to stderr. Nothing is formatted on the caller's
+thread (fields must be plain values), a record below the configured level
+costs one comparison, and when the queue is full records are dropped and
+counted rather than waited for.
+
+PADEL_LOG_LEVEL sets the level (default INFO; per-point messages are DEBUG)
+and PADEL_LOG_FORMAT=json writes one JSON object per line instead of text.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime
+
+LOG_QUEUE_SIZE = 10000  # Records waiting for the listener before new ones are dropped
+
+# Attributes every LogRecord has, everything else on a record is an extra field
+RECORD_ATTRIBUTES = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that hands the raw record over and drops it when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: text with key=value fields, or a JSON object"""
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = record.fields if isinstance(getattr(record, 'fields', None), dict) else {}
+        fields = dict(fields, **{key: value for key, value in record.__dict__.items()
+                                 if key not in RECORD_ATTRIBUTES and key != 'fields'})
+        when = datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')
+        message = record.getMessage()
+        if record.exc_info:
+            fields['error'] = self.formatException(record.exc_info)
+
+        if self.json_lines:
+            return json.dumps(dict(ts=when, level=record.levelname, logger=record.name, msg=message, **fields),
+                              default=str, ensure_ascii=False, separators=(',', ':'))
+        text = ' '.join(f'{key}={value!r}' if isinstance(value, str) and ' ' in value else f'{key}={value}'
+                        for key, value in fields.items())
+        return f'{when} {record.levelname:<7} {message}' + (f' {text}' if text else '')
+
+
+class StructuredLogger:
+    """Logger taking a message plus keyword fields"""
+
+    __slots__ = ('logger',)
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def log(self, level, message, exc_info=None, **fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, message, exc_info=exc_info, extra={'fields': fields}, stacklevel=3)
+
+    def debug(self, message, **fields):
+        self.log(logging.DEBUG, message, **fields)
+
+    def info(self, message, **fields):
+        self.log(logging.INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(logging.WARNING, message, **fields)
+
+    def error(self, message, exc_info=None, **fields):
+        self.log(logging.ERROR, message, exc_info=exc_info, **fields)
+
+    def enabled(self, level):
+        """Whether a message at level would be written"""
+        return self.logger.isEnabledFor(level)
+
+
+log = StructuredLogger(logging.getLogger('padel'))
+handler = None  # The DroppingQueueHandler once configure_logging() ran
+
+
+def configure_logging(level=None, json_lines=None, stream=None):
+    """Route the padel logger through a queue to a listener thread (once per process)"""
+    global handler
+    if handler is not None:
+        return handler
+
+    level = level or os.environ.get('PADEL_LOG_LEVEL', 'INFO')
+    if json_lines is None:
+        json_lines = os.environ.get('PADEL_LOG_FORMAT', 'text') == 'json'
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(StructuredFormatter(json_lines))
+
+    handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    listener = logging.handlers.QueueListener(handler.queue, output)
+    listener.start()
+    atexit.register(listener.stop)  # Writes out what is still queued
+
+    logger = log.logger
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return handler
+
+
+def stats():
+    """Logging figures for /metrics"""
+    return {
+        'queued': handler.queue.qsize() if handler is not None else 0,
+        'dropped': handler.dropped if handler is not None else 0
+    }
@@ -0,0 +1,164 @@
+"""Prometheus-style metrics for the padel backend, served as text on /metrics.
+
+Counters and histograms are updated in place on the request path (one dict
+lookup and add under a lock). Figures that already live elsewhere, such as
+history lengths and subscriber counts, are read by collectors only when
+/metrics is scraped, so they cost nothing while scoring.
+"""
+import sys
+import threading
+from bisect import bisect_left
+
+# Request latency buckets (seconds), from a cached 304 to a large history page
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape(value):
+    """Label value escaped for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    """{a="1",b="2"} for a sequence of (name, value) pairs, empty without labels"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    """Sample value, integers without a trailing .0"""
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = list(self.values.items())
+        for labels, value in values:
+            yield self.name, tuple(zip(self.labelnames, labels)), value
+
+
+class Histogram:
+    """Observations bucketed per label values, with their count and sum"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [count per bucket..., count above the last bucket, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self.lock:
+            series = [(labels, list(values)) for labels, values in self.series.items()]
+        for labels, values in series:
+            pairs = tuple(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield f'{self.name}_bucket', pairs + (('le', format_value(float(bound))),), cumulative
+            count = cumulative + values[-2]
+            yield f'{self.name}_bucket', pairs + (('le', '+Inf'),), count
+            yield f'{self.name}_count', pairs, count
+            yield f'{self.name}_sum', pairs, values[-1]
+
+
+class Family:
+    """Samples of one metric read at scrape time by a collector"""
+
+    def __init__(self, name, kind, help_text):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.values = []
+
+    def add(self, value, **labels):
+        self.values.append((tuple(labels.items()), value))
+        return self
+
+    def samples(self):
+        for labels, value in self.values:
+            yield self.name, labels, value
+
+
+class Registry:
+    """The metrics of one process and the collectors run on every scrape"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, collect):
+        """Register collect(), returning Family objects, to run on every scrape"""
+        self.collectors.append(collect)
+        return collect
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        families = list(self.metrics)
+        for collect in self.collectors:
+            families.extend(collect())
+        lines = []
+        for family in families:
+            lines.append(f'# HELP {family.name} {family.help}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            for name, labels, value in family.samples():
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def deep_size(value, seen=None):
+    """Approximate bytes held by a structure of dicts, lists, tuples and scalars"""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in value)
+    return size
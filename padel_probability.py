@@ -0,0 +1,116 @@
+"""Win probability for a padel match in progress.
+
+Exact Markov calculation over the scoring states of padel_scoring, assuming
+black wins each point independently with probability p: the chance of taking
+the current game from its point score, the current set from its game score
+and the match from its set score. Deuce-like loops (advantage, two-point
+tie-breaks, sets played out by two games) are solved in closed form and the
+rest is a small memoized recursion, so a call takes well under a millisecond.
+
+simulate() plays the rest of the match out with the scoring engine itself,
+as a Monte Carlo cross-check of the exact figure. It is CPU-bound and holds
+the GIL, so callers on a server give it a time budget.
+"""
+import random
+import time
+from functools import lru_cache
+
+from padel_scoring import DEFAULT_RULES, apply_point
+
+PRIOR_POINTS = 10        # Pseudo-points split evenly, so early rates are not 0% or 100%
+SIMULATION_PATHS = 1000  # Default number of simulated matches
+
+
+def point_win_rate(won, lost, prior=PRIOR_POINTS):
+    """Smoothed share of points won"""
+    return (won + prior / 2) / (won + lost + prior)
+
+
+@lru_cache(maxsize=4096)
+def race(p, mine, theirs, target):
+    """Chance of reaching `target` first with a two-point lead, from mine-theirs"""
+    if mine >= target and mine - theirs >= 2:
+        return 1.0
+    if theirs >= target and theirs - mine >= 2:
+        return 0.0
+    if mine >= target - 1 and theirs >= target - 1:
+        # Deuce: win two in a row before losing two in a row
+        q = 1 - p
+        deuce = p * p / (p * p + q * q)
+        lead = mine - theirs
+        return deuce if lead == 0 else p + q * deuce if lead > 0 else p * deuce
+    return p * race(p, mine + 1, theirs, target) + (1 - p) * race(p, mine, theirs + 1, target)
+
+
+@lru_cache(maxsize=4096)
+def first_to(p, mine, theirs, target):
+    """Chance of reaching `target` first, no lead required"""
+    if mine >= target:
+        return 1.0
+    if theirs >= target:
+        return 0.0
+    return p * first_to(p, mine + 1, theirs, target) + (1 - p) * first_to(p, mine, theirs + 1, target)
+
+
+def game_probability(p, point_1, point_2, golden_point):
+    """Chance of winning a regular game from point codes 0-3 (40) and 4 (advantage)"""
+    if golden_point:
+        return first_to(p, point_1, point_2, 4)
+    return race(p, point_1, point_2, 4)
+
+
+@lru_cache(maxsize=4096)
+def set_probability(game, tiebreak, games_1, games_2, rules):
+    """Chance of winning the set from games_1-games_2, given the game and tie-break win chances"""
+    games_per_set = rules.games_per_set
+    if not rules.tiebreak:
+        return race(game, games_1, games_2, games_per_set)
+    if games_1 >= games_per_set and games_1 - games_2 >= 2:
+        return 1.0
+    if games_2 >= games_per_set and games_2 - games_1 >= 2:
+        return 0.0
+    if games_1 == games_2 == games_per_set:
+        return tiebreak
+    return (game * set_probability(game, tiebreak, games_1 + 1, games_2, rules)
+            + (1 - game) * set_probability(game, tiebreak, games_1, games_2 + 1, rules))
+
+
+def win_probability(state, p, rules=DEFAULT_RULES):
+    """Chance that black (team 0) wins the match from `state`"""
+    if state.winner is not None:
+        return float(state.winner == 0)
+
+    game = game_probability(p, 0, 0, rules.golden_point)
+    tiebreak = race(p, 0, 0, rules.tiebreak_points)
+    set_ = set_probability(game, tiebreak, 0, 0, rules)
+
+    # The current set, from the current game's point score
+    if state.tiebreak:
+        current_set = race(p, state.point_1, state.point_2, rules.tiebreak_points)
+    else:
+        current_game = game_probability(p, state.point_1, state.point_2, rules.golden_point)
+        current_set = (current_game * set_probability(game, tiebreak, state.game_1 + 1, state.game_2, rules)
+                       + (1 - current_game) * set_probability(game, tiebreak, state.game_1, state.game_2 + 1, rules))
+
+    return (current_set * first_to(set_, state.set_1 + 1, state.set_2, rules.sets_to_win)
+            + (1 - current_set) * first_to(set_, state.set_1, state.set_2 + 1, rules.sets_to_win))
+
+
+def simulate(state, p, rules=DEFAULT_RULES, paths=SIMULATION_PATHS, seed=None, budget_s=None):
+    """Monte Carlo estimate of win_probability: play up to `paths` matches out point by point.
+
+    With budget_s, stops early once that many seconds have gone (after at
+    least one match). Returns (estimate, matches played).
+    """
+    rng = random.random if seed is None else random.Random(seed).random
+    deadline = None if budget_s is None else time.perf_counter() + budget_s
+    wins = played = 0
+    while played < paths:
+        path = state
+        while path.winner is None:
+            path = apply_point(path, 0 if rng() < p else 1, rules)
+        wins += path.winner == 0
+        played += 1
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return wins / played, played
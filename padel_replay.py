@@ -0,0 +1,410 @@
+"""Replay recorded matches against the padel backend, on many courts at once.
+
+    python padel_replay.py padel_data/events.log --courts 20 --speed 10 --spawn wsgi
+    python padel_replay.py final.json --courts 20 --speed max --url http://scoreboard.local:5000
+    python padel_replay.py incident/events.log --speed 1 --url http://localhost:5000   # real time
+
+A recording is an event log (events.log, or a data directory holding it) or
+a /match_history or /matches/<id> response saved as JSON. Each recorded
+court becomes a sequence of timed requests; the sequences are dealt round-
+robin onto --courts target courts (replay1, replay2, ...), each replayed
+with the recorded gaps divided by --speed, or back to back with max.
+
+A snapshot deletes the events it covers, so next to an event log the
+snapshot.json is read too: each court starts with its match up to the
+snapshot (a reset, then the points in its point log), then the events after.
+
+Recorded request_ids are re-keyed per run, so a second replay on the same
+server is applied again rather than answered as duplicates. Requests the
+server did not apply (duplicates, 4xx such as "match over") are counted
+apart and left out of the latencies.
+
+Courts run concurrently as asyncio tasks, spread over --processes worker
+processes. Every court also holds a /stream connection, so besides the
+request latency the report gives push-to-screen latency: from sending a
+point to its delta arriving on the stream (matched by state version).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from padel_history import ACTIONS, TEAMS, PointLog
+from padel_loadtest import percentile, spawn, stop
+
+# Event log types replayed, with the request each one becomes
+ENDPOINTS = {
+    'add_point': 'add_point',
+    'undo': 'undo',
+    'redo': 'redo',
+    'reset_match': 'reset_match',
+    'mark_match_displayed': 'mark_match_displayed',
+}
+POINT_ACTIONS = ('point', 'game', 'match')  # History entries written once per point (a set win adds a 'set' entry too)
+
+
+# --- Recordings -----------------------------------------------------------
+
+def read_event_log(path):
+    """Recorded steps per court from an event log and its snapshot: {court: [(offset_ns, type, body), ...]}"""
+    if os.path.isdir(path):
+        data_dir = path
+        paths = [os.path.join(path, name) for name in ('events.log.1', 'events.log')]
+    else:
+        data_dir = os.path.dirname(path)
+        paths = [path]
+    snapshot_path = os.path.join(data_dir, 'snapshot.json')
+    snapshot = {'courts': {}}
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+    courts = {court: snapshot_steps(data) for court, data in snapshot['courts'].items()}
+    applied = {court: data.get('applied_seq', 0) for court, data in snapshot['courts'].items()}
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line
+                if event.get('type') not in ENDPOINTS or event['seq'] <= applied.get(event['court'], 0):
+                    continue  # Not a request, or already part of the snapshot
+                body = {key: value for key, value in event.items() if key not in ('type', 'court', 'ts', 'seq', 'version')}
+                courts.setdefault(event['court'], []).append((event['ts'], event['type'], body))
+    for court, steps in courts.items():
+        if steps and steps[0][1] != 'reset_match':
+            print(f"⚠️ Court {court} starts mid-match (no reset or snapshot in {path}): "
+                  f"its points are replayed onto a new match")
+    return {court: relative(steps) for court, steps in courts.items() if steps}
+
+
+def snapshot_steps(data):
+    """Steps rebuilding one court's match as a snapshot holds it: a reset, then every point in its log"""
+    reset = {'rules': data['rules'], 'teams': data['game_state'].get('teams')}
+    first_server = data['stats'].get('first_server')
+    if first_server is not None:
+        reset['first_server'] = TEAMS[first_server]
+    history = PointLog.load(data['history'])
+    steps = [(history.started_wall_ns, 'reset_match', {key: value for key, value in reset.items() if value is not None})]
+    steps += [(history.started_wall_ns + record[0], 'add_point', {'team': TEAMS[record[1]]})
+              for record in history.records() if ACTIONS[record[2]] in POINT_ACTIONS]
+    return steps
+
+
+def read_history(path):
+    """Recorded steps of one match from a saved /match_history or /matches/<id> response"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    data = data.get('match', data)
+    history = data.get('detailed_history') or data.get('match_history') or []
+    teams = {}
+    if data.get('black_team') and data.get('yellow_team'):
+        teams = {'teams': {'black': data['black_team'], 'yellow': data['yellow_team']}}
+    steps = [(to_ns(history[0]['timestamp']) if history else 0, 'reset_match', teams)]
+    steps += [(to_ns(entry['timestamp']), 'add_point', {'team': entry['team']})
+              for entry in history if entry['action'] in POINT_ACTIONS]
+    return {os.path.basename(path): relative(steps)}
+
+
+def to_ns(iso):
+    """Wall-clock ns of an ISO timestamp"""
+    return int(datetime.fromisoformat(iso).timestamp() * 1e9)
+
+
+def relative(steps):
+    """Steps with times made relative to the first one"""
+    start = steps[0][0]
+    return [(max(0, at_ns - start), kind, body) for at_ns, kind, body in steps]
+
+
+def read_recording(path):
+    """Event log or saved history, by content"""
+    if os.path.isdir(path) or not path.endswith('.json'):
+        return read_event_log(path)
+    return read_history(path)
+
+
+# --- HTTP over asyncio ------------------------------------------------------
+
+async def read_response(reader):
+    """Status and body of one HTTP/1.1 response (Content-Length or chunked)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        parts = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            parts.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(parts)
+    else:
+        body = await reader.read()
+    return status, headers, body
+
+
+def request_bytes(method, path, host, body=None):
+    """Encoded HTTP/1.1 request with an optional JSON body"""
+    data = json.dumps(body).encode() if body is not None else b''
+    head = f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(data)}\r\n'
+    if body is not None:
+        head += 'Content-Type: application/json\r\n'
+    return head.encode('latin-1') + b'\r\n' + data
+
+
+class Connection:
+    """One keep-alive connection, reopened when the server closes it"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self.writer.write(request_bytes(method, path, self.host, body))
+            await self.writer.drain()
+            status, headers, data = await read_response(self.reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def watch_stream(host, port, court_id, arrivals, ready):
+    """Record the arrival time of every delta version pushed on the court's stream"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET /courts/{court_id}/stream HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line.lower().startswith(b'transfer-encoding: chunked'):
+            chunked = True
+        if line in (b'\r\n', b'\n', b''):
+            break
+    ready.set()
+
+    buffer = b''
+    try:
+        while True:
+            if chunked:
+                size = int((await reader.readline()).split(b';')[0] or b'0', 16)
+                if size == 0:
+                    break
+                data = await reader.readexactly(size)
+                await reader.readline()
+            else:
+                data = await reader.read(65536)
+                if not data:
+                    break
+            buffer += data
+            received = time.perf_counter()
+            *events, buffer = buffer.split(b'\n\n')
+            for event in events:
+                if event.startswith(b'event: delta'):
+                    payload = json.loads(event.split(b'data: ', 1)[1])
+                    arrivals[payload['version']] = received
+    finally:
+        writer.close()
+
+
+# --- Replay -----------------------------------------------------------------
+
+async def replay_court(url, court_id, steps, speed, results, run):
+    """Play one court's steps at the recorded pace divided by speed (0: as fast as possible)"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    connection = Connection(host, port)
+    # Start from a new match: the court exists, so its stream can be watched
+    await connection.request('POST', f'/courts/{court_id}/reset_match', {})
+    arrivals = {}
+    ready = asyncio.Event()
+    watcher = asyncio.create_task(watch_stream(host, port, court_id, arrivals, ready))
+    await asyncio.wait_for(ready.wait(), 10)
+
+    sent = {}  # version -> send time of the point that produced it
+    started = time.perf_counter()
+    for offset_ns, kind, body in steps:
+        if speed:
+            delay = started + offset_ns / 1e9 / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if 'request_id' in body:
+            body = dict(body, request_id=f"{run}.{body['request_id']}"[:64])  # Not a duplicate of an earlier run
+        before = time.perf_counter()
+        try:
+            status, data = await connection.request('POST', f'/courts/{court_id}/{ENDPOINTS[kind]}', body)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            results['errors'] += 1
+            continue
+        after = time.perf_counter()
+        if status >= 500:
+            results['errors'] += 1
+            continue
+        response = json.loads(data) if status == 200 and kind == 'add_point' else {}
+        if status >= 400 or response.get('duplicate'):
+            # Answered without doing the work: timing it would flatter the latencies
+            results['not_applied'][kind] = results['not_applied'].get(kind, 0) + 1
+            continue
+        results['latency'].setdefault(kind, []).append(after - before)
+        if kind == 'add_point':
+            sent[response['version']] = before
+
+    # Give the last deltas a moment to arrive
+    deadline = time.perf_counter() + 2
+    while any(version not in arrivals for version in sent) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    watcher.cancel()
+    connection.close()
+
+    for version, sent_at in sent.items():
+        if version in arrivals:
+            results['push'].append(arrivals[version] - sent_at)
+        else:
+            results['missed_deltas'] += 1
+    results['steps'] += len(steps)
+
+
+def run_worker(job):
+    """Worker process: replay its share of the courts concurrently, return raw latencies"""
+    url, assignments, speed, run = job
+    results = {'latency': {}, 'push': [], 'errors': 0, 'missed_deltas': 0, 'steps': 0, 'not_applied': {}}
+
+    async def main():
+        await asyncio.gather(*(replay_court(url, court_id, steps, speed, results, run) for court_id, steps in assignments))
+
+    asyncio.run(main())
+    return results
+
+
+def replay(url, recordings, courts, speed, processes):
+    """Deal the recordings onto courts, replay them and merge the measurements"""
+    recorded = list(recordings.values())
+    assignments = [(f'replay{i + 1}', recorded[i % len(recorded)]) for i in range(courts)]
+    processes = max(1, min(processes, courts))
+    run = os.urandom(4).hex()  # Prefix of this run's request_ids
+    jobs = [(url, assignments[i::processes], speed, run) for i in range(processes)]
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        parts = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - started
+
+    merged = {'latency': {}, 'push': [], 'errors': 0, 'missed_deltas': 0, 'steps': 0, 'not_applied': {}}
+    for part in parts:
+        for kind, values in part['latency'].items():
+            merged['latency'].setdefault(kind, []).extend(values)
+        for kind, count in part['not_applied'].items():
+            merged['not_applied'][kind] = merged['not_applied'].get(kind, 0) + count
+        merged['push'].extend(part['push'])
+        for key in ('errors', 'missed_deltas', 'steps'):
+            merged[key] += part[key]
+    return summarize(merged, elapsed, courts)
+
+
+def summarize(merged, elapsed, courts):
+    """Percentiles in ms per request type and for push-to-screen"""
+    def describe(values):
+        values.sort()
+        return {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2) if values else None,
+            'p90_ms': round(percentile(values, 0.90) * 1000, 2) if values else None,
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2) if values else None,
+            'max_ms': round(values[-1] * 1000, 2) if values else None
+        }
+
+    return {
+        'courts': courts,
+        'steps': merged['steps'],
+        'elapsed_s': round(elapsed, 2),
+        'steps_per_sec': round(merged['steps'] / elapsed, 1),
+        'errors': merged['errors'],
+        'not_applied': merged['not_applied'],  # Duplicates and 4xx answers, per request type (not timed)
+        'requests': {kind: describe(values) for kind, values in sorted(merged['latency'].items())},
+        'push_to_screen': describe(merged['push']),
+        'missed_deltas': merged['missed_deltas']
+    }
+
+
+def print_summary(summary):
+    print(f"🎾 {summary['courts']} courts, {summary['steps']} steps in {summary['elapsed_s']} s "
+          f"({summary['steps_per_sec']} steps/s), {summary['errors']} errors")
+    for kind, figures in list(summary['requests'].items()) + [('push_to_screen', summary['push_to_screen'])]:
+        print(f"   {kind:<22} {figures['count']:>7}  p50 {figures['p50_ms']} ms  p90 {figures['p90_ms']} ms  "
+              f"p99 {figures['p99_ms']} ms  max {figures['max_ms']} ms")
+    if summary['not_applied']:
+        counts = ', '.join(f'{kind} {count}' for kind, count in sorted(summary['not_applied'].items()))
+        print(f"⚠️ Not applied (duplicate or rejected, not timed): {counts}")
+    if summary['missed_deltas']:
+        print(f"⚠️ {summary['missed_deltas']} points never reached the stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded padel matches against the backend')
+    parser.add_argument('recordings', nargs='+', help='event logs, data directories or saved /match_history JSON')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='running server to replay against')
+    target.add_argument('--spawn', choices=('dev', 'wsgi'), help='start a throwaway server of this kind')
+    parser.add_argument('--courts', type=int, default=1, help='courts to replay on (recordings are reused round-robin)')
+    parser.add_argument('--speed', default='max', help='1 for real time, N for N times faster, max for back to back')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes the courts are spread over')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    speed = 0 if args.speed == 'max' else float(args.speed)
+    recordings = {}
+    for path in args.recordings:
+        recordings.update(read_recording(path))
+    if not recordings:
+        parser.error('no replayable events in the recordings')
+
+    if args.url:
+        summary = replay(args.url, recordings, args.courts, speed, args.processes)
+    else:
+        with tempfile.TemporaryDirectory() as data_dir:
+            # Every court holds a /stream thread next to its requests
+            process, url = spawn(args.spawn, data_dir, PADEL_THREADS=str(2 * args.courts + 8), PADEL_LOG_LEVEL='WARNING')
+            try:
+                summary = replay(url, recordings, args.courts, speed, args.processes)
+            finally:
+                stop(process)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == '__main__':
+    main()
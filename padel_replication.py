@@ -0,0 +1,484 @@
+"""Hot-standby replication: the primary ships its event log to a standby over TCP.
+
+    PADEL_REPLICATION_PORT=5100 python padel_wsgi.py --port 5000                    # primary
+    PADEL_REPLICA_OF=127.0.0.1:5100 python padel_wsgi.py --port 5001 --data-dir b   # standby
+    python padel_replication.py failover-test                                      # both, on localhost
+
+The stream is JSON lines, like events.log. A peer opens with a hello line.
+A standby that says it follows gets a snapshot of every court, then each
+event the primary logs (points, undo/redo, resets, displayed/wipe) in the
+order it was applied to its court. The standby applies them through its own
+event log and pushes them to its /stream screens, and acks how many events
+it applied so the primary can measure the replication lag.
+
+The primary sends a heartbeat every HEARTBEAT_INTERVAL when idle. A standby
+refuses writes until it is promoted: by POST /replication/promote, or, only
+when PADEL_FAILOVER_TIMEOUT is set, by itself once a synced standby has heard
+nothing from the primary for that many seconds. A GC pause or a network blip
+longer than the timeout gives two primaries for a while, so automatic
+promotion is opt-in.
+
+Fencing: every frame carries the primary's term, and promotion starts a new
+one. The promoted standby keeps dialing the old primary with a fence frame;
+a primary that learns of a higher term (fenced, or a follower that knows a
+newer term) stops taking writes. Terms are persisted by the backend, and
+responses carry theirs so screens ignore a fenced primary.
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+from padel_logging import log
+
+HEARTBEAT_INTERVAL = 0.1  # Seconds between heartbeats on an idle link
+FAILOVER_TIMEOUT = float(os.environ.get('PADEL_FAILOVER_TIMEOUT', 0))  # Silence before a standby promotes itself, 0: never
+RECONNECT_INTERVAL = 0.1  # Seconds between connection attempts of a standby
+FENCE_INTERVAL = 1.0      # Seconds between attempts of a promoted standby to fence the old primary
+HELLO_TIMEOUT = 5.0       # Seconds a new peer has to send its hello line
+TEST_FAILOVER_TIMEOUT = 1.0  # Automatic promotion timeout of failover-test
+LINK_QUEUE_SIZE = 10000   # Events buffered per standby before it is dropped as too slow
+
+
+def encode(frame):
+    return json.dumps(frame, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def parse_address(address):
+    """(host, port) from 'host:port'"""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class StandbyLink:
+    """A connected standby on the primary: its event queue, sender thread and ack reader"""
+
+    def __init__(self, sock, peer):
+        self.sock = sock
+        self.peer = f'{peer[0]}:{peer[1]}'
+        self.queue = queue.Queue(maxsize=LINK_QUEUE_SIZE)
+        self.sent_ns = deque()  # Monotonic ns each event was queued, oldest unacked first
+        self.shipped = 0        # Events queued for this standby
+        self.acked = 0          # Events the standby applied
+        self.lag_ms = 0.0       # Queued to applied, of the last acked event
+        self.lag_max_ms = 0.0
+        self.closed = False
+
+    def put(self, line):
+        """Queue an event line, False when the standby fell too far behind"""
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            return False
+        self.sent_ns.append(time.monotonic_ns())
+        self.shipped += 1
+        return True
+
+    def ack(self, applied):
+        now = time.monotonic_ns()
+        sent = None
+        while self.acked < applied and self.sent_ns:
+            sent = self.sent_ns.popleft()
+            self.acked += 1
+        if sent is not None:
+            self.lag_ms = (now - sent) / 1e6
+            self.lag_max_ms = max(self.lag_max_ms, self.lag_ms)
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def stats(self):
+        return {
+            'standby': self.peer,
+            'shipped': self.shipped,
+            'acked': self.acked,
+            'lag_events': self.shipped - self.acked,
+            'lag_ms': round(self.lag_ms, 3),
+            'lag_max_ms': round(self.lag_max_ms, 3)
+        }
+
+
+class ReplicationPrimary:
+    """Accepts standbys and ships every logged event to each of them"""
+
+    role = 'primary'
+
+    def __init__(self, snapshot_fn, host='0.0.0.0', port=0, term=0, on_fence=None):
+        self.snapshot_fn = snapshot_fn
+        self.on_fence = on_fence  # on_fence(term), once, when a newer primary turns up
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()
+        self.links = set()
+        self.lock = threading.Lock()
+        self.last_seq = 0
+        self.dropped = 0          # Standbys dropped for falling behind
+        self.term = term          # Term this primary writes in
+        self.fenced_term = None   # Newer term that fenced this primary off, None while it may write
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name='padel-replication', daemon=True).start()
+        return self
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, peer = self.server.accept()
+            except OSError:
+                return  # Server closed
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(sock, peer), name='padel-replication-peer', daemon=True).start()
+
+    def _serve(self, sock, peer):
+        """Read a peer's hello: a standby to follow this primary, or a newer primary fencing it"""
+        link = StandbyLink(sock, peer)
+        try:
+            sock.settimeout(HELLO_TIMEOUT)
+            reader = sock.makefile('rb')
+            hello = json.loads(reader.readline())
+            sock.settimeout(None)
+            if hello.get('term', 0) > self.term:
+                self.fence(hello['term'], link.peer)
+            if self.fenced_term is not None:
+                sock.sendall(encode({'kind': 'fenced', 'term': self.fenced_term}))
+                link.close()
+                return
+            if hello.get('kind') != 'follow':
+                link.close()
+                return
+        except (OSError, ValueError, AttributeError):
+            link.close()
+            return
+        threading.Thread(target=self._ack_loop, args=(link, reader), name='padel-replication-ack', daemon=True).start()
+        self._send_loop(link)
+
+    def fence(self, term, by):
+        """A primary with a newer term exists: stop shipping, and have the backend stop taking writes"""
+        with self.lock:
+            if self.fenced_term is not None and self.fenced_term >= term:
+                return
+            self.fenced_term = term
+            links, self.links = list(self.links), set()
+        for link in links:
+            link.close()
+        log.warning("⛔ Fenced off: a newer primary took over", term=self.term, new_term=term, by=by)
+        if self.on_fence is not None:
+            self.on_fence(term)
+
+    def ship(self, event):
+        """Queue a logged event for every standby (call with the event's court lock held)"""
+        self.last_seq = event['seq']
+        if not self.links:
+            return
+        line = encode({'kind': 'event', 'term': self.term, 'event': event})
+        with self.lock:
+            for link in list(self.links):
+                if not link.put(line):
+                    # A fresh snapshot on reconnect is cheaper than an unbounded queue
+                    self.links.discard(link)
+                    self.dropped += 1
+                    link.close()
+
+    def _send_loop(self, link):
+        # Events logged from here on are queued, the snapshot holds everything before;
+        # the standby skips queued events its snapshot already contains
+        with self.lock:
+            self.links.add(link)
+        try:
+            snapshot = self.snapshot_fn()
+            snapshot['seq'] = self.last_seq
+            link.sock.sendall(encode({'kind': 'snapshot', 'term': self.term, 'snapshot': snapshot}))
+            log.info("🔁 Standby connected", standby=link.peer, courts=len(snapshot['courts']))
+            while not link.closed:
+                try:
+                    line = link.queue.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    line = encode({'kind': 'heartbeat', 'term': self.term, 'seq': self.last_seq})
+                link.sock.sendall(line)
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.links.discard(link)
+            if not link.closed:
+                link.close()
+                log.warning("🔁 Standby disconnected", standby=link.peer)
+
+    def _ack_loop(self, link, reader):
+        try:
+            for line in reader:
+                link.ack(json.loads(line)['applied'])
+        except (OSError, ValueError):
+            pass
+
+    def close(self):
+        self.server.close()
+        with self.lock:
+            links, self.links = list(self.links), set()
+        for link in links:
+            link.close()
+
+    def stats(self):
+        """Replication figures for /replication, /health and /metrics"""
+        with self.lock:
+            links = [link.stats() for link in self.links]
+        return {'role': 'fenced' if self.fenced_term is not None else self.role, 'port': self.address[1],
+                'seq': self.last_seq, 'term': self.term, 'fenced_term': self.fenced_term, 'standbys': links,
+                'standbys_dropped': self.dropped}
+
+
+class ReplicationStandby:
+    """Follows a primary: loads its snapshot, applies its events and promotes itself when it goes silent.
+
+    load_snapshot(snapshot) and apply_event(event) update the local courts;
+    on_promote(term) is called once with the new term, from the promoting thread.
+    A primary whose term is older than one this standby has seen is not followed.
+    """
+
+    role = 'standby'
+
+    def __init__(self, primary, load_snapshot, apply_event, on_promote, failover_timeout=FAILOVER_TIMEOUT, term=0):
+        self.primary = parse_address(primary)
+        self.load_snapshot = load_snapshot
+        self.apply_event = apply_event
+        self.on_promote = on_promote
+        self.failover_timeout = failover_timeout
+        self.court_seqs = {}      # court_id -> last primary sequence number applied
+        self.applied_seq = 0      # Highest primary sequence number applied
+        self.primary_seq = 0      # Primary's sequence number at its last heartbeat
+        self.events_applied = 0
+        self.syncs = 0            # Snapshots loaded, one per connection
+        self.connected = False
+        self.last_contact = None  # Monotonic time of the last frame from the primary
+        self.promoted = threading.Event()
+        self.failover_ms = None   # Last contact with the primary to promotion done
+        self.sock = None
+        self.term = term          # Newest term seen, this standby's own once promoted
+        self.old_primary_fenced = False
+
+    def start(self):
+        threading.Thread(target=self._follow_loop, name='padel-replica', daemon=True).start()
+        return self
+
+    def _follow_loop(self):
+        while not self.promoted.is_set():
+            try:
+                self._follow()
+            except (OSError, ValueError):
+                pass
+            if self.connected:
+                self.connected = False
+                log.warning("🔁 Lost the primary", primary='%s:%d' % self.primary)
+            if self.failover_timeout and self.syncs and time.monotonic() - self.last_contact >= self.failover_timeout:
+                self.promote('primary silent for %.1fs' % self.failover_timeout)
+                return
+            time.sleep(RECONNECT_INTERVAL)
+
+    def _follow(self):
+        """Stream from the primary until the connection drops or goes silent"""
+        sock = socket.create_connection(self.primary, timeout=self.failover_timeout or HELLO_TIMEOUT)
+        self.sock = sock
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.sendall(encode({'kind': 'follow', 'term': self.term}))
+            applied = 0  # Events of this connection, acked to the primary
+            for line in sock.makefile('rb'):
+                if self.promoted.is_set():
+                    return
+                frame = json.loads(line)
+                if frame.get('term', 0) < self.term or frame['kind'] == 'fenced':
+                    log.warning("⛔ Not following a fenced primary", primary='%s:%d' % self.primary,
+                                term=frame.get('term', 0), known_term=self.term)
+                    return
+                self.term = frame['term']
+                self.last_contact = time.monotonic()
+                if frame['kind'] == 'event':
+                    event = frame['event']
+                    if event['seq'] > self.court_seqs.get(event['court'], 0):
+                        self.apply_event(event)
+                        self.court_seqs[event['court']] = event['seq']
+                        self.applied_seq = max(self.applied_seq, event['seq'])
+                        self.events_applied += 1
+                    applied += 1
+                    sock.sendall(encode({'applied': applied}))
+                elif frame['kind'] == 'heartbeat':
+                    self.primary_seq = frame['seq']
+                else:
+                    snapshot = frame['snapshot']
+                    self.load_snapshot(snapshot)
+                    self.court_seqs = {court_id: court['applied_seq'] for court_id, court in snapshot['courts'].items()}
+                    self.applied_seq = self.primary_seq = snapshot['seq']
+                    self.syncs += 1
+                    self.connected = True
+                    log.info("🔁 Synced with the primary", primary='%s:%d' % self.primary,
+                             courts=len(snapshot['courts']), seq=snapshot['seq'])
+        finally:
+            sock.close()
+
+    def promote(self, reason):
+        """Stop following and take over as primary"""
+        if self.promoted.is_set():
+            return False
+        self.promoted.set()
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.term += 1
+        self.on_promote(self.term)
+        if self.last_contact is not None:
+            self.failover_ms = round((time.monotonic() - self.last_contact) * 1000, 1)
+        log.warning("🚨 Standby promoted to primary", reason=reason, failover_ms=self.failover_ms,
+                    applied_seq=self.applied_seq, term=self.term)
+        threading.Thread(target=self._fence_loop, name='padel-replica-fence', daemon=True).start()
+        return True
+
+    def _fence_loop(self):
+        """Tell the old primary about the new term until it confirms it stopped taking writes"""
+        while not self.old_primary_fenced:
+            try:
+                with socket.create_connection(self.primary, timeout=HELLO_TIMEOUT) as sock:
+                    sock.sendall(encode({'kind': 'fence', 'term': self.term}))
+                    reply = json.loads(sock.makefile('rb').readline())
+                if reply.get('kind') == 'fenced' and reply.get('term', 0) >= self.term:
+                    self.old_primary_fenced = True
+                    log.info("⛔ Old primary fenced off", primary='%s:%d' % self.primary, term=self.term)
+                    return
+            except (OSError, ValueError):
+                pass  # Down: it is fenced when it comes back
+            time.sleep(FENCE_INTERVAL)
+
+    def stats(self):
+        silent = time.monotonic() - self.last_contact if self.last_contact is not None else None
+        return {
+            'role': 'promoted' if self.promoted.is_set() else self.role,
+            'primary': '%s:%d' % self.primary,
+            'connected': self.connected,
+            'syncs': self.syncs,
+            'applied_seq': self.applied_seq,
+            'primary_seq': self.primary_seq,
+            'lag_events': max(0, self.primary_seq - self.applied_seq),
+            'events_applied': self.events_applied,
+            'last_contact_ms': round(silent * 1000, 1) if silent is not None else None,
+            'failover_ms': self.failover_ms,
+            'failover_timeout': self.failover_timeout or None,  # None: promoted by hand only
+            'term': self.term,
+            'old_primary_fenced': self.old_primary_fenced
+        }
+
+
+def get_json(url, method='GET', body=None):
+    """(status, JSON body) of one request"""
+    import urllib.error
+    import urllib.request
+
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def failover_test(points, kind):
+    """Primary and standby on localhost: replicate, freeze the primary, time the takeover, check the fencing"""
+    from padel_loadtest import free_port, spawn, stop
+
+    env = {'PADEL_LOG_LEVEL': 'WARNING', 'PADEL_FAILOVER_TIMEOUT': str(TEST_FAILOVER_TIMEOUT)}
+    replication_port = free_port()
+    with tempfile.TemporaryDirectory() as primary_dir, tempfile.TemporaryDirectory() as standby_dir:
+        primary, primary_url = spawn(kind, primary_dir, PADEL_REPLICATION_PORT=str(replication_port), **env)
+        standby = None
+        try:
+            # Courts set up before the standby connects arrive with its snapshot
+            for court_id in ('1', '2', '3'):
+                get_json(f'{primary_url}/courts/{court_id}/reset_match', 'POST',
+                         {'teams': {'black': f'Lopez/Ruiz {court_id}', 'yellow': f'Diaz/Gil {court_id}'}})
+            get_json(f'{primary_url}/courts/2/add_point', 'POST', {'team': 'black'})
+            standby, standby_url = spawn(kind, standby_dir, PADEL_REPLICA_OF=f'127.0.0.1:{replication_port}', **env)
+            status, refused = get_json(f'{standby_url}/courts/2/add_point', 'POST', {'team': 'black'})
+            print(f"🔒 Write to the standby: HTTP {status} ({refused.get('error')})")
+
+            for i in range(points):
+                get_json(f'{primary_url}/courts/{1 + i % 2 * 2}/add_point', 'POST', {'team': 'black' if i % 3 else 'yellow'})
+            # A batch is published as one change: its events share one version on the standby too
+            get_json(f'{primary_url}/courts/3/add_points', 'POST', {'points': [{'team': 'yellow'}] * 3})
+            get_json(f'{primary_url}/courts/3/undo', 'POST', {})
+            get_json(f'{primary_url}/courts/1/mark_match_displayed', 'POST', {'wipe_immediately': True})
+
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                links = get_json(f'{primary_url}/replication')[1]['primary']['standbys']
+                if links and links[0]['lag_events'] == 0:
+                    break
+                time.sleep(0.05)
+            print(f"📡 Replication after {points} point requests: {links}")
+            states = {}
+            for court_id in ('1', '2', '3'):
+                primary_state = get_json(f'{primary_url}/courts/{court_id}/game_state?full=1')[1]
+                standby_state = get_json(f'{standby_url}/courts/{court_id}/game_state?full=1')[1]
+                states[court_id] = primary_state == standby_state
+            print(f"🔍 Standby matches the primary: {states}")
+
+            # Frozen, not killed: a long GC pause or a network blip, after which it comes back
+            os.killpg(primary.pid, signal.SIGSTOP)
+            killed = time.monotonic()
+            deadline = killed + 10 * TEST_FAILOVER_TIMEOUT
+            while time.monotonic() < deadline:
+                # Court 2 has one point: its match is still on, so only the standby role refuses the point
+                status, _ = get_json(f'{standby_url}/courts/2/add_point', 'POST', {'team': 'black'})
+                if status != 503:
+                    break
+                time.sleep(0.01)
+            takeover_ms = (time.monotonic() - killed) * 1000
+            replication = get_json(f'{standby_url}/replication')[1]['standby']
+            print(f"🚨 Primary frozen: standby took a point {takeover_ms:.0f} ms later "
+                  f"(failover_ms {replication['failover_ms']}, timeout {TEST_FAILOVER_TIMEOUT * 1000:.0f} ms, "
+                  f"term {replication['term']})")
+
+            # The old primary wakes up: the promoted standby's fence frame must stop its writes
+            os.killpg(primary.pid, signal.SIGCONT)
+            deadline = time.monotonic() + HELLO_TIMEOUT + 5 * FENCE_INTERVAL
+            while time.monotonic() < deadline:
+                old_status, old = get_json(f'{primary_url}/courts/2/add_point', 'POST', {'team': 'black'})
+                if old_status == 503:
+                    break
+                time.sleep(0.1)
+            print(f"⛔ Old primary after waking up: HTTP {old_status} ({old.get('error')})")
+            return all(states.values()) and status == 200 and old_status == 503
+        finally:
+            if standby is not None:
+                stop(standby)
+            if primary.poll() is None:
+                os.killpg(primary.pid, signal.SIGCONT)
+                stop(primary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Primary/standby replication of the padel backend')
+    commands = parser.add_subparsers(dest='command', required=True)
+    test = commands.add_parser('failover-test', help='replicate between two local processes, kill the primary')
+    test.add_argument('--points', type=int, default=300)
+    test.add_argument('--spawn', choices=('dev', 'wsgi'), default='wsgi')
+    args = parser.parse_args()
+
+    ok = failover_test(args.points, args.spawn)
+    print("✅ Failover test passed" if ok else "❌ Failover test failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
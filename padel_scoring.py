@@ -0,0 +1,174 @@
+"""Pure padel scoring engine.
+
+No Flask and no globals: a match is an immutable MatchState tuple and
+apply_point(state, team, rules) returns the next one. Teams are 0 (black)
+and 1 (yellow).
+
+Regular games run off a precomputed transition table over the point states
+0, 15, 30, 40 and advantage, one table for deuce/advantage play and one for
+golden point. Tie-breaks, set and match completion follow the Rules tuple,
+so the same engine serves the live backend, event-log recovery and
+simulations.
+"""
+from collections import namedtuple
+
+# Point values shown on the scoreboard for points 0-3 of a regular game
+TENNIS_SCORES = (0, 15, 30, 40)
+ADVANTAGE = 'AD'
+
+Rules = namedtuple('Rules', [
+    'sets_to_win',      # Sets needed to win the match
+    'games_per_set',    # Games needed to win a set (with a two-game lead)
+    'golden_point',     # At 40-40 the next point wins the game (no advantage)
+    'tiebreak',         # Play a tie-break at games_per_set all
+    'tiebreak_points',  # Points needed to win the tie-break (with a two-point lead)
+])
+Rules.__new__.__defaults__ = (2, 6, True, False, 7)
+
+# The scoreboard's original rules: best of 3 sets, golden point, sets played out without tie-break
+DEFAULT_RULES = Rules()
+
+MatchState = namedtuple('MatchState', [
+    'point_1', 'point_2',   # Points won in the current game or tie-break
+    'game_1', 'game_2',     # Games won in the current set
+    'set_1', 'set_2',       # Sets won
+    'tiebreak',             # The current game is a tie-break
+    'set_scores',           # Completed sets as ((game_1, game_2), ...)
+    'winner',               # None while the match is in progress, else 0 or 1
+])
+
+NEW_MATCH = MatchState(0, 0, 0, 0, 0, 0, False, (), None)
+
+_make = tuple.__new__
+
+
+def _build_game_table(golden_point):
+    """Transition table for a regular game.
+
+    table[point_1][point_2][team] -> (point_1, point_2, game_won). Point 3 is
+    40 and point 4 is advantage; deuce is always folded back to (3, 3).
+    """
+    table = [[None] * 5 for _ in range(5)]
+    for p1 in range(5):
+        for p2 in range(5):
+            if (p1 == 4 and p2 != 3) or (p2 == 4 and p1 != 3):
+                continue  # Advantage only exists against 40
+            outcomes = []
+            for team in (0, 1):
+                mine, theirs = (p1, p2) if team == 0 else (p2, p1)
+                if mine == 4 or (mine == 3 and theirs < 3) or (mine == 3 and golden_point):
+                    outcome = (0, 0, True)
+                elif theirs == 4:
+                    outcome = (3, 3, False)  # Back to deuce
+                else:
+                    # 40-40 without golden point goes to advantage (4)
+                    mine += 1
+                    outcome = (mine, theirs, False) if team == 0 else (theirs, mine, False)
+                outcomes.append(outcome)
+            table[p1][p2] = tuple(outcomes)
+    return tuple(tuple(row) for row in table)
+
+
+GAME_TABLES = {
+    False: _build_game_table(False),
+    True: _build_game_table(True),
+}
+
+
+def apply_point(state, team, rules=DEFAULT_RULES):
+    """Return the state after team (0 or 1) wins a point; a finished match is returned unchanged"""
+    if state[8] is not None:
+        return state
+
+    if not state[6]:
+        point_1, point_2, game_won = GAME_TABLES[rules[2]][state[0]][state[1]][team]
+        if not game_won:
+            return _make(MatchState, (point_1, point_2) + state[2:])
+    else:
+        point_1 = state[0] + (team == 0)
+        point_2 = state[1] + (team == 1)
+        lead = point_1 - point_2 if team == 0 else point_2 - point_1
+        if max(point_1, point_2) < rules[4] or lead < 2:
+            return _make(MatchState, (point_1, point_2) + state[2:])
+
+    return _win_game(state, team, rules)
+
+
+def _win_game(state, team, rules):
+    """State after team wins the current game (or tie-break)"""
+    _, _, game_1, game_2, set_1, set_2, tiebreak, set_scores, _ = state
+    if team == 0:
+        game_1 += 1
+        mine, theirs = game_1, game_2
+    else:
+        game_2 += 1
+        mine, theirs = game_2, game_1
+
+    games_per_set = rules[1]
+    if tiebreak or (mine >= games_per_set and mine - theirs >= 2):
+        set_scores = set_scores + ((game_1, game_2),)
+        if team == 0:
+            set_1 += 1
+        else:
+            set_2 += 1
+        winner = team if max(set_1, set_2) >= rules[0] else None
+        return _make(MatchState, (0, 0, 0, 0, set_1, set_2, False, set_scores, winner))
+
+    tiebreak = rules[3] and game_1 == game_2 == games_per_set
+    return _make(MatchState, (0, 0, game_1, game_2, set_1, set_2, tiebreak, set_scores, None))
+
+
+def display_score(state):
+    """Scores as shown on the board: 0/15/30/40/AD, or tie-break points"""
+    point_1, point_2 = state[0], state[1]
+    if state[6]:
+        return point_1, point_2
+    if point_1 == 4:
+        return ADVANTAGE, 40
+    if point_2 == 4:
+        return 40, ADVANTAGE
+    return TENNIS_SCORES[point_1], TENNIS_SCORES[point_2]
+
+
+def replay(teams, state=NEW_MATCH, rules=DEFAULT_RULES):
+    """Apply a sequence of point winners (0/1) and return the final state.
+
+    Same result as folding apply_point, but points inside a regular game only
+    walk the transition table; a MatchState is built once per game.
+    """
+    table = GAME_TABLES[rules[2]]
+    point_1, point_2 = state[0], state[1]
+    for team in teams:
+        if state[8] is not None:
+            break
+        if not state[6]:
+            point_1, point_2, game_won = table[point_1][point_2][team]
+            if game_won:
+                state = _win_game(state, team, rules)
+            continue
+        state = apply_point(state, team, rules)
+        point_1, point_2 = state[0], state[1]
+    if not state[6] and state[8] is None:
+        state = _make(MatchState, (point_1, point_2) + state[2:])
+    return state
+
+
+def rules_from_dict(data):
+    """Build Rules from a JSON object, rejecting unknown or invalid settings"""
+    unknown = set(data) - set(Rules._fields)
+    if unknown:
+        raise ValueError(f"Unknown rule(s): {', '.join(sorted(unknown))}")
+    rules = DEFAULT_RULES._replace(**data)
+    if not (isinstance(rules.sets_to_win, int) and rules.sets_to_win >= 1):
+        raise ValueError('sets_to_win must be a positive integer')
+    if not (isinstance(rules.games_per_set, int) and rules.games_per_set >= 1):
+        raise ValueError('games_per_set must be a positive integer')
+    if not (isinstance(rules.tiebreak_points, int) and rules.tiebreak_points >= 1):
+        raise ValueError('tiebreak_points must be a positive integer')
+    return rules._replace(golden_point=bool(rules.golden_point), tiebreak=bool(rules.tiebreak))
+
+
+def state_from_list(data):
+    """Rebuild a MatchState from its JSON form (set scores arrive as lists)"""
+    state = MatchState(*data)
+    return state._replace(set_scores=tuple(tuple(scores) for scores in state.set_scores))
@@ -0,0 +1,154 @@
+"""In-memory cache for the scoreboard's static files.
+
+Every screen fetches the page, stylesheet, script and images on each load, so
+they are read once, kept in memory with their gzip (and, when the brotli
+package is installed, brotli) variants precompressed, and tagged with a strong
+content-hash ETag. A file is re-read only when its mtime changes, and the
+mtime is looked at no more than once per CHECK_INTERVAL seconds.
+
+Only the files named when the cache is created are served: the directory
+also holds the sources and the data directory (event log, snapshots,
+archive). Compression runs at preload, or on a background thread when a
+file changed, never on a request thread.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import stat as stat_mode
+import threading
+import time
+
+from werkzeug.security import safe_join
+
+from padel_logging import log
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+CHECK_INTERVAL = 2.0               # Seconds between mtime checks of a cached file
+MAX_ASSET_BYTES = 8 * 1024 * 1024  # Larger files are not cached
+MAX_CACHE_BYTES = 32 * 1024 * 1024 # Files beyond this total are served from disk
+MIN_COMPRESS_BYTES = 256           # Smaller files are not worth compressing
+
+# Types that shrink when compressed (images are already compressed)
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+class Asset:
+    """One cached file: its bytes per content encoding and validators"""
+
+    __slots__ = ('path', 'mtime_ns', 'mimetype', 'etag', 'variants', 'checked_at')
+
+    def __init__(self, path, mtime_ns, data):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = hashlib.blake2b(data, digest_size=12).hexdigest()
+        self.variants = {'identity': data}
+        self.checked_at = time.monotonic()
+
+    @property
+    def size(self):
+        return len(self.variants['identity'])
+
+    def compress(self):
+        """Add the precompressed variants; until then the file is served as is"""
+        data = self.variants['identity']
+        if len(data) < MIN_COMPRESS_BYTES or not self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            return
+        variants = dict(self.variants)
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            if len(compressed) < len(data):
+                variants['br'] = compressed
+        self.variants = variants  # Replaced whole, readers see the old or the new set
+
+    def select(self, accept_encodings):
+        """Best variant for an Accept-Encoding header: (encoding, body, etag)"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding]:
+                # Each representation needs its own strong ETag
+                return encoding, self.variants[encoding], f'{self.etag}-{encoding}'
+        return 'identity', self.variants['identity'], self.etag
+
+
+class AssetCache:
+    """Allowed static files of one directory, kept in memory"""
+
+    def __init__(self, root, filenames, max_bytes=MAX_CACHE_BYTES):
+        self.root = os.path.abspath(root)
+        self.allowed = frozenset(filenames)
+        self.max_bytes = max_bytes
+        self.assets = {}
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def allows(self, filename):
+        """Whether filename is one of the files this cache serves"""
+        return filename in self.allowed
+
+    def get(self, filename, compress_now=False):
+        """The cached asset for filename, or None when it is not allowed, missing or too large to cache"""
+        if filename not in self.allowed:
+            return None
+        asset = self.assets.get(filename)
+        now = time.monotonic()
+        if asset is not None and now - asset.checked_at < CHECK_INTERVAL:
+            self.hits += 1
+            return asset
+
+        path = safe_join(self.root, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.assets.pop(filename, None)
+            return None
+        if not stat_mode.S_ISREG(stat.st_mode) or stat.st_size > MAX_ASSET_BYTES:
+            return None
+
+        if asset is not None and asset.mtime_ns == stat.st_mtime_ns:
+            asset.checked_at = now
+            self.hits += 1
+            return asset
+
+        with self.lock:
+            asset = self.assets.get(filename)
+            if asset is None or asset.mtime_ns != stat.st_mtime_ns:
+                cached = sum(cached.size for name, cached in self.assets.items() if name != filename)
+                if cached + stat.st_size > self.max_bytes:
+                    return None  # Cache full: served from disk
+                with open(path, 'rb') as f:
+                    data = f.read()
+                asset = Asset(path, stat.st_mtime_ns, data)
+                if compress_now:
+                    asset.compress()
+                else:
+                    threading.Thread(target=asset.compress, name='padel-static-compress', daemon=True).start()
+                self.assets[filename] = asset
+                self.loads += 1
+                log.info("📦 Cached static file", filename=filename, bytes=len(data))
+        return asset
+
+    def preload(self):
+        """Load and compress every allowed file up front, so the first page load does not touch disk"""
+        for filename in sorted(self.allowed):
+            self.get(filename, compress_now=True)
+
+    def stats(self):
+        """Cache figures for /health"""
+        return {
+            'files': len(self.assets),
+            'bytes': sum(len(body) for asset in list(self.assets.values()) for body in asset.variants.values()),
+            'loads': self.loads,
+            'hits': self.hits,
+            'brotli': brotli is not None
+        }
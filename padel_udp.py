@@ -0,0 +1,227 @@
+"""Datagram listener for the wireless score buttons on the courts.
+
+    PADEL_UDP_PORT=5005 python padel_backend.py                # or padel_wsgi.py --udp-port 5005
+    python padel_udp.py send --port 5005 --court 1 --team black
+    python padel_udp.py bench --presses 2000                   # UDP press vs HTTP /add_point, loopback
+
+A press is one 7-byte packet, PACKET: court number, team (0 black, 1
+yellow) and the button's press id. It skips HTTP, JSON, routing and CORS:
+the listener thread unpacks it and hands it to the backend, which scores it
+through the same path as /add_point, with the press id as request_id.
+
+A mechanical button can bounce into several presses; a press on the same
+court and team within debounce_ms of the last accepted one is dropped. Each
+packet is answered with ACK (press id, result code), so a button can resend
+until it is acknowledged: a resent press id counts once.
+"""
+import argparse
+import os
+import socket
+import statistics
+import struct
+import threading
+import time
+
+from padel_history import TEAMS
+from padel_logging import log
+
+PACKET = struct.Struct('!HBI')  # court number, team code, press id
+ACK = struct.Struct('!IB')      # press id, index in RESULTS
+DEBOUNCE_MS = int(os.environ.get('PADEL_UDP_DEBOUNCE_MS', 250))  # Presses of one button closer than this are bounces
+
+# Outcome of a packet, sent back as its index in the ack
+RESULTS = ('applied', 'duplicate', 'debounced', 'match_over', 'unknown_court', 'invalid', 'error', 'standby')
+
+BENCH_COURT = 65000  # Court number used by the benchmark, out of the way of real courts
+
+
+def encode_press(court, team, press_id):
+    """Packet of one press, team 'black' or 'yellow'"""
+    return PACKET.pack(int(court), TEAMS.index(team), press_id & 0xFFFFFFFF)
+
+
+class ButtonListener:
+    """UDP socket read by one thread, each valid press passed to handle(court_id, team, press_id).
+
+    handle returns one of RESULTS; the listener adds 'debounced', 'invalid'
+    and 'error' itself and counts every outcome for stats().
+    """
+
+    def __init__(self, handle, host='0.0.0.0', port=0, debounce_ms=DEBOUNCE_MS):
+        self.handle = handle
+        self.debounce_ns = debounce_ms * 1_000_000
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.address = self.sock.getsockname()
+        self.last_press = {}  # (court number, team code) -> monotonic ns of the last accepted press
+        self.counts = dict.fromkeys(RESULTS, 0)
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._receive_loop, name='padel-buttons', daemon=True)
+        self.thread.start()
+        return self
+
+    def _receive_loop(self):
+        buffer = bytearray(64)
+        while True:
+            try:
+                size, sender = self.sock.recvfrom_into(buffer)
+            except OSError:
+                return  # Socket closed
+            result, press_id = self._process(buffer, size)
+            self.counts[result] += 1
+            try:
+                self.sock.sendto(ACK.pack(press_id, RESULTS.index(result)), sender)
+            except OSError:
+                pass  # The button is gone, it resends if it cares
+
+    def _process(self, buffer, size):
+        """Outcome and press id of one packet"""
+        if size != PACKET.size:
+            return 'invalid', 0
+        court, team, press_id = PACKET.unpack_from(buffer)
+        if team >= len(TEAMS):
+            return 'invalid', press_id
+
+        now = time.monotonic_ns()
+        key = (court, team)
+        last = self.last_press.get(key)
+        if last is not None and now - last < self.debounce_ns:
+            return 'debounced', press_id
+        try:
+            result = self.handle(str(court), TEAMS[team], press_id)
+        except Exception:
+            log.error("⚠️ Button press failed", exc_info=True, court=court, press_id=press_id)
+            return 'error', press_id
+        if result == 'applied':
+            self.last_press[key] = now
+        return result, press_id
+
+    def close(self):
+        self.sock.close()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def stats(self):
+        """Packets per outcome, for /health and /metrics"""
+        return {'port': self.address[1], 'debounce_ms': self.debounce_ns // 1_000_000, 'packets': dict(self.counts)}
+
+
+class ButtonSender:
+    """Loopback stand-in for a button: sends presses and waits for their ack"""
+
+    def __init__(self, host='127.0.0.1', port=5005, timeout=1.0):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(timeout)
+        self.press_id = int.from_bytes(os.urandom(4), 'big')  # A fresh button, not one the court remembers
+
+    def press(self, court, team):
+        """Send one press and wait for its ack, returns (result, round trip seconds)"""
+        self.press_id = (self.press_id + 1) & 0xFFFFFFFF
+        packet = encode_press(court, team, self.press_id)
+        started = time.perf_counter()
+        self.sock.sendto(packet, self.address)
+        while True:
+            try:
+                data = self.sock.recv(64)
+            except socket.timeout:
+                return 'timeout', time.perf_counter() - started
+            press_id, code = ACK.unpack(data[:ACK.size])
+            if press_id == self.press_id:  # Skip a late ack of an earlier press
+                return RESULTS[code], time.perf_counter() - started
+
+    def close(self):
+        self.sock.close()
+
+
+def percentiles(seconds):
+    """p50, p90 and p99 in microseconds"""
+    values = sorted(seconds)
+    pick = lambda fraction: values[min(len(values) - 1, int(fraction * len(values)))] * 1e6
+    return {'p50_us': statistics.median(values) * 1e6, 'p90_us': pick(0.90), 'p99_us': pick(0.99)}
+
+
+def bench(presses):
+    """Round trip of a press over loopback UDP and of the same point over HTTP, same process"""
+    import http.client
+    import logging
+    from werkzeug.serving import make_server
+
+    os.environ.setdefault('PADEL_LOG_LEVEL', 'WARNING')
+    import padel_backend
+
+    for court_id in (str(BENCH_COURT), 'bench_http'):
+        court = padel_backend.get_court(court_id, create=True)
+        with court.lock:
+            # Advantage play and alternating teams: the game never ends, every press scores
+            padel_backend.apply_reset_match(court, rules=padel_backend.rules_from_dict({'golden_point': False}))
+            padel_backend.publish(court)
+
+    # Debounce off: the bench presses far faster than a player can
+    listener = ButtonListener(padel_backend.press_button, '127.0.0.1', 0, debounce_ms=0).start()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No access log line per request
+    server = make_server('127.0.0.1', 0, padel_backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    sender = ButtonSender(*listener.address)
+    udp_times = []
+    for i in range(presses):
+        result, elapsed = sender.press(BENCH_COURT, TEAMS[i % 2])
+        if result != 'applied':
+            raise RuntimeError(f'press {i}: {result}')
+        udp_times.append(elapsed)
+
+    http_times = []
+    for i in range(presses):
+        body = b'{"team": "%s"}' % TEAMS[i % 2].encode()
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+        connection.request('POST', '/courts/bench_http/add_point', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        http_times.append(time.perf_counter() - started)
+        connection.close()
+        if response.status != 200:
+            raise RuntimeError(f'add_point {i}: HTTP {response.status}')
+
+    sender.close()
+    listener.close()
+    server.shutdown()
+    return {'udp': percentiles(udp_times), 'http': percentiles(http_times)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score buttons over UDP: send presses or benchmark the listener')
+    commands = parser.add_subparsers(dest='command', required=True)
+    send = commands.add_parser('send', help='press a button of a running backend')
+    send.add_argument('--host', default='127.0.0.1')
+    send.add_argument('--port', type=int, default=int(os.environ.get('PADEL_UDP_PORT', 5005)))
+    send.add_argument('--court', type=int, default=1)
+    send.add_argument('--team', choices=TEAMS, default='black')
+    send.add_argument('--count', type=int, default=1, help='presses to send')
+    send.add_argument('--interval', type=float, default=0.5, help='seconds between presses')
+    timing = commands.add_parser('bench', help='UDP press vs HTTP /add_point latency, in process')
+    timing.add_argument('--presses', type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == 'send':
+        sender = ButtonSender(args.host, args.port)
+        for i in range(args.count):
+            if i:
+                time.sleep(args.interval)
+            result, elapsed = sender.press(args.court, args.team)
+            print(f"🔘 Court {args.court} {args.team} press {sender.press_id}: {result} ({elapsed * 1e3:.2f} ms)")
+        sender.close()
+        return
+
+    print(f"⏱️ {args.presses} presses over UDP, then {args.presses} POST /add_point over HTTP")
+    results = bench(args.presses)
+    for transport, figures in results.items():
+        print(f"   {transport:<5} " + '  '.join(f"{name} {value:>9,.1f}" for name, value in figures.items()))
+    print(f"🚀 UDP p50 is {results['http']['p50_us'] / results['udp']['p50_us']:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
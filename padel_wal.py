@@ -0,0 +1,225 @@
+"""Durable write-ahead event log for the padel backend.
+
+Every state-changing request is appended as one JSON line to events.log.
+Writes go through the OS buffer immediately and are fsync'ed in batches
+(group commit): after FSYNC_BATCH events or FSYNC_INTERVAL seconds,
+whichever comes first, by a background flusher thread.
+
+The flusher also takes periodic snapshots. The log is rotated first, the
+caller's snapshot function captures every court, and once snapshot.json is
+atomically in place the rotated log is deleted. On startup the snapshot is
+loaded and the remaining events are replayed, so recovery time stays bounded
+by SNAPSHOT_EVERY events.
+
+A failed fsync or snapshot (e.g. a full disk) is logged and retried on the
+next tick; stats() reports it so /health shows the log as failing.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+from padel_logging import log
+
+FSYNC_BATCH = 64        # Events per group commit
+FSYNC_INTERVAL = 0.05   # Longest time an event waits for its fsync (seconds)
+SNAPSHOT_EVERY = 1000   # Events between snapshots
+
+
+class EventLog:
+    """Append-only JSON-lines log with batched fsync and snapshot rotation"""
+
+    def __init__(self, data_dir, fsync_batch=FSYNC_BATCH, fsync_interval=FSYNC_INTERVAL,
+                 snapshot_every=SNAPSHOT_EVERY):
+        os.makedirs(data_dir, exist_ok=True)
+        self.log_path = os.path.join(data_dir, 'events.log')
+        self.rotated_path = os.path.join(data_dir, 'events.log.1')
+        self.snapshot_path = os.path.join(data_dir, 'snapshot.json')
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+
+        self.lock = threading.Lock()
+        self.file = None
+        self.seq = 0                 # Last sequence number handed out
+        self.pending = 0             # Events written but not yet fsync'ed
+        self.since_snapshot = 0
+        self.snapshot_fn = None
+        self.stopped = threading.Event()
+        self.flusher = None
+
+        # Measurements reported by stats()
+        self.events_written = 0
+        self.fsyncs = 0
+        self.fsync_ns_total = 0
+        self.fsync_ns_max = 0
+        self.snapshots = 0
+        self.snapshot_ns_last = 0
+        self.recovery_ms = None
+        self.recovered_events = 0
+        self.errors = 0              # Failed flusher ticks (fsync or snapshot)
+        self.last_error = None
+        self.failing = False         # The latest tick failed: logged events may not be durable
+
+    # --- Recovery -------------------------------------------------------
+
+    def recover(self, load_snapshot, apply_event):
+        """Load the snapshot and replay the logged events after it"""
+        started = time.perf_counter()
+        snapshot = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.seq = snapshot.get('seq', 0)
+            load_snapshot(snapshot)
+
+        replayed = 0
+        for path in (self.rotated_path, self.log_path):
+            for event in self._read_events(path):
+                self.seq = max(self.seq, event['seq'])
+                apply_event(event)
+                replayed += 1
+
+        self.recovered_events = replayed
+        self.since_snapshot = replayed
+        self.recovery_ms = round((time.perf_counter() - started) * 1000, 3)
+        return snapshot is not None, replayed
+
+    @staticmethod
+    def _read_events(path):
+        """Yield events from a log file, stopping at a torn final line"""
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # Partial write from a crash
+                yield json.loads(line)
+
+    # --- Writing --------------------------------------------------------
+
+    def start(self, snapshot_fn):
+        """Open the log for appending and start the flusher thread"""
+        self.snapshot_fn = snapshot_fn
+        self.file = open(self.log_path, 'a', encoding='utf-8')
+        self.flusher = threading.Thread(target=self._flush_loop, name='padel-wal-flusher', daemon=True)
+        self.flusher.start()
+
+    def append(self, event):
+        """Assign the next sequence number, write the event and return the number"""
+        with self.lock:
+            self.seq += 1
+            event['seq'] = self.seq
+            self.file.write(json.dumps(event, separators=(',', ':')) + '\n')
+            self.file.flush()
+            self.events_written += 1
+            self.pending += 1
+            self.since_snapshot += 1
+            if self.pending >= self.fsync_batch:
+                self._fsync()
+            return self.seq
+
+    def _fsync(self):
+        """fsync the pending events (call with self.lock held)"""
+        started = time.perf_counter_ns()
+        os.fsync(self.file.fileno())
+        elapsed = time.perf_counter_ns() - started
+        self.pending = 0
+        self.fsyncs += 1
+        self.fsync_ns_total += elapsed
+        self.fsync_ns_max = max(self.fsync_ns_max, elapsed)
+
+    def _flush_loop(self):
+        """Group-commit pending events and take snapshots in the background"""
+        while not self.stopped.wait(self.fsync_interval):
+            try:
+                with self.lock:
+                    if self.pending:
+                        self._fsync()
+                if self.since_snapshot >= self.snapshot_every:
+                    self.snapshot()
+            except Exception as e:
+                # Keep the flusher alive: the pending events are retried next tick
+                self.errors += 1
+                self.last_error = f'{type(e).__name__}: {e}'
+                if not self.failing:
+                    log.error("⚠️ Event log flush failed", error=self.last_error, pending=self.pending)
+                self.failing = True
+            else:
+                if self.failing:
+                    log.info("✅ Event log flushing again", errors=self.errors)
+                self.failing = False
+
+    def snapshot(self):
+        """Rotate the log, write a snapshot and drop the rotated events"""
+        started = time.perf_counter_ns()
+        with self.lock:
+            if self.pending:
+                self._fsync()
+            self.file.close()
+            try:
+                if os.path.exists(self.rotated_path):
+                    # An earlier snapshot never completed: keep its events as well
+                    with open(self.rotated_path, 'a', encoding='utf-8') as rotated, \
+                            open(self.log_path, encoding='utf-8') as current:
+                        shutil.copyfileobj(current, rotated)
+                    os.remove(self.log_path)
+                else:
+                    os.replace(self.log_path, self.rotated_path)
+            finally:
+                # Appends go on even if the rotation failed
+                self.file = open(self.log_path, 'a', encoding='utf-8')
+            self.since_snapshot = 0
+            seq = self.seq
+
+        # Courts record the last sequence number they applied, so events that
+        # land in the new log while courts are captured are skipped on replay
+        snapshot = self.snapshot_fn()
+        snapshot['seq'] = seq
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        os.remove(self.rotated_path)
+
+        self.snapshots += 1
+        self.snapshot_ns_last = time.perf_counter_ns() - started
+
+    def request_snapshot(self):
+        """Have the flusher take a snapshot on its next tick"""
+        self.since_snapshot = self.snapshot_every
+
+    def close(self):
+        """Stop the flusher and fsync everything still pending"""
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        with self.lock:
+            if self.file is not None:
+                if self.pending:
+                    self._fsync()
+                self.file.close()
+                self.file = None
+
+    def stats(self):
+        """Durability measurements for /health"""
+        return {
+            'seq': self.seq,
+            'events_written': self.events_written,
+            'pending_fsync': self.pending,
+            'fsyncs': self.fsyncs,
+            'fsync_avg_us': round(self.fsync_ns_total / self.fsyncs / 1000, 1) if self.fsyncs else None,
+            'fsync_max_us': round(self.fsync_ns_max / 1000, 1),
+            'fsync_per_event_us': round(self.fsync_ns_total / self.events_written / 1000, 2) if self.events_written else None,
+            'snapshots': self.snapshots,
+            'snapshot_ms_last': round(self.snapshot_ns_last / 1e6, 3),
+            'events_since_snapshot': self.since_snapshot,
+            'recovery_ms': self.recovery_ms,
+            'recovered_events': self.recovered_events,
+            'healthy': not self.failing,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,85 @@
+"""Production entry point for the padel backend.
+
+    python padel_wsgi.py --port 5000 --threads 16 --max-streams 200 --udp-port 5005
+    waitress-serve --listen=0.0.0.0:5000 --threads=216 --connection-limit=300 --call padel_wsgi:create_app
+    gunicorn --workers 1 --threads 216 --bind 0.0.0.0:5000 'padel_wsgi:create_app()'
+
+Serves the same routes as `python padel_backend.py`, without the debugger and
+reloader. Court state lives in this process's memory, so run exactly one
+worker process and scale with threads: every state change takes its court's
+lock. Each open /stream holds a thread for as long as the screen watches, so
+the pool is --threads for requests plus --max-streams for streams, and the
+backend refuses streams past $PADEL_MAX_STREAMS (those screens poll
+/game_state): scoring always finds a free thread. With waitress-serve or
+gunicorn, size the pool the same way.
+"""
+import argparse
+import os
+import threading
+
+import padel_backend
+
+init_lock = threading.Lock()
+
+
+def create_app(data_dir=None, udp_port=None, replication_port=None, replica_of=None):
+    """The Flask app, with courts recovered from the event log in data_dir and matches archived there.
+
+    With udp_port (or $PADEL_UDP_PORT), court buttons are also scored from UDP packets.
+    With replica_of (or $PADEL_REPLICA_OF, host:port) this process is a standby of that
+    primary; with replication_port (or $PADEL_REPLICATION_PORT) standbys can follow it.
+    """
+    data_dir = data_dir or os.environ.get('PADEL_DATA_DIR', 'padel_data')
+    udp_port = udp_port or int(os.environ.get('PADEL_UDP_PORT', 0))
+    replication_port = replication_port or int(os.environ.get('PADEL_REPLICATION_PORT', 0))
+    replica_of = replica_of or os.environ.get('PADEL_REPLICA_OF')
+    with init_lock:
+        if padel_backend.event_log is None:
+            padel_backend.enable_retention(data_dir)
+            padel_backend.enable_archive(os.path.join(data_dir, 'archive.sqlite3'))
+            padel_backend.enable_event_log(data_dir)
+            if replica_of:
+                padel_backend.enable_standby(replica_of, replication_port)
+            elif replication_port:
+                padel_backend.enable_replication_primary(replication_port)
+        if udp_port and padel_backend.button_listener is None:
+            padel_backend.enable_button_listener(udp_port)
+    return padel_backend.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the padel backend in production mode')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PADEL_PORT', 5000)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('PADEL_THREADS', 16)),
+                        help='worker threads for requests other than /stream')
+    parser.add_argument('--max-streams', type=int, default=padel_backend.MAX_STREAMS,
+                        help='open /stream connections, one thread each (default: $PADEL_MAX_STREAMS or 200)')
+    parser.add_argument('--data-dir', default=None, help='event log directory (default: $PADEL_DATA_DIR or padel_data)')
+    parser.add_argument('--udp-port', type=int, default=None, help='score button presses from UDP (default: $PADEL_UDP_PORT, off)')
+    parser.add_argument('--replication-port', type=int, default=None,
+                        help='accept standbys on this port (default: $PADEL_REPLICATION_PORT, off)')
+    parser.add_argument('--replica-of', default=None, metavar='HOST:PORT',
+                        help='run as a standby of this primary (default: $PADEL_REPLICA_OF)')
+    args = parser.parse_args()
+
+    padel_backend.MAX_STREAMS = args.max_streams
+    app = create_app(args.data_dir, args.udp_port, args.replication_port, args.replica_of)
+    try:
+        from waitress import serve
+    except ImportError:
+        # Werkzeug's threaded server, still without the debugger and reloader
+        print("⚠️ waitress not installed, falling back to the threaded Werkzeug server")
+        print(f"🚀 Serving on http://{args.host}:{args.port}")
+        app.run(host=args.host, port=args.port, threaded=True, debug=False, use_reloader=False)
+        return
+
+    threads = args.threads + args.max_streams
+    print(f"🚀 Serving on http://{args.host}:{args.port} with waitress "
+          f"({args.threads} request threads + {args.max_streams} stream threads)")
+    # connection_limit: every stream plus waitress's default 100 for everything else
+    serve(app, host=args.host, port=args.port, threads=threads, connection_limit=args.max_streams + 100)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""Shared fixtures: the Flask test client and a court of its own per test"""
+import os
+import sys
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('PADEL_LOG_LEVEL', 'WARNING')  # Keep per-request log lines out of the test output
+
+import padel_backend
+
+
+@pytest.fixture
+def client():
+    return padel_backend.app.test_client()
+
+
+@pytest.fixture
+def court_id():
+    """A court id no other test scores on, dropped afterwards"""
+    court_id = uuid.uuid4().hex[:8]
+    yield court_id
+    padel_backend.courts.pop(court_id, None)
+
+
+@pytest.fixture
+def court_url(court_id):
+    """URL prefix of the test's court"""
+    return f'/courts/{court_id}'
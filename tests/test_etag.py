@@ -0,0 +1,62 @@
+"""Versioned reads answer a matching If-None-Match with an empty 304 until the court changes"""
+import pytest
+
+import padel_backend
+
+
+@pytest.mark.parametrize('endpoint', ['game_state', 'match_history', 'win_probability'])
+def test_not_modified_until_a_point(client, court_url, endpoint):
+    client.post(f'{court_url}/add_point', json={'team': 'black'})
+    first = client.get(f'{court_url}/{endpoint}')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+
+    again = client.get(f'{court_url}/{endpoint}', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+    client.post(f'{court_url}/add_point', json={'team': 'yellow'})
+    changed = client.get(f'{court_url}/{endpoint}', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json() != first.get_json()
+
+
+def test_undo_changes_the_etag(client, court_url):
+    client.post(f'{court_url}/add_point', json={'team': 'black'})
+    etag = client.get(f'{court_url}/game_state').headers['ETag']
+    client.post(f'{court_url}/add_point', json={'team': 'black'})
+    client.post(f'{court_url}/undo')
+    # Same score as before the second point, but a new version: cached copies must not be reused
+    response = client.get(f'{court_url}/game_state', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_etags_differ_between_courts(client, court_url):
+    client.post(f'{court_url}/add_point', json={'team': 'black'})
+    client.post('/courts/etag-other/add_point', json={'team': 'black'})
+    try:
+        etag = client.get(f'{court_url}/game_state').headers['ETag']
+        assert client.get('/courts/etag-other/game_state', headers={'If-None-Match': etag}).status_code == 200
+    finally:
+        padel_backend.courts.pop('etag-other', None)
+
+
+def test_variants_have_their_own_etag(client, court_url):
+    client.post(f'{court_url}/add_point', json={'team': 'black'})
+    lean = client.get(f'{court_url}/game_state').headers['ETag']
+    full = client.get(f'{court_url}/game_state?full=1', headers={'If-None-Match': lean})
+    assert full.status_code == 200
+    assert 'match_history' in full.get_json()
+
+
+@pytest.mark.parametrize('filename', ['padel_js.js', 'padel_css.css'])
+def test_static_assets_revalidate(client, filename):
+    first = client.get(f'/{filename}')
+    assert first.status_code == 200
+    assert 'no-cache' in first.headers['Cache-Control']
+    again = client.get(f'/{filename}', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
@@ -0,0 +1,128 @@
+"""The table-driven engine scores exactly like the if/elif chains it replaced"""
+import random
+
+import pytest
+
+from padel_scoring import DEFAULT_RULES, NEW_MATCH, Rules, apply_point, display_score, replay
+
+TEAMS = ('black', 'yellow')
+
+
+def legacy_match():
+    """Game state of a fresh match, as the old single-court backend kept it"""
+    return {'score_1': 0, 'score_2': 0, 'game_1': 0, 'game_2': 0, 'set_1': 0, 'set_2': 0,
+            'match_won': False, 'winner': None, 'set_history': [], 'history': []}
+
+
+def legacy_add_point(game, team):
+    """The old add_point: 0/15/30/40/game chains, set at 6 games by two, first to 2 sets.
+
+    Golden point (40-40, next point wins the game), no tie-break. History
+    entries are (action, team, scores, games, sets), each a (before, after) pair.
+    """
+    side = '1' if team == 'black' else '2'
+    score_before = (game['score_1'], game['score_2'])
+    game_before = (game['game_1'], game['game_2'])
+    set_before = (game['set_1'], game['set_2'])
+
+    current_score = game['score_' + side]
+    if current_score < 40:
+        game['score_' + side] = {0: 15, 15: 30, 30: 40}[current_score]
+        action_type = 'point'
+    else:
+        game['game_' + side] += 1
+        game['score_1'] = game['score_2'] = 0
+        action_type = 'game'
+        legacy_check_set(game)
+
+    if not game['match_won']:
+        game['history'].append((action_type, team,
+                                (score_before, (game['score_1'], game['score_2'])),
+                                (game_before, (game['game_1'], game['game_2'])),
+                                (set_before, (game['set_1'], game['set_2']))))
+
+
+def legacy_check_set(game):
+    """The old check_set_winner and check_match_winner"""
+    for side, other, team in (('1', '2', 'black'), ('2', '1', 'yellow')):
+        if game['game_' + side] >= 6 and game['game_' + side] - game['game_' + other] >= 2:
+            set_before = (game['set_1'], game['set_2'])
+            game['set_' + side] += 1
+            game['set_history'].append(f"{game['game_1']}-{game['game_2']}")
+            game['history'].append(('set', team,
+                                    ((game['score_1'], game['score_2']), (0, 0)),
+                                    ((game['game_1'], game['game_2']), (0, 0)),
+                                    (set_before, (game['set_1'], game['set_2']))))
+            game['game_1'] = game['game_2'] = 0
+            if game['set_' + side] >= 2:
+                game['match_won'] = True
+                game['winner'] = team
+                scores = (game['score_1'], game['score_2'])
+                games = (game['game_1'], game['game_2'])
+                sets = (game['set_1'], game['set_2'])
+                game['history'].append(('match', team, (scores, scores), (games, games), (sets, sets)))
+            return
+
+
+def random_points(rng):
+    """Point winners of one match, with a per-match bias so lopsided and close sets both occur"""
+    p = rng.uniform(0.3, 0.7)
+    while True:
+        yield TEAMS[rng.random() >= p]
+
+
+def test_engine_matches_legacy_scoring():
+    rng = random.Random(8)
+    for _ in range(2000):
+        game = legacy_match()
+        state = NEW_MATCH
+        for team in random_points(rng):
+            legacy_add_point(game, team)
+            state = apply_point(state, TEAMS.index(team), DEFAULT_RULES)
+            assert display_score(state) == (game['score_1'], game['score_2'])
+            assert (state.game_1, state.game_2, state.set_1, state.set_2) == \
+                (game['game_1'], game['game_2'], game['set_1'], game['set_2'])
+            assert [f'{games_1}-{games_2}' for games_1, games_2 in state.set_scores] == game['set_history']
+            if game['match_won']:
+                break
+        assert state.winner == TEAMS.index(game['winner'])
+
+
+@pytest.mark.parametrize('rules', [DEFAULT_RULES, Rules(golden_point=False), Rules(golden_point=False, tiebreak=True),
+                                   Rules(sets_to_win=1, games_per_set=4, tiebreak=True, tiebreak_points=10)])
+def test_replay_matches_apply_point(rules):
+    rng = random.Random(9)
+    for _ in range(300):
+        teams = [rng.randrange(2) for _ in range(rng.randrange(1, 400))]
+        state = NEW_MATCH
+        for team in teams:
+            state = apply_point(state, team, rules)
+        assert replay(teams, NEW_MATCH, rules) == state
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_api_history_matches_legacy(client, court_url, seed):
+    rng = random.Random(seed)
+    game = legacy_match()
+    for team in random_points(rng):
+        legacy_add_point(game, team)
+        response = client.post(f'{court_url}/add_point', json={'team': team})
+        assert response.status_code == 200
+        if game['match_won']:
+            break
+
+    state = client.get(f'{court_url}/game_state').get_json()
+    assert state['match_won'] and state['winner']['team'] == game['winner']
+    assert state['set_history'] == game['set_history']
+
+    history = client.get(f'{court_url}/match_history').get_json()['detailed_history']
+    assert [(entry['action'], entry['team'],
+             ((entry['scores']['before']['score_1'], entry['scores']['before']['score_2']),
+              (entry['scores']['after']['score_1'], entry['scores']['after']['score_2'])),
+             ((entry['games']['before']['game_1'], entry['games']['before']['game_2']),
+              (entry['games']['after']['game_1'], entry['games']['after']['game_2'])),
+             ((entry['sets']['before']['set_1'], entry['sets']['before']['set_2']),
+              (entry['sets']['after']['set_1'], entry['sets']['after']['set_2'])))
+            for entry in history] == game['history']
+
+    assert client.post(f'{court_url}/add_point', json={'team': 'black'}).status_code == 400
@@ -0,0 +1,86 @@
+"""Undo and redo land on exactly the match as it was, across timeline checkpoints and spills"""
+import json
+import random
+
+import pytest
+
+import padel_backend
+import padel_history
+from padel_history import CHECKPOINT_INTERVAL, PointLog
+
+
+def court_state(court_id):
+    """Everything undo must restore: scores, history, statistics, winner data and engine state"""
+    court = padel_backend.get_court(court_id)
+    state = padel_backend.full_game_state(court)
+    state.pop('last_updated', None)
+    return json.dumps([state, court.stats.dump(), court.match_storage, list(court.state)], sort_keys=True)
+
+
+def play_match(client, court_url, court_id, seed):
+    """Score a whole match from a reset, returns the court state after every point (index 0: before the first)"""
+    client.post(f'{court_url}/reset_match')
+    rng = random.Random(seed)
+    states = [court_state(court_id)]
+    while client.post(f'{court_url}/add_point', json={'team': rng.choice(('black', 'yellow'))}).status_code == 200:
+        states.append(court_state(court_id))
+    return states
+
+
+@pytest.fixture(params=['memory', 'spilled'])
+def spill(request, monkeypatch, tmp_path):
+    """Run once with everything in memory and once with the point log and timeline spilling early"""
+    if request.param == 'spilled':
+        monkeypatch.setattr(PointLog, 'memory_max', 10)
+        monkeypatch.setattr(PointLog, 'spill_dir', str(tmp_path))
+        monkeypatch.setattr(padel_history, 'CHECKPOINTS_RESIDENT', 1)
+    return request.param
+
+
+def test_undo_redo_every_position(client, court_url, court_id, spill):
+    states = play_match(client, court_url, court_id, seed=3)
+    points = len(states) - 1
+    assert points > 3 * CHECKPOINT_INTERVAL
+    if spill == 'spilled':
+        timeline = padel_backend.get_court(court_id).timeline
+        assert timeline.spilled and timeline.checkpoints_spilled
+
+    for position in range(points - 1, -1, -1):
+        response = client.post(f'{court_url}/undo')
+        assert response.status_code == 200
+        assert response.get_json()['position'] == position
+        assert court_state(court_id) == states[position]
+    assert client.post(f'{court_url}/undo').status_code == 400
+
+    for position in range(1, points + 1):
+        assert client.post(f'{court_url}/redo').status_code == 200
+        assert court_state(court_id) == states[position]
+    assert client.post(f'{court_url}/redo').status_code == 400
+
+
+def test_new_point_drops_redo_tail(client, court_url, court_id, spill):
+    states = play_match(client, court_url, court_id, seed=4)
+    back = 2 * CHECKPOINT_INTERVAL + 5
+    for _ in range(back):
+        client.post(f'{court_url}/undo')
+    assert court_state(court_id) == states[-1 - back]
+
+    assert client.post(f'{court_url}/add_point', json={'team': 'black'}).status_code == 200
+    response = client.post(f'{court_url}/redo')
+    assert response.status_code == 400
+    timeline = padel_backend.get_court(court_id).timeline
+    assert timeline.cursor == len(timeline) == len(states) - back
+
+    assert client.post(f'{court_url}/undo').status_code == 200
+    assert court_state(court_id) == states[-1 - back]
+
+
+def test_timeline_snapshot_round_trip(client, court_url, court_id, spill):
+    play_match(client, court_url, court_id, seed=5)
+    for _ in range(40):
+        client.post(f'{court_url}/undo')
+    timeline = padel_backend.get_court(court_id).timeline
+    data = json.loads(json.dumps(timeline.dump()))
+    loaded = padel_history.PointTimeline.load(data)
+    assert json.loads(json.dumps(loaded.dump())) == data
+    assert list(loaded.records()) == list(timeline.records())
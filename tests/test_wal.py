@@ -0,0 +1,75 @@
+"""A crashed process comes back from the event log with every court as it left it"""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# Scores on two courts with undo, redo and a reset, prints every court, then dies without closing the log
+WRITER = '''
+import json, os, random, sys, time
+import padel_backend
+events = padel_backend.enable_event_log(sys.argv[1])
+events.snapshot_every = 50
+client = padel_backend.app.test_client()
+client.post('/courts/b/reset_match', json={'rules': {'golden_point': False, 'tiebreak': True}})
+rng = random.Random(1)
+for i in range(300):
+    court = rng.choice('ab')
+    action = rng.random()
+    if action < 0.1:
+        client.post(f'/courts/{court}/undo')
+    elif action < 0.13:
+        client.post(f'/courts/{court}/redo')
+    elif client.post(f'/courts/{court}/add_point', json={'team': rng.choice(['black', 'yellow'])}).status_code == 400:
+        client.post(f'/courts/{court}/reset_match')
+    if i == 150:
+        time.sleep(0.3)  # Let the flusher take a snapshot: recovery then loads it and replays the rest
+print(json.dumps({court_id: COURT_STATE(court) for court_id, court in padel_backend.courts.items()}, sort_keys=True))
+sys.stdout.flush()
+os._exit(0)
+'''
+
+# Recovers from the event log and prints every court
+READER = '''
+import json, sys
+import padel_backend
+events = padel_backend.enable_event_log(sys.argv[1])
+courts = {court_id: COURT_STATE(court) for court_id, court in padel_backend.courts.items()}
+print(json.dumps(dict(courts, recovery={'recovered_events': events.recovered_events}), sort_keys=True))
+'''
+
+COURT_STATE = '''
+import padel_backend
+def COURT_STATE(court):
+    return [padel_backend.full_game_state(court), court.match_storage, court.stats.dump(), court.timeline.dump(),
+            list(court.state), court.version, court.applied_seq]
+'''
+
+
+def run(script, data_dir):
+    """Run a script in a fresh interpreter and return what it printed, as JSON"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PADEL_LOG_LEVEL='WARNING')
+    result = subprocess.run([sys.executable, '-c', COURT_STATE + script, str(data_dir)],
+                            env=env, cwd=ROOT, capture_output=True, text=True, timeout=60, check=True)
+    return json.loads(result.stdout)
+
+
+def test_recovery_after_crash(tmp_path):
+    before = run(WRITER, tmp_path)
+    assert os.path.exists(tmp_path / 'snapshot.json')
+
+    after = run(READER, tmp_path)
+    assert after.pop('recovery')['recovered_events'] > 0  # Not all of it came from the snapshot
+    assert after == before
+
+
+def test_recovery_ignores_torn_last_line(tmp_path):
+    before = run(WRITER, tmp_path)
+    with open(tmp_path / 'events.log', 'a', encoding='utf-8') as f:
+        f.write('{"type":"add_point","court":"a","team":"bla')  # The crash cut the last write short
+
+    after = run(READER, tmp_path)
+    after.pop('recovery')
+    assert after == before